@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+"""Measure memory held per system and per device.
+
+Builds a fleet of iaqua systems from the same payloads as bench_parse and
+reports the bytes retained per system (without devices) and per device,
+with devices holding the compact IaquaDeviceData or a plain dict.
+
+    python benchmarks/bench_memory.py [--systems N]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import tracemalloc
+from typing import Dict, List
+
+import httpx
+from bench_parse import SYSTEM, devices_payload, home_payload
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import iaqualink.systems.iaqua.system as iaqua_system  # noqa: E402
+from iaqualink.client import AqualinkClient  # noqa: E402
+from iaqualink.systems.iaqua.system import IaquaSystem  # noqa: E402
+
+
+def build(count: int) -> Dict[str, float]:
+    aqualink = AqualinkClient("user", "pass")
+    home = httpx.Response(200, content=home_payload())
+    devices = httpx.Response(200, content=devices_payload())
+
+    tracemalloc.start()
+    start, _ = tracemalloc.get_traced_memory()
+    systems: List[IaquaSystem] = []
+    for i in range(count):
+        data = dict(SYSTEM, serial_number=f"SN{i:06}")
+        systems.append(IaquaSystem(aqualink, data))
+    empty, _ = tracemalloc.get_traced_memory()
+
+    for system in systems:
+        system._parse_home_response(home)
+        system._parse_devices_response(devices)
+    full, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    device_count = sum(len(x.devices) for x in systems)
+    return {
+        "system": (empty - start) / count,
+        "device": (full - empty) / device_count,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--systems", type=int, default=1000)
+    args = parser.parse_args()
+
+    print(f"{args.systems} systems")
+    print(f"{'data':<10} {'B/system':>10} {'B/device':>10}")
+    for name, data_class in (
+        ("dict", dict),
+        ("compact", iaqua_system.IaquaDeviceData),
+    ):
+        iaqua_system.IaquaDeviceData = data_class  # type: ignore
+        r = build(args.systems)
+        print(f"{name:<10} {r['system']:>10.0f} {r['device']:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+#!/usr/bin/env python
+"""Compare per-poll parse cost of the session screens.
+
+Runs the pre-decoding-layer parsers (kept here as a baseline) against the
+current IaquaSystem parsers on the same payloads and reports CPU time and
+peak transient memory per poll. The "decode" row forces the full typed
+decode on every poll, "in-place" is the steady state merge along the
+learned screen layout and "unchanged" a poll whose response bodies match
+the previous ones. The second table leaves JSON parsing out so only
+the merge itself is measured.
+
+    python benchmarks/bench_parse.py [--polls N]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict
+
+import httpx
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import iaqualink.systems.iaqua.system as iaqua_system  # noqa: E402
+from iaqualink.client import AqualinkClient  # noqa: E402
+from iaqualink.codec import JSON_BACKEND, loads  # noqa: E402
+from iaqualink.systems.iaqua.system import IaquaSystem  # noqa: E402
+
+SYSTEM = {"serial_number": "SN123456", "device_type": "iaqua", "name": "Pool"}
+
+HOME_DEVICES = [
+    "spa_temp",
+    "pool_temp",
+    "air_temp",
+    "spa_set_point",
+    "pool_set_point",
+    "cover_pool",
+    "freeze_protection",
+    "spa_pump",
+    "pool_pump",
+    "spa_heater",
+    "pool_heater",
+    "solar_heater",
+    "spa_salinity",
+    "pool_salinity",
+    "orp",
+    "ph",
+]
+
+
+def home_payload() -> bytes:
+    screen: list = [
+        {"status": "Online"},
+        {"response": ""},
+        {"system_type": "0"},
+        {"temp_scale": "F"},
+    ]
+    screen += [{x: str(i)} for i, x in enumerate(HOME_DEVICES)]
+    return json.dumps({"message": "", "home_screen": screen}).encode()
+
+
+def devices_payload() -> bytes:
+    screen: list = [{"status": "Online"}, {"response": ""}, {"group": "1"}]
+    for i in range(1, 16):
+        attrs = [
+            {"state": "0"},
+            {"label": f"AUX {i}"},
+            {"icon": "aux_1_0.png"},
+            {"type": "0"},
+            {"subtype": "0"},
+        ]
+        screen += [{f"aux_{i}": attrs}]
+    return json.dumps({"message": "", "devices_screen": screen}).encode()
+
+
+class LegacyParser:
+    """The parsers as they were before typed decoding, for reference."""
+
+    loads: Callable[[bytes], Any] = staticmethod(json.loads)
+
+    def __init__(self) -> None:
+        self.devices: Dict[str, Dict[str, str]] = {}
+        self.temp_unit = ""
+
+    def parse_home(self, response: httpx.Response) -> None:
+        data = self.loads(response.content)
+        self.temp_unit = data["home_screen"][3]["temp_scale"]
+        devices = {}
+        for x in data["home_screen"][4:]:
+            name = list(x.keys())[0]
+            state = list(x.values())[0]
+            attrs = {"name": name, "state": state}
+            devices.update({name: attrs})
+        self._merge(devices)
+
+    def parse_devices(self, response: httpx.Response) -> None:
+        data = self.loads(response.content)
+        devices = {}
+        for x in data["devices_screen"][3:]:
+            aux = list(x.keys())[0]
+            attrs = {"aux": aux.replace("aux_", ""), "name": aux}
+            for y in list(x.values())[0]:
+                attrs.update(y)
+            devices.update({aux: attrs})
+        self._merge(devices)
+
+    def _merge(self, devices: Dict[str, Dict[str, str]]) -> None:
+        for k, v in devices.items():
+            if k in self.devices:
+                for dk, dv in v.items():
+                    self.devices[k][dk] = dv
+            else:
+                self.devices[k] = dict(v)
+
+
+def measure(poll: Callable[[], Any], polls: int) -> Dict[str, float]:
+    poll()  # Warm up, creates devices.
+
+    start = time.process_time()
+    for _ in range(polls):
+        poll()
+    cpu = (time.process_time() - start) / polls
+
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    before, _ = tracemalloc.get_traced_memory()
+    poll()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {"cpu_us": cpu * 1e6, "peak_bytes": peak - before}
+
+
+def run(
+    home: httpx.Response, devices: httpx.Response, polls: int
+) -> Dict[str, Dict[str, float]]:
+    legacy = LegacyParser()
+    decode = IaquaSystem(AqualinkClient("user", "pass"), SYSTEM)
+    in_place = IaquaSystem(AqualinkClient("user", "pass"), SYSTEM)
+    unchanged = IaquaSystem(AqualinkClient("user", "pass"), SYSTEM)
+
+    def legacy_poll() -> None:
+        legacy.parse_home(home)
+        legacy.parse_devices(devices)
+
+    def decode_poll() -> None:
+        decode._home_layout = None
+        decode._devices_layout = None
+        decode._fingerprints.clear()
+        decode._parse_home_response(home)
+        decode._parse_devices_response(devices)
+
+    def in_place_poll() -> None:
+        in_place._fingerprints.clear()
+        in_place._parse_home_response(home)
+        in_place._parse_devices_response(devices)
+
+    def unchanged_poll() -> None:
+        unchanged._parse_home_response(home)
+        unchanged._parse_devices_response(devices)
+
+    return {
+        "legacy": measure(legacy_poll, polls),
+        "decode": measure(decode_poll, polls),
+        "in-place": measure(in_place_poll, polls),
+        "unchanged": measure(unchanged_poll, polls),
+    }
+
+
+def report(title: str, results: Dict[str, Dict[str, float]]) -> None:
+    print(title)
+    print(f"{'parser':<10} {'cpu/poll (us)':>14} {'peak/poll (B)':>14}")
+    for name, r in results.items():
+        print(f"{name:<10} {r['cpu_us']:>14.1f} {r['peak_bytes']:>14.0f}")
+    print()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--polls", type=int, default=20000)
+    args = parser.parse_args()
+
+    home = httpx.Response(200, content=home_payload())
+    devices = httpx.Response(200, content=devices_payload())
+
+    print(f"JSON backend: {JSON_BACKEND}, {args.polls} polls\n")
+    report("Full poll", run(home, devices, args.polls))
+
+    # Hand out payloads parsed ahead of time to leave JSON parsing out.
+    parsed = {id(r.content): loads(r.content) for r in (home, devices)}
+    LegacyParser.loads = staticmethod(lambda c: parsed[id(c)])
+    iaqua_system.loads = LegacyParser.loads
+    report("Merge only", run(home, devices, args.polls))
+
+
+if __name__ == "__main__":
+    main()
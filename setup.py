@@ -28,6 +28,10 @@ setup(
     package_dir={"iaqualink": "src/iaqualink"},
     include_package_data=True,
     install_requires=requirements,
+    extras_require={
+        "opentelemetry": ["opentelemetry-api"],
+        "orjson": ["orjson"],
+    },
     license="BSD",
     keywords="iaqualink",
     classifiers=[
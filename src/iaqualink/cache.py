@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, Optional
+
+from iaqualink.const import SESSION_CACHE_TTL
+
+CacheEntry = Dict[str, Any]
+
+LOGGER = logging.getLogger("iaqualink")
+
+
+class AqualinkCache:
+    """Store for session credentials and systems, keyed by username.
+
+    Entries carry the wall-clock time of the login that produced them and
+    are ignored once they are older than `ttl` seconds.
+    """
+
+    def __init__(self, ttl: float = SESSION_CACHE_TTL):
+        self.ttl = ttl
+
+    def load(self, key: str) -> Optional[CacheEntry]:
+        entry = self._read(key)
+        if entry is None:
+            return None
+
+        if time.time() - entry.get("timestamp", 0) > self.ttl:
+            LOGGER.debug(f"Cached session for {key} has expired.")
+            return None
+
+        return entry
+
+    def store(self, key: str, entry: CacheEntry) -> None:
+        self._write(key, entry)
+
+    def clear(self, key: str) -> None:
+        self._delete(key)
+
+    def _read(self, key: str) -> Optional[CacheEntry]:
+        raise NotImplementedError
+
+    def _write(self, key: str, entry: CacheEntry) -> None:
+        raise NotImplementedError
+
+    def _delete(self, key: str) -> None:
+        raise NotImplementedError
+
+
+class AqualinkMemoryCache(AqualinkCache):
+    def __init__(self, ttl: float = SESSION_CACHE_TTL):
+        super().__init__(ttl)
+        self._entries: Dict[str, CacheEntry] = {}
+
+    def _read(self, key: str) -> Optional[CacheEntry]:
+        return self._entries.get(key)
+
+    def _write(self, key: str, entry: CacheEntry) -> None:
+        self._entries[key] = entry
+
+    def _delete(self, key: str) -> None:
+        self._entries.pop(key, None)
+
+
+class AqualinkFileCache(AqualinkCache):
+    """JSON file holding entries for any number of accounts.
+
+    The file contains authentication tokens so it's only readable by its
+    owner. Updates are written to a temporary file first and then moved
+    into place so that readers never see a partial file.
+    """
+
+    def __init__(self, path: str, ttl: float = SESSION_CACHE_TTL):
+        super().__init__(ttl)
+        self.path = path
+
+    def _load_file(self) -> Dict[str, CacheEntry]:
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            LOGGER.warning(f"Ignoring unreadable cache {self.path}: {e}")
+            return {}
+
+        if not isinstance(data, dict):
+            return {}
+        return data
+
+    def _save_file(self, data: Dict[str, CacheEntry]) -> None:
+        tmp = f"{self.path}.tmp"
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp, self.path)
+
+    def _read(self, key: str) -> Optional[CacheEntry]:
+        return self._load_file().get(key)
+
+    def _write(self, key: str, entry: CacheEntry) -> None:
+        data = self._load_file()
+        data[key] = entry
+        self._save_file(data)
+
+    def _delete(self, key: str) -> None:
+        data = self._load_file()
+        if data.pop(key, None) is not None:
+            self._save_file(data)
@@ -1,24 +1,68 @@
 from __future__ import annotations
 
+import asyncio
 import logging
+import time
 from types import TracebackType
-from typing import Any, Dict, Optional, Type
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Tuple,
+    Type,
+)
 
 import httpx
 
+from iaqualink.cache import AqualinkCache, CacheEntry
+from iaqualink.codec import loads
 from iaqualink.const import (
     AQUALINK_API_KEY,
     AQUALINK_DEVICES_URL,
     AQUALINK_LOGIN_URL,
     KEEPALIVE_EXPIRY,
+    LOOP_MONITOR_INTERVAL,
+    LOOP_STALL_THRESHOLD,
+    MAX_RELOGIN_ATTEMPTS,
+    SESSION_REFRESH_RETRY_DELAY,
+    UPDATE_ALL_CONCURRENCY,
 )
+from iaqualink.debug import AqualinkPayloadLog
+from iaqualink.events import AqualinkChangeEmitter
 from iaqualink.exception import (
+    AqualinkDeviceNotFoundException,
+    AqualinkInvalidParameterException,
     AqualinkServiceException,
     AqualinkServiceUnauthorizedException,
+    AqualinkSystemOfflineException,
     AqualinkSystemUnsupportedException,
 )
+from iaqualink.fleet import (
+    FLEET_COMMAND_ACTIONS,
+    CommandResult,
+    CommandStatus,
+    FleetCommand,
+    FleetCommandResult,
+    FleetUpdateResult,
+    SystemUpdateResult,
+    UpdateStatus,
+)
+from iaqualink.metrics import NULL_METRICS, AqualinkMetrics, RequestSample
+from iaqualink.monitor import AqualinkLoopMonitor
+from iaqualink.ratelimit import (
+    AqualinkRateLimiter,
+    AqualinkRequestGate,
+    QueueLatency,
+    RequestPriority,
+)
 from iaqualink.system import AqualinkSystem
 from iaqualink.systems import *  # pylint: disable=W0401,W0614 # noqa: F401,F403
+from iaqualink.tracing import NULL_TRACER, AqualinkTracer, traced
+from iaqualink.typing import Payload
 
 AQUALINK_HTTP_HEADERS = {
     "user-agent": "okhttp/3.14.7",
@@ -28,17 +72,60 @@ AQUALINK_HTTP_HEADERS = {
 LOGGER = logging.getLogger("iaqualink")
 
 
-class AqualinkClient:
+def _request_command(url: httpx.URL) -> str:
+    # Session requests name their command in the query string, other
+    # endpoints are named after the last path segment, e.g. devices.json.
+    return url.params.get("command") or url.path.rsplit("/", 1)[-1]
+
+
+def _request_attributes(
+    client: AqualinkClient,
+    url: str,
+    method: str = "get",
+    *args: Any,
+    **kwargs: Any,
+) -> Dict[str, str]:
+    parsed = httpx.URL(url)
+    attributes = {
+        "http.request.method": method.upper(),
+        "server.address": parsed.host,
+        "iaqualink.command": _request_command(parsed),
+    }
+    serial = parsed.params.get("serial")
+    if serial is not None:
+        attributes["iaqualink.serial"] = serial
+    return attributes
+
+
+class AqualinkClient(AqualinkChangeEmitter):
     def __init__(
         self,
         username: str,
         password: str,
         httpx_client: Optional[httpx.AsyncClient] = None,
+        max_relogin_attempts: int = MAX_RELOGIN_ATTEMPTS,
+        session_refresh_interval: Optional[float] = None,
+        cache: Optional[AqualinkCache] = None,
+        rate_limiter: Optional[AqualinkRateLimiter] = None,
+        request_gate: Optional[AqualinkRequestGate] = None,
+        metrics: Optional[AqualinkMetrics] = None,
+        payload_log: Optional[AqualinkPayloadLog] = None,
+        tracer: Optional[AqualinkTracer] = None,
     ):
+        super().__init__()
+
         self._username = username
         self._password = password
         self._logged = False
 
+        # Expired sessions are renewed transparently, at most this many times
+        # per request. Set to 0 to surface 401s to the caller instead.
+        self._max_relogin_attempts = max_relogin_attempts
+        self._login_task: Optional[asyncio.Future[None]] = None
+        self._session_generation = 0
+        self.relogin_count = 0
+        self.replay_count = 0
+
         self._client: Optional[httpx.AsyncClient] = None
 
         if httpx_client is None:
@@ -52,13 +139,85 @@ class AqualinkClient:
         self._token = ""
         self._user_id = ""
 
-        self._last_refresh = 0
+        # When set, sessions older than this many seconds get renewed in the
+        # background so that requests never have to wait on a login.
+        if (
+            session_refresh_interval is not None
+            and session_refresh_interval <= 0
+        ):
+            m = (
+                "Session refresh interval must be positive, "
+                f"got {session_refresh_interval}."
+            )
+            raise AqualinkInvalidParameterException(m)
+        self._session_refresh_interval = session_refresh_interval
+        self._session_refresh_task: Optional[asyncio.Future[None]] = None
+        self._last_refresh = 0.0
+
+        # Credentials and the systems list can be persisted so that a cold
+        # start doesn't need a login and a systems request.
+        self._cache = cache
+
+        # Shared by every request of this client, across all systems.
+        self.rate_limiter = rate_limiter
+
+        # Commands go ahead of polls for a slot among the requests in flight.
+        if request_gate is None:
+            request_gate = AqualinkRequestGate()
+        self.request_gate = request_gate
+        self.queue_latency = {x: QueueLatency() for x in RequestPriority}
+
+        # Measurements of every request, parse and update go there.
+        self.metrics = NULL_METRICS if metrics is None else metrics
+
+        # Shared with systems for their response payloads.
+        if payload_log is None:
+            payload_log = AqualinkPayloadLog()
+        self.payload_log = payload_log
+
+        # Spans around logins, requests, updates and commands go there.
+        self.tracer = NULL_TRACER if tracer is None else tracer
+
+        # Set by start_loop_monitor(), library sections report to it.
+        self.loop_monitor: Optional[AqualinkLoopMonitor] = None
+        self._cache_consulted = False
+        self._cache_entry: CacheEntry = {}
+        self._cached_systems: Optional[List[Payload]] = None
+        self._revalidate_task: Optional[asyncio.Future[None]] = None
 
     @property
     def logged(self) -> bool:
         return self._logged
 
+    @property
+    def session_age(self) -> float:
+        return time.monotonic() - self._last_refresh
+
+    def start_loop_monitor(
+        self,
+        interval: float = LOOP_MONITOR_INTERVAL,
+        threshold: float = LOOP_STALL_THRESHOLD,
+    ) -> AqualinkLoopMonitor:
+        """Start measuring event loop lag, reported through metrics."""
+        if self.loop_monitor is None:
+            self.loop_monitor = AqualinkLoopMonitor(
+                self.metrics, interval, threshold
+            )
+        self.loop_monitor.start()
+        return self.loop_monitor
+
     async def close(self) -> None:
+        if self.loop_monitor is not None:
+            self.loop_monitor.stop()
+
+        if self._session_refresh_task is not None:
+            self._session_refresh_task.cancel()
+            self._session_refresh_task = None
+
+        if self._revalidate_task is not None:
+            self._revalidate_task.cancel()
+            self._revalidate_task = None
+
         if self._must_close_client is False:
             return
 
@@ -85,8 +244,13 @@ class AqualinkClient:
         await self.close()
         return exc is None
 
+    @traced("iaqualink.request", _request_attributes)
     async def send_request(
-        self, url: str, method: str = "get", **kwargs: Any
+        self,
+        url: str,
+        method: str = "get",
+        priority: RequestPriority = RequestPriority.POLL,
+        **kwargs: Any,
     ) -> httpx.Response:
         if self._client is None:
             self._client = httpx.AsyncClient(
@@ -94,12 +258,29 @@ class AqualinkClient:
                 limits=httpx.Limits(keepalive_expiry=KEEPALIVE_EXPIRY),
             )
 
-        LOGGER.debug(f"-> {method.upper()} {url} {kwargs}")
-        r = await self._client.request(
-            method, url, headers=AQUALINK_HTTP_HEADERS, **kwargs
-        )
+        queued = time.monotonic()
+        if self.rate_limiter is not None:
+            await self.rate_limiter.acquire(httpx.URL(url).host, priority)
+        await self.request_gate.acquire(priority)
+        debug = LOGGER.isEnabledFor(logging.DEBUG)
+        try:
+            self.queue_latency[priority].record(time.monotonic() - queued)
+
+            if debug:
+                host = httpx.URL(url).host
+                message = f"-> {method.upper()} {url}"
+                self.payload_log.log(host, message, kwargs)
+            if self.metrics.enabled:
+                r = await self._send_measured(self._client, method, url, kwargs)
+            else:
+                r = await self._client.request(
+                    method, url, headers=AQUALINK_HTTP_HEADERS, **kwargs
+                )
+        finally:
+            self.request_gate.release(priority)
 
-        LOGGER.debug(f"<- {r.status_code} {r.reason_phrase} - {url}")
+        if debug:
+            LOGGER.debug(f"<- {r.status_code} {r.reason_phrase} - {url}")
 
         if r.status_code == 401:
             m = "Unauthorized Access, check your credentials and try again"
@@ -112,36 +293,217 @@ class AqualinkClient:
 
         return r
 
+    async def _send_measured(
+        self,
+        client: httpx.AsyncClient,
+        method: str,
+        url: str,
+        kwargs: Dict[str, Any],
+    ) -> httpx.Response:
+        # The response is streamed to tell the time to first byte apart from
+        # the time spent reading the body.
+        request = client.build_request(
+            method, url, headers=AQUALINK_HTTP_HEADERS, **kwargs
+        )
+        status: Optional[int] = None
+        received = 0
+        ttfb: Optional[float] = None
+        start = time.perf_counter()
+        try:
+            r = await client.send(request, stream=True)
+            ttfb = time.perf_counter() - start
+            status = r.status_code
+            try:
+                await r.aread()
+            finally:
+                await r.aclose()
+            received = len(r.content)
+            return r
+        finally:
+            duration = time.perf_counter() - start
+            command = _request_command(request.url)
+            self.metrics.request(
+                RequestSample(
+                    request.url.host, command, status, received, ttfb, duration
+                )
+            )
+
+    async def send_authenticated_request(
+        self,
+        build_url: Callable[[], str],
+        method: str = "get",
+        idempotent: bool = True,
+        **kwargs: Any,
+    ) -> httpx.Response:
+        """Send a request built from the current session credentials.
+
+        On a 401, the session is renewed once for all concurrent callers
+        and idempotent requests are replayed with the fresh credentials.
+        """
+        attempts = 0
+        while True:
+            generation = self._session_generation
+            try:
+                return await self.send_request(build_url(), method, **kwargs)
+            except AqualinkServiceUnauthorizedException:
+                if attempts >= self._max_relogin_attempts:
+                    raise
+                attempts += 1
+                await self._relogin(generation)
+                if not idempotent:
+                    raise
+                self.replay_count += 1
+
+    async def _relogin(self, generation: int) -> None:
+        # The session was already renewed since the request was sent.
+        if generation != self._session_generation:
+            return
+
+        if self._login_task is None:
+            LOGGER.debug("Session expired, logging in again.")
+            self.relogin_count += 1
+            # Whatever the cache holds can't be better than what just failed.
+            self._cache_consulted = True
+            self._login_task = asyncio.ensure_future(self.login())
+            self._login_task.add_done_callback(self._login_done)
+        await asyncio.shield(self._login_task)
+
+    def _login_done(self, task: asyncio.Future[None]) -> None:
+        self._login_task = None
+        if not task.cancelled():
+            task.exception()
+
     async def _send_login_request(self) -> httpx.Response:
         data = {
             "api_key": AQUALINK_API_KEY,
             "email": self._username,
             "password": self._password,
         }
+        # Nothing else can go through without a session.
         return await self.send_request(
-            AQUALINK_LOGIN_URL, method="post", json=data
+            AQUALINK_LOGIN_URL,
+            method="post",
+            priority=RequestPriority.COMMAND,
+            json=data,
         )
 
+    @traced("iaqualink.login", lambda x: {})
     async def login(self) -> None:
+        # Only the very first explicit login may be served from the cache.
+        # Logins triggered by a 401 always go to the service.
+        if not self._cache_consulted:
+            self._cache_consulted = True
+            if await self._load_cached_session():
+                return
+
         r = await self._send_login_request()
 
         data = r.json()
-        self.client_id = data["session_id"]
-        self._token = data["authentication_token"]
-        self._user_id = data["id"]
+        self._start_session(
+            data["session_id"], data["authentication_token"], data["id"]
+        )
+
+        self._cache_entry.update(
+            {
+                "client_id": self.client_id,
+                "authentication_token": self._token,
+                "user_id": self._user_id,
+                "timestamp": time.time(),
+            }
+        )
+        await self._store_cache_entry()
+
+    async def _load_cached_session(self) -> bool:
+        if self._cache is None:
+            return False
+
+        # Cache backends may do blocking I/O, keep it off the event loop.
+        loop = asyncio.get_event_loop()
+        entry = await loop.run_in_executor(
+            None, self._cache.load, self._username
+        )
+        if entry is None:
+            return False
+
+        try:
+            client_id = str(entry["client_id"])
+            token = str(entry["authentication_token"])
+            user_id = str(entry["user_id"])
+            age = max(0.0, time.time() - float(entry["timestamp"]))
+        except (KeyError, TypeError, ValueError) as e:
+            LOGGER.warning(f"Ignoring malformed cached session: {e!r}")
+            return False
+
+        systems = entry.get("systems")
+        if systems is not None and not isinstance(systems, list):
+            LOGGER.warning("Ignoring malformed cached systems.")
+            systems = None
+
+        LOGGER.debug(f"Reusing cached session for {self._username}.")
+        self._start_session(client_id, token, user_id, age)
+        self._cache_entry = dict(entry)
+        self._cached_systems = systems
+        return True
+
+    async def _store_cache_entry(self) -> None:
+        if self._cache is None:
+            return
+
+        # The entry is kept in memory, there's no need to read it back.
+        loop = asyncio.get_event_loop()
+        await loop.run_in_executor(
+            None, self._cache.store, self._username, dict(self._cache_entry)
+        )
+
+    def _start_session(
+        self, client_id: str, token: str, user_id: str, age: float = 0.0
+    ) -> None:
+        self.client_id = client_id
+        self._token = token
+        self._user_id = user_id
         self._logged = True
+        self._session_generation += 1
+        self._last_refresh = time.monotonic() - age
 
-    async def _send_systems_request(self) -> httpx.Response:
+        if (
+            self._session_refresh_interval is not None
+            and self._session_refresh_task is None
+        ):
+            self._session_refresh_task = asyncio.ensure_future(
+                self._refresh_session_periodically(
+                    self._session_refresh_interval
+                )
+            )
+
+    async def _refresh_session_periodically(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(max(0.0, interval - self.session_age))
+
+            # The session may have been renewed while we were sleeping.
+            if self.session_age < interval:
+                continue
+
+            # Requests in flight keep the credentials they were built with,
+            # new ones pick up the renewed session once login completes.
+            try:
+                await self._relogin(self._session_generation)
+            except Exception as e:  # pylint: disable=broad-except
+                LOGGER.warning(f"Background session refresh failed: {e!r}")
+                await asyncio.sleep(SESSION_REFRESH_RETRY_DELAY)
+
+    def _systems_url(self) -> str:
         params = {
             "api_key": AQUALINK_API_KEY,
             "authentication_token": self._token,
             "user_id": self._user_id,
         }
         params_str = "&".join(f"{k}={v}" for k, v in params.items())
-        url = f"{AQUALINK_DEVICES_URL}?{params_str}"
-        return await self.send_request(url)
+        return f"{AQUALINK_DEVICES_URL}?{params_str}"
 
-    async def get_systems(self) -> Dict[str, AqualinkSystem]:
+    async def _send_systems_request(self) -> httpx.Response:
+        return await self.send_authenticated_request(self._systems_url)
+
+    async def _fetch_systems(self) -> List[Payload]:
         try:
             r = await self._send_systems_request()
         except AqualinkServiceException as e:
@@ -149,8 +511,51 @@ class AqualinkClient:
                 raise AqualinkServiceUnauthorizedException from e
             raise
 
-        data = r.json()
+        data: List[Payload] = loads(r.content)
+
+        if self._cache is not None and self._cache_entry:
+            self._cache_entry["systems"] = data
+            await self._store_cache_entry()
+
+        return data
+
+    @traced("iaqualink.get_systems", lambda x: {})
+    async def get_systems(self) -> Dict[str, AqualinkSystem]:
+        # On cold start, hand out systems from the cache right away and
+        # check them against the service in the background.
+        if self._cached_systems is not None:
+            data, self._cached_systems = self._cached_systems, None
+            systems = self._build_systems(data)
+            self._revalidate_task = asyncio.ensure_future(
+                self._revalidate_systems(systems)
+            )
+            return systems
+
+        return self._build_systems(await self._fetch_systems())
+
+    async def _revalidate_systems(
+        self, systems: Dict[str, AqualinkSystem]
+    ) -> None:
+        try:
+            data = await self._fetch_systems()
+        except Exception as e:  # pylint: disable=broad-except
+            LOGGER.warning(f"Failed to revalidate cached systems: {e!r}")
+            return
+
+        # Bring the mapping handed out earlier in line with the account:
+        # known systems get fresh data, new ones are added and systems that
+        # are gone are removed.
+        fresh = self._build_systems(data)
+        for serial in list(systems):
+            if serial not in fresh:
+                del systems[serial]
+        for serial, system in fresh.items():
+            if serial in systems:
+                systems[serial].data.update(system.data)
+            else:
+                systems[serial] = system
 
+    def _build_systems(self, data: List[Payload]) -> Dict[str, AqualinkSystem]:
         systems = []
         for x in data:
             try:
@@ -159,3 +564,138 @@ class AqualinkClient:
                 pass
 
         return {x.serial: x for x in systems if x is not None}
+
+    async def _update_system(
+        self, system: AqualinkSystem, semaphore: asyncio.Semaphore
+    ) -> SystemUpdateResult:
+        if system.refresh_throttled:
+            return SystemUpdateResult(system.serial, UpdateStatus.SKIPPED)
+
+        exception: Optional[Exception] = None
+        async with semaphore:
+            start = time.monotonic()
+            try:
+                await system.update()
+            except AqualinkSystemOfflineException as e:
+                status, exception = UpdateStatus.OFFLINE, e
+            except Exception as e:  # pylint: disable=broad-except
+                LOGGER.debug(f"Update failed for {system.serial}: {e!r}")
+                status, exception = UpdateStatus.ERROR, e
+            else:
+                status = UpdateStatus.SUCCESS
+            duration = time.monotonic() - start
+
+        return SystemUpdateResult(system.serial, status, duration, exception)
+
+    async def update_all(
+        self,
+        systems: Mapping[str, AqualinkSystem],
+        concurrency: int = UPDATE_ALL_CONCURRENCY,
+    ) -> FleetUpdateResult:
+        """Refresh all systems concurrently, at most `concurrency` at once.
+
+        Failures are reported per system and never cancel other updates.
+        """
+        if concurrency < 1:
+            m = f"Concurrency must be at least 1, got {concurrency}."
+            raise AqualinkInvalidParameterException(m)
+
+        semaphore = asyncio.Semaphore(concurrency)
+        start = time.monotonic()
+        results = await asyncio.gather(
+            *[self._update_system(x, semaphore) for x in systems.values()]
+        )
+        duration = time.monotonic() - start
+
+        return FleetUpdateResult({x.serial: x for x in results}, duration)
+
+    async def _run_command(
+        self, system: AqualinkSystem, command: FleetCommand
+    ) -> None:
+        devices = await system.get_devices()
+        if command.device not in devices:
+            m = f"No device named {command.device} on {system.serial}."
+            raise AqualinkDeviceNotFoundException(m)
+
+        method = getattr(devices[command.device], command.action)
+        if command.value is None:
+            await method()
+        else:
+            await method(command.value)
+
+    async def _run_system_commands(
+        self,
+        system: AqualinkSystem,
+        commands: List[Tuple[int, FleetCommand]],
+        semaphore: asyncio.Semaphore,
+    ) -> List[Tuple[int, CommandResult]]:
+        # Commands for one system are sent one at a time, in order. Once the
+        # system turns out to be offline, the rest are skipped.
+        results = []
+        offline: Optional[AqualinkSystemOfflineException] = None
+        async with semaphore:
+            for i, command in commands:
+                if offline is not None:
+                    status = CommandStatus.SKIPPED
+                    results += [
+                        (i, CommandResult(command, status, 0.0, offline))
+                    ]
+                    continue
+
+                exception: Optional[Exception] = None
+                start = time.monotonic()
+                try:
+                    await self._run_command(system, command)
+                except AqualinkSystemOfflineException as e:
+                    status, exception = CommandStatus.OFFLINE, e
+                    offline = e
+                except Exception as e:  # pylint: disable=broad-except
+                    LOGGER.debug(f"{command} failed: {e!r}")
+                    status, exception = CommandStatus.ERROR, e
+                else:
+                    status = CommandStatus.SUCCESS
+                duration = time.monotonic() - start
+
+                result = CommandResult(command, status, duration, exception)
+                results += [(i, result)]
+
+        return results
+
+    async def run_commands(
+        self,
+        systems: Mapping[str, AqualinkSystem],
+        commands: Iterable[FleetCommand],
+        concurrency: int = UPDATE_ALL_CONCURRENCY,
+    ) -> FleetCommandResult:
+        """Run device commands across systems, at most `concurrency` at once.
+
+        Systems are worked on in parallel, commands for the same system run
+        in the order given. Results come back in that same order. Requests
+        go through the client rate limiter with command priority.
+        """
+        if concurrency < 1:
+            m = f"Concurrency must be at least 1, got {concurrency}."
+            raise AqualinkInvalidParameterException(m)
+
+        by_system: Dict[str, List[Tuple[int, FleetCommand]]] = {}
+        for i, command in enumerate(commands):
+            if command.action not in FLEET_COMMAND_ACTIONS:
+                m = f"{command.action} isn't a supported command."
+                raise AqualinkInvalidParameterException(m)
+            if command.serial not in systems:
+                m = f"Unknown system {command.serial}."
+                raise AqualinkInvalidParameterException(m)
+            by_system.setdefault(command.serial, []).append((i, command))
+
+        semaphore = asyncio.Semaphore(concurrency)
+        start = time.monotonic()
+        grouped = await asyncio.gather(
+            *[
+                self._run_system_commands(systems[k], v, semaphore)
+                for k, v in by_system.items()
+            ]
+        )
+        duration = time.monotonic() - start
+
+        results = sorted((x for y in grouped for x in y), key=lambda x: x[0])
+        return FleetCommandResult([x for _, x in results], duration)
@@ -0,0 +1,20 @@
+from __future__ import annotations
+
+import json
+from typing import Any, Union
+
+# orjson is optional, it decodes our payloads several times faster than the
+# standard library when it's installed.
+try:
+    import orjson
+
+    JSON_BACKEND = "orjson"
+
+    def loads(data: Union[bytes, str]) -> Any:
+        return orjson.loads(data)
+
+except ImportError:  # pragma: no cover
+    JSON_BACKEND = "json"
+
+    def loads(data: Union[bytes, str]) -> Any:
+        return json.loads(data)
@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, Hashable, List, Optional
+
+LOGGER = logging.getLogger("iaqualink")
+
+CommandSender = Callable[[], Awaitable[None]]
+
+
+class _PendingCommand:
+    __slots__ = ("send", "toggles", "waiters")
+
+    def __init__(self, send: CommandSender):
+        self.send = send
+        self.toggles = 0
+        self.waiters: List[asyncio.Future[None]] = []
+
+    def resolve(self, exc: Optional[BaseException] = None) -> None:
+        for waiter in self.waiters:
+            if waiter.done():
+                continue
+            if exc is None:
+                waiter.set_result(None)
+            else:
+                waiter.set_exception(exc)
+
+
+class AqualinkCommandQueue:
+    """Coalesces commands sent to a system within a short window.
+
+    Commands are grouped by key. Within a window, the last command for a
+    key replaces earlier ones, except for toggles where an even number of
+    them cancel out and nothing is sent. Every caller waits until the
+    command that survived for its key has been sent and acknowledged.
+    Batches are sent one command at a time, in the order keys were first
+    seen.
+    """
+
+    def __init__(self) -> None:
+        self._pending: Dict[Hashable, _PendingCommand] = {}
+        self._flush_task: Optional[asyncio.Future[None]] = None
+        self._lock = asyncio.Lock()
+
+        self.submitted = 0
+        self.sent = 0
+
+    def submit(
+        self,
+        key: Hashable,
+        send: CommandSender,
+        window: float,
+        toggle: bool = False,
+    ) -> asyncio.Future[None]:
+        entry = self._pending.get(key)
+        if entry is None:
+            entry = self._pending[key] = _PendingCommand(send)
+        else:
+            entry.send = send
+        if toggle:
+            entry.toggles += 1
+
+        waiter = asyncio.get_event_loop().create_future()
+        entry.waiters.append(waiter)
+        self.submitted += 1
+
+        if self._flush_task is None:
+            self._flush_task = asyncio.ensure_future(self._flush(window))
+            self._flush_task.add_done_callback(self._flush_done)
+        return waiter
+
+    def _flush_done(self, task: asyncio.Future[None]) -> None:
+        # A flush cancelled before it even started leaves its batch behind.
+        if self._flush_task is not task:
+            return
+
+        batch, self._pending = self._pending, {}
+        self._flush_task = None
+        for entry in batch.values():
+            for waiter in entry.waiters:
+                waiter.cancel()
+
+    async def _flush(self, window: float) -> None:
+        batch: Dict[Hashable, _PendingCommand] = {}
+        try:
+            try:
+                await asyncio.sleep(window)
+            finally:
+                batch, self._pending = self._pending, {}
+                self._flush_task = None
+
+            # A batch only starts once the previous one is fully sent so
+            # that commands for the same key can't overtake each other.
+            async with self._lock:
+                for key, entry in batch.items():
+                    await self._send(key, entry)
+        finally:
+            # Nothing is left waiting if the flush itself got cancelled.
+            for entry in batch.values():
+                for waiter in entry.waiters:
+                    waiter.cancel()
+
+    async def _send(self, key: Hashable, entry: _PendingCommand) -> None:
+        if entry.toggles and entry.toggles % 2 == 0:
+            LOGGER.debug(f"Dropping {entry.toggles} toggles of {key}.")
+            entry.resolve()
+            return
+
+        try:
+            await entry.send()
+        except Exception as e:  # pylint: disable=broad-except
+            entry.resolve(e)
+        else:
+            self.sent += 1
+            entry.resolve()
@@ -7,3 +7,67 @@ AQUALINK_DEVICES_URL = "https://r-api.iaqualink.net/devices.json"
 
 KEEPALIVE_EXPIRY = 30
 MIN_SECS_TO_REFRESH = 5
+
+UPDATE_ALL_CONCURRENCY = 20
+MAX_RELOGIN_ATTEMPTS = 1
+SESSION_REFRESH_RETRY_DELAY = 30
+SESSION_CACHE_TTL = 3600
+
+POLL_IDLE_INTERVAL = 60
+POLL_ACTIVE_INTERVAL = 15
+POLL_COMMAND_INTERVAL = MIN_SECS_TO_REFRESH
+POLL_COMMAND_WINDOW = 60
+POLL_MAX_BACKOFF = 900
+POLL_JITTER = 0.1
+
+# Token bucket budgets per host: (requests per second, burst, reserve).
+# The reserve is only available to commands, never to background polling.
+RATE_LIMITS = {
+    "prod.zodiac-io.com": (1.0, 3, 0),
+    "r-api.iaqualink.net": (2.0, 5, 0),
+    "p-api.iaqualink.net": (10.0, 20, 5),
+}
+RATE_LIMIT_DEFAULT = (10.0, 20, 0)
+
+# Requests in flight per client. Polls never take more than their share of
+# these so that commands don't wait behind them.
+REQUEST_CONCURRENCY = 20
+POLL_REQUEST_SHARE = 0.75
+
+# Commands sent to a system within this many seconds of each other are
+# coalesced. Disabled (0) by default.
+COMMAND_COALESCE_WINDOW = 0.0
+
+# Optimistic toggles poll the affected screen at this interval until the
+# system confirms the new state, and are rolled back after the timeout.
+OPTIMISTIC_CONFIRM_INTERVAL = 2.0
+OPTIMISTIC_CONFIRM_TIMEOUT = 30.0
+
+# Histogram bucket bounds for in-process metrics, in seconds and bytes.
+METRICS_LATENCY_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+)
+METRICS_BYTES_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+# Payloads logged at DEBUG level: one in this many per system, truncated
+# to this many characters. None doesn't truncate.
+PAYLOAD_LOG_SAMPLE_RATE = 1
+PAYLOAD_LOG_MAX_SIZE = None
+
+# The loop monitor wakes up at this interval to measure event loop lag.
+# Library sections blocking the loop longer than the threshold are stalls.
+LOOP_MONITOR_INTERVAL = 0.5
+LOOP_STALL_THRESHOLD = 0.1
@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import logging
+from typing import Any, Dict, Optional
+
+from iaqualink.const import PAYLOAD_LOG_MAX_SIZE, PAYLOAD_LOG_SAMPLE_RATE
+from iaqualink.exception import AqualinkInvalidParameterException
+
+LOGGER = logging.getLogger("iaqualink")
+
+
+class AqualinkPayloadLog:
+    """Logs request and response payloads at DEBUG level.
+
+    Payloads are only formatted when DEBUG is enabled. Only one in
+    `sample_rate` payloads is logged per key, typically a system serial,
+    and payloads are cut after `max_size` characters.
+    """
+
+    __slots__ = ("sample_rate", "max_size", "_seen")
+
+    def __init__(
+        self,
+        sample_rate: int = PAYLOAD_LOG_SAMPLE_RATE,
+        max_size: Optional[int] = PAYLOAD_LOG_MAX_SIZE,
+    ):
+        if sample_rate < 1 or (max_size is not None and max_size < 1):
+            m = f"Invalid payload log: 1 in {sample_rate}, {max_size} chars."
+            raise AqualinkInvalidParameterException(m)
+
+        self.sample_rate = sample_rate
+        self.max_size = max_size
+        self._seen: Dict[str, int] = {}
+
+    def _sampled(self, key: str) -> bool:
+        if self.sample_rate == 1:
+            return True
+        seen = self._seen.get(key, 0)
+        self._seen[key] = seen + 1
+        return seen % self.sample_rate == 0
+
+    def _format(self, payload: Any) -> str:
+        # Raw bodies are cut before being decoded, anything else has to be
+        # formatted as a whole first.
+        limit = self.max_size
+        if isinstance(payload, bytes):
+            size = len(payload)
+            text = payload[:limit].decode("utf-8", errors="replace")
+        else:
+            text = str(payload)
+            size = len(text)
+
+        if limit is not None and size > limit:
+            return f"{text[:limit]}... ({size} total)"
+        return text
+
+    def log(self, key: str, message: str, payload: Any) -> None:
+        if not LOGGER.isEnabledFor(logging.DEBUG) or not self._sampled(key):
+            return
+        LOGGER.debug(f"{message}: {self._format(payload)}")
@@ -3,17 +3,21 @@ from __future__ import annotations
 import logging
 from typing import Any, Optional
 
+from iaqualink.events import AqualinkChangeEmitter
 from iaqualink.typing import DeviceData
 
 LOGGER = logging.getLogger("iaqualink")
 
 
-class AqualinkDevice:
+class AqualinkDevice(AqualinkChangeEmitter):
+    __slots__ = ("system", "data")
+
     def __init__(
         self,
         system: Any,  # Should be AqualinkSystem but causes mypy errors.
         data: DeviceData,
     ):
+        super().__init__()
         self.system = system
         self.data = data
 
@@ -55,18 +59,22 @@ class AqualinkDevice:
 
 
 class AqualinkSensor(AqualinkDevice):  # pylint: disable=W0223
-    pass
+    __slots__ = ()
 
 
 class AqualinkBinarySensor(AqualinkSensor):
     """These are non-actionable sensors, essentially read-only on/off."""
 
+    __slots__ = ()
+
     @property
     def is_on(self) -> bool:
         raise NotImplementedError
 
 
 class AqualinkToggle(AqualinkDevice):
+    __slots__ = ()
+
     @property
     def is_on(self) -> bool:
         raise NotImplementedError
@@ -84,6 +92,8 @@ class AqualinkToggle(AqualinkDevice):
 
 
 class AqualinkLight(AqualinkDevice):
+    __slots__ = ()
+
     @property
     def is_on(self) -> bool:
         raise NotImplementedError
@@ -127,6 +137,8 @@ class AqualinkLight(AqualinkDevice):
 
 
 class AqualinkThermostat(AqualinkToggle, AqualinkDevice):
+    __slots__ = ()
+
     @property
     def unit(self) -> str:
         raise NotImplementedError
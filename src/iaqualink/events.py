@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import AsyncIterator, Callable, List, NamedTuple, Optional
+
+LOGGER = logging.getLogger("iaqualink")
+
+
+class AqualinkChange(NamedTuple):
+    serial: str
+    device: str
+    field: str
+    old: Optional[str]
+    new: Optional[str]
+
+
+ChangeCallback = Callable[[List[AqualinkChange]], None]
+
+
+class AqualinkChangeEmitter:
+    """Delivers batches of device field changes to subscribers.
+
+    Callbacks get every batch as a list, async iterators from changes()
+    yield the changes one at a time.
+    """
+
+    __slots__ = ("_change_subscribers",)
+
+    def __init__(self) -> None:
+        self._change_subscribers: Optional[List[ChangeCallback]] = None
+
+    def subscribe(self, callback: ChangeCallback) -> Callable[[], None]:
+        if self._change_subscribers is None:
+            self._change_subscribers = []
+        self._change_subscribers.append(callback)
+
+        def unsubscribe() -> None:
+            if (
+                self._change_subscribers is not None
+                and callback in self._change_subscribers
+            ):
+                self._change_subscribers.remove(callback)
+                if not self._change_subscribers:
+                    self._change_subscribers = None
+
+        return unsubscribe
+
+    async def changes(self) -> AsyncIterator[AqualinkChange]:
+        queue: asyncio.Queue[AqualinkChange] = asyncio.Queue()
+
+        def put(changes: List[AqualinkChange]) -> None:
+            for change in changes:
+                queue.put_nowait(change)
+
+        unsubscribe = self.subscribe(put)
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            unsubscribe()
+
+    @property
+    def has_change_subscribers(self) -> bool:
+        return self._change_subscribers is not None
+
+    def _emit_changes(self, changes: List[AqualinkChange]) -> None:
+        if self._change_subscribers is None or not changes:
+            return
+
+        # Iterate over a copy, callbacks may unsubscribe themselves.
+        for callback in list(self._change_subscribers):
+            try:
+                callback(changes)
+            except Exception:  # pylint: disable=broad-except
+                LOGGER.exception("Change subscriber raised an exception.")
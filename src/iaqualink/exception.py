@@ -9,10 +9,18 @@ class AqualinkInvalidParameterException(AqualinkException):
     """Exception raised when an invalid parameter is passed."""
 
 
+class AqualinkDeviceNotFoundException(AqualinkException):
+    """Exception raised when a related device doesn't exist."""
+
+
 class AqualinkServiceException(AqualinkException):
     """Exception raised when an error is raised by the iaqualink service."""
 
 
+class AqualinkCommandNotConfirmedException(AqualinkServiceException):
+    """Exception raised when a system doesn't confirm a command in time."""
+
+
 class AqualinkServiceUnauthorizedException(AqualinkServiceException):
     """Exception raised when service access is unauthorized."""
 
@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from enum import Enum, unique
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Mapping, Optional
+
+if TYPE_CHECKING:
+    from iaqualink.device import AqualinkDevice
+    from iaqualink.system import AqualinkSystem
+
+# Device methods that can be run in bulk with AqualinkClient.run_commands.
+FLEET_COMMAND_ACTIONS = frozenset(
+    [
+        "turn_on",
+        "turn_off",
+        "toggle",
+        "set_temperature",
+        "set_brightness",
+        "set_effect_by_id",
+        "set_effect_by_name",
+    ]
+)
+
+
+@unique
+class UpdateStatus(Enum):
+    SUCCESS = "success"
+    OFFLINE = "offline"
+    ERROR = "error"
+    SKIPPED = "skipped"
+
+
+@dataclass
+class SystemUpdateResult:
+    serial: str
+    status: UpdateStatus
+    duration: float = 0.0
+    exception: Optional[BaseException] = None
+
+
+@dataclass
+class FleetUpdateResult:
+    results: Dict[str, SystemUpdateResult] = field(default_factory=dict)
+    duration: float = 0.0
+
+    def by_status(self, status: UpdateStatus) -> List[SystemUpdateResult]:
+        return [x for x in self.results.values() if x.status is status]
+
+    @property
+    def counts(self) -> Dict[UpdateStatus, int]:
+        counts = {x: 0 for x in UpdateStatus}
+        for x in self.results.values():
+            counts[x.status] += 1
+        return counts
+
+    @property
+    def _durations(self) -> List[float]:
+        # Skipped systems didn't hit the network, leave them out of stats.
+        return [
+            x.duration
+            for x in self.results.values()
+            if x.status is not UpdateStatus.SKIPPED
+        ]
+
+    @property
+    def max_duration(self) -> float:
+        return max(self._durations, default=0.0)
+
+    @property
+    def mean_duration(self) -> float:
+        durations = self._durations
+        if not durations:
+            return 0.0
+        return sum(durations) / len(durations)
+
+
+@unique
+class CommandStatus(Enum):
+    SUCCESS = "success"
+    OFFLINE = "offline"
+    ERROR = "error"
+    SKIPPED = "skipped"
+
+
+@dataclass(frozen=True)
+class FleetCommand:
+    serial: str
+    device: str
+    action: str
+    value: Any = None
+
+
+@dataclass
+class CommandResult:
+    command: FleetCommand
+    status: CommandStatus
+    duration: float = 0.0
+    exception: Optional[BaseException] = None
+
+
+@dataclass
+class FleetCommandResult:
+    results: List[CommandResult] = field(default_factory=list)
+    duration: float = 0.0
+
+    def by_status(self, status: CommandStatus) -> List[CommandResult]:
+        return [x for x in self.results if x.status is status]
+
+    @property
+    def counts(self) -> Dict[CommandStatus, int]:
+        counts = {x: 0 for x in CommandStatus}
+        for x in self.results:
+            counts[x.status] += 1
+        return counts
+
+    @property
+    def _durations(self) -> List[float]:
+        # Skipped commands were never sent, leave them out of stats.
+        return [
+            x.duration
+            for x in self.results
+            if x.status is not CommandStatus.SKIPPED
+        ]
+
+    @property
+    def max_duration(self) -> float:
+        return max(self._durations, default=0.0)
+
+    @property
+    def mean_duration(self) -> float:
+        durations = self._durations
+        if not durations:
+            return 0.0
+        return sum(durations) / len(durations)
+
+
+def select_commands(
+    systems: Mapping[str, AqualinkSystem],
+    predicate: Callable[[AqualinkSystem, AqualinkDevice], bool],
+    action: str,
+    value: Any = None,
+) -> List[FleetCommand]:
+    """Build the same command for every loaded device matching predicate."""
+    return [
+        FleetCommand(serial, name, action, value)
+        for serial, system in systems.items()
+        for name, device in system.devices.items()
+        if predicate(system, device)
+    ]
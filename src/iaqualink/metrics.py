@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+from bisect import bisect_left
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, NamedTuple, Optional, Sequence, Tuple
+
+from iaqualink.const import METRICS_BYTES_BUCKETS, METRICS_LATENCY_BUCKETS
+
+
+class RequestSample(NamedTuple):
+    host: str
+    command: str
+    # None when no response was received at all.
+    status: Optional[int]
+    received: int
+    ttfb: Optional[float]
+    duration: float
+
+
+class LoopStall(NamedTuple):
+    # Synchronous library section, e.g. _parse_devices_response, and the
+    # system it ran for.
+    section: str
+    serial: str
+    duration: float
+
+
+class AqualinkMetrics:
+    """Receives measurements taken by a client and its systems.
+
+    This default implementation discards everything. Measurements are only
+    taken at all when `enabled` is true, subclasses override the methods
+    they're interested in.
+    """
+
+    __slots__ = ()
+
+    enabled = False
+
+    def request(self, sample: RequestSample) -> None:
+        pass
+
+    def parse(self, serial: str, screen: str, duration: float) -> None:
+        pass
+
+    def update(self, serial: str, duration: float) -> None:
+        pass
+
+    def loop_lag(self, lag: float) -> None:
+        pass
+
+    def stall(self, stall: LoopStall) -> None:
+        pass
+
+
+NULL_METRICS = AqualinkMetrics()
+
+
+@dataclass(frozen=True)
+class HistogramSnapshot:
+    count: int
+    total: float
+    max: float
+    # Cumulative counts of values up to each bound, the last bound being
+    # infinite.
+    buckets: Tuple[Tuple[float, int], ...]
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-quantile."""
+        rank = q * self.count
+        for bound, count in self.buckets:
+            if count >= rank:
+                return min(bound, self.max)
+        return self.max
+
+
+class Histogram:
+    """Counts values in fixed buckets, cheap enough for every request."""
+
+    __slots__ = ("bounds", "counts", "count", "total", "max")
+
+    def __init__(self, bounds: Sequence[float] = METRICS_LATENCY_BUCKETS):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def snapshot(self) -> HistogramSnapshot:
+        buckets = []
+        cumulative = 0
+        for bound, count in zip(self.bounds + (float("inf"),), self.counts):
+            cumulative += count
+            buckets.append((bound, cumulative))
+        return HistogramSnapshot(
+            self.count, self.total, self.max, tuple(buckets)
+        )
+
+
+MetricKey = Tuple[str, ...]
+
+
+class AqualinkHistogramMetrics(AqualinkMetrics):
+    """Keeps in-process histograms of every measurement.
+
+    Histograms are keyed by metric name followed by its labels, e.g.
+    ("request.duration", host, command) or ("parse.duration", serial,
+    screen). Responses are counted by (host, command, status).
+    """
+
+    __slots__ = ("histograms", "statuses")
+
+    enabled = True
+
+    def __init__(self) -> None:
+        self.histograms: Dict[MetricKey, Histogram] = {}
+        self.statuses: Counter[Tuple[str, str, Optional[int]]] = Counter()
+
+    def _record(
+        self,
+        key: MetricKey,
+        value: float,
+        bounds: Sequence[float] = METRICS_LATENCY_BUCKETS,
+    ) -> None:
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = Histogram(bounds)
+        histogram.record(value)
+
+    def request(self, sample: RequestSample) -> None:
+        labels = (sample.host, sample.command)
+        self.statuses[labels + (sample.status,)] += 1
+        self._record(("request.duration",) + labels, sample.duration)
+        if sample.ttfb is not None:
+            self._record(("request.ttfb",) + labels, sample.ttfb)
+        self._record(
+            ("request.received",) + labels,
+            sample.received,
+            METRICS_BYTES_BUCKETS,
+        )
+
+    def parse(self, serial: str, screen: str, duration: float) -> None:
+        self._record(("parse.duration", serial, screen), duration)
+
+    def update(self, serial: str, duration: float) -> None:
+        self._record(("update.duration", serial), duration)
+
+    def loop_lag(self, lag: float) -> None:
+        self._record(("loop.lag",), lag)
+
+    def stall(self, stall: LoopStall) -> None:
+        key = ("loop.stall", stall.section, stall.serial)
+        self._record(key, stall.duration)
+
+    def snapshot(self) -> Dict[MetricKey, HistogramSnapshot]:
+        return {k: v.snapshot() for k, v in self.histograms.items()}
+
+    def reset(self) -> None:
+        self.histograms.clear()
+        self.statuses.clear()
@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import Optional
+
+from iaqualink.const import LOOP_MONITOR_INTERVAL, LOOP_STALL_THRESHOLD
+from iaqualink.exception import AqualinkInvalidParameterException
+from iaqualink.metrics import AqualinkMetrics, LoopStall
+
+LOGGER = logging.getLogger("iaqualink")
+
+
+class AqualinkLoopMonitor:
+    """Measures event loop lag and what in the library caused it.
+
+    A background task wakes up every `interval` seconds and reports how
+    late it was through the metrics hook. Library sections that block the
+    loop for at least `threshold` seconds are reported as stalls, and the
+    longest section since the last wake up is logged along with any lag
+    over the threshold.
+    """
+
+    __slots__ = (
+        "metrics",
+        "interval",
+        "threshold",
+        "lag",
+        "max_lag",
+        "_longest",
+        "_task",
+    )
+
+    def __init__(
+        self,
+        metrics: AqualinkMetrics,
+        interval: float = LOOP_MONITOR_INTERVAL,
+        threshold: float = LOOP_STALL_THRESHOLD,
+    ):
+        if interval <= 0 or threshold <= 0:
+            m = f"Invalid loop monitor: every {interval}s, {threshold}s."
+            raise AqualinkInvalidParameterException(m)
+
+        self.metrics = metrics
+        self.interval = interval
+        self.threshold = threshold
+        self.lag = 0.0
+        self.max_lag = 0.0
+        self._longest: Optional[LoopStall] = None
+        self._task: Optional[asyncio.Future[None]] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            self._tick(max(0.0, time.monotonic() - expected))
+
+    def _tick(self, lag: float) -> None:
+        longest, self._longest = self._longest, None
+        self.lag = lag
+        self.max_lag = max(self.max_lag, lag)
+        self.metrics.loop_lag(lag)
+
+        if lag >= self.threshold:
+            culprit = "unknown"
+            if longest is not None:
+                culprit = f"{longest.section} for {longest.serial}"
+                culprit += f" ({longest.duration:.3f}s)"
+            LOGGER.debug(f"Event loop lagged {lag:.3f}s, longest: {culprit}.")
+
+    def section(self, section: str, serial: str, duration: float) -> None:
+        """Record a synchronous library section that just ran."""
+        stall = LoopStall(section, serial, duration)
+        if self._longest is None or duration > self._longest.duration:
+            self._longest = stall
+        if duration >= self.threshold:
+            self.metrics.stall(stall)
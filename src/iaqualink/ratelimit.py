@@ -0,0 +1,221 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import deque
+from enum import IntEnum, unique
+from typing import Deque, Dict, Mapping, NamedTuple, Optional, Tuple
+
+from iaqualink.const import (
+    POLL_REQUEST_SHARE,
+    RATE_LIMIT_DEFAULT,
+    RATE_LIMITS,
+    REQUEST_CONCURRENCY,
+)
+from iaqualink.exception import AqualinkInvalidParameterException
+
+
+@unique
+class RequestPriority(IntEnum):
+    COMMAND = 0
+    POLL = 1
+
+
+class RateLimit(NamedTuple):
+    rate: float
+    capacity: int
+    reserve: int = 0
+
+
+class TokenBucket:
+    """Token bucket refilled at `rate` tokens per second on a monotonic clock.
+
+    Up to `capacity` requests can go through in a burst. Polls can't take
+    the last `reserve` tokens, which are kept for commands, nor any token
+    while a command is waiting.
+    """
+
+    def __init__(self, rate: float, capacity: int, reserve: int = 0):
+        if rate <= 0 or capacity < 1 or not 0 <= reserve < capacity:
+            m = f"Invalid rate limit: {rate}/s, {capacity} burst, {reserve}."
+            raise AqualinkInvalidParameterException(m)
+
+        self.rate = rate
+        self.capacity = capacity
+        self.reserve = reserve
+        self.tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._waiting = 0
+        self._waiting_commands = 0
+
+    @property
+    def queue_depth(self) -> int:
+        return self._waiting
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        elapsed = now - self._updated
+        self._updated = now
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+
+    async def acquire(
+        self, priority: RequestPriority = RequestPriority.POLL
+    ) -> None:
+        poll = priority is RequestPriority.POLL
+        floor = self.reserve if poll else 0
+
+        self._waiting += 1
+        self._waiting_commands += not poll
+        try:
+            while True:
+                self._refill()
+                needed = floor + 1 - self.tokens
+                if poll and self._waiting_commands:
+                    # Let the waiting commands have the next token.
+                    needed = max(needed, 1.0)
+                elif needed <= 0:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep(needed / self.rate)
+        finally:
+            self._waiting -= 1
+            self._waiting_commands -= not poll
+
+
+class AqualinkRateLimiter:
+    """Per-host token buckets shared by every request of a client."""
+
+    def __init__(
+        self,
+        limits: Optional[Mapping[str, Tuple[float, int, int]]] = None,
+        default: Tuple[float, int, int] = RATE_LIMIT_DEFAULT,
+    ):
+        if limits is None:
+            limits = RATE_LIMITS
+        self._limits = {k: RateLimit(*v) for k, v in limits.items()}
+        self._default = RateLimit(*default)
+        self.buckets: Dict[str, TokenBucket] = {}
+
+    def bucket(self, host: str) -> TokenBucket:
+        bucket = self.buckets.get(host)
+        if bucket is None:
+            limit = self._limits.get(host, self._default)
+            bucket = self.buckets[host] = TokenBucket(*limit)
+        return bucket
+
+    @property
+    def queue_depth(self) -> Dict[str, int]:
+        return {k: v.queue_depth for k, v in self.buckets.items()}
+
+    async def acquire(
+        self, host: str, priority: RequestPriority = RequestPriority.POLL
+    ) -> None:
+        await self.bucket(host).acquire(priority)
+
+
+class QueueLatency:
+    """Time requests of one priority spent queued before being sent."""
+
+    __slots__ = ("count", "total", "max")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(count={self.count}, "
+            f"mean={self.mean:.3f}, max={self.max:.3f})"
+        )
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def record(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+
+class AqualinkRequestGate:
+    """Bounds the requests a client has in flight at once.
+
+    Queued commands are always let through before queued polls, and polls
+    never hold more than `poll_share` of the slots so that a command never
+    waits for polls to complete.
+    """
+
+    def __init__(
+        self,
+        limit: int = REQUEST_CONCURRENCY,
+        poll_share: float = POLL_REQUEST_SHARE,
+    ):
+        if limit < 1 or not 0 < poll_share <= 1:
+            m = f"Invalid request gate: {limit} requests, {poll_share} polls."
+            raise AqualinkInvalidParameterException(m)
+
+        self.limit = limit
+        self.poll_limit = max(1, int(limit * poll_share))
+        self._active = {x: 0 for x in RequestPriority}
+        self._waiters: Dict[RequestPriority, Deque[asyncio.Future[None]]] = {
+            x: deque() for x in RequestPriority
+        }
+
+    @property
+    def in_flight(self) -> Dict[str, int]:
+        return {x.name.lower(): v for x, v in self._active.items()}
+
+    @property
+    def queue_depth(self) -> Dict[str, int]:
+        return {x.name.lower(): len(v) for x, v in self._waiters.items()}
+
+    def _can_start(self, priority: RequestPriority) -> bool:
+        if sum(self._active.values()) >= self.limit:
+            return False
+        if priority is RequestPriority.POLL:
+            return (
+                self._active[priority] < self.poll_limit
+                and not self._waiters[RequestPriority.COMMAND]
+            )
+        return True
+
+    async def acquire(
+        self, priority: RequestPriority = RequestPriority.POLL
+    ) -> None:
+        waiters = self._waiters[priority]
+        if not waiters and self._can_start(priority):
+            self._active[priority] += 1
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        waiters.append(future)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.cancelled():
+                if future in waiters:
+                    waiters.remove(future)
+            else:
+                # The slot was handed over as the waiter got cancelled.
+                self.release(priority)
+            raise
+
+    def release(self, priority: RequestPriority = RequestPriority.POLL) -> None:
+        self._active[priority] -= 1
+
+        # RequestPriority orders commands first.
+        for x in RequestPriority:
+            waiters = self._waiters[x]
+            while waiters:
+                # Checked with this waiter out of the queue, as it's the one
+                # about to start.
+                future = waiters.popleft()
+                if future.done():
+                    continue
+                if not self._can_start(x):
+                    waiters.appendleft(future)
+                    break
+                self._active[x] += 1
+                future.set_result(None)
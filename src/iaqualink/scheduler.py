@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+import time
+from typing import TYPE_CHECKING, Dict, Iterable
+
+from iaqualink.const import (
+    MIN_SECS_TO_REFRESH,
+    POLL_ACTIVE_INTERVAL,
+    POLL_COMMAND_INTERVAL,
+    POLL_COMMAND_WINDOW,
+    POLL_IDLE_INTERVAL,
+    POLL_JITTER,
+    POLL_MAX_BACKOFF,
+)
+from iaqualink.exception import AqualinkSystemOfflineException
+
+if TYPE_CHECKING:
+    from iaqualink.system import AqualinkSystem
+
+LOGGER = logging.getLogger("iaqualink")
+
+
+class AqualinkPollScheduler:
+    """Keep systems up to date by calling update() on adaptive intervals.
+
+    Systems are polled every `command_interval` seconds for
+    `command_window` seconds after a command was sent to them, every
+    `active_interval` seconds while equipment is running and every
+    `idle_interval` seconds otherwise. Offline systems back off
+    exponentially up to `max_backoff` seconds, and so do systems whose
+    updates keep failing. All intervals are spread
+    by +/- `jitter` so that a fleet doesn't poll in lockstep.
+    """
+
+    def __init__(
+        self,
+        systems: Iterable[AqualinkSystem] = (),
+        idle_interval: float = POLL_IDLE_INTERVAL,
+        active_interval: float = POLL_ACTIVE_INTERVAL,
+        command_interval: float = POLL_COMMAND_INTERVAL,
+        command_window: float = POLL_COMMAND_WINDOW,
+        max_backoff: float = POLL_MAX_BACKOFF,
+        jitter: float = POLL_JITTER,
+    ):
+        self.idle_interval = idle_interval
+        self.active_interval = active_interval
+        self.command_interval = command_interval
+        self.command_window = command_window
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+
+        self.systems: Dict[str, AqualinkSystem] = {}
+        self._tasks: Dict[str, asyncio.Future[None]] = {}
+        self._running = False
+
+        for system in systems:
+            self.add(system)
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    def add(self, system: AqualinkSystem) -> None:
+        self.remove(system)
+        self.systems[system.serial] = system
+        if self._running:
+            self._start(system)
+
+    def remove(self, system: AqualinkSystem) -> None:
+        self.systems.pop(system.serial, None)
+        task = self._tasks.pop(system.serial, None)
+        if task is not None:
+            task.cancel()
+
+    def start(self) -> None:
+        if self._running:
+            return
+        self._running = True
+        for system in self.systems.values():
+            self._start(system)
+
+    async def stop(self) -> None:
+        self._running = False
+        tasks = list(self._tasks.values())
+        self._tasks.clear()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _start(self, system: AqualinkSystem) -> None:
+        self._tasks[system.serial] = asyncio.ensure_future(self._poll(system))
+
+    def next_interval(self, system: AqualinkSystem, failures: int = 0) -> float:
+        if failures:
+            interval = min(
+                self.max_backoff, self.idle_interval * 2.0 ** (failures - 1)
+            )
+        elif (
+            system.last_command is not None
+            and time.monotonic() - system.last_command < self.command_window
+        ):
+            interval = self.command_interval
+        elif system.is_active:
+            interval = self.active_interval
+        else:
+            interval = self.idle_interval
+
+        interval *= random.uniform(1 - self.jitter, 1 + self.jitter)
+        return max(float(MIN_SECS_TO_REFRESH), interval)
+
+    async def _poll(self, system: AqualinkSystem) -> None:
+        failures = 0
+        last_command = system.last_command
+
+        # Spread the first round of polls too.
+        spread = random.uniform(0, self.jitter * self.idle_interval)
+        next_poll = time.monotonic() + spread
+
+        while True:
+            # Commands pull the next poll in, whatever the current interval.
+            if system.last_command != last_command:
+                last_command = system.last_command
+                if last_command is not None:
+                    next_poll = min(
+                        next_poll, last_command + self.command_interval
+                    )
+
+            now = time.monotonic()
+            if now < next_poll:
+                # Wake up regularly to notice commands sent in the meantime.
+                await asyncio.sleep(min(next_poll - now, self.command_interval))
+                continue
+
+            try:
+                await system.update()
+            except AqualinkSystemOfflineException:
+                failures += 1
+                LOGGER.debug(f"{system.serial} offline ({failures} polls).")
+            except Exception as e:  # pylint: disable=broad-except
+                # Service errors back off the same way, there's no point in
+                # hammering an API that keeps failing.
+                failures += 1
+                LOGGER.warning(f"Failed to update {system.serial}: {e!r}")
+            else:
+                failures = 0
+
+            next_poll = time.monotonic() + self.next_interval(system, failures)
@@ -1,9 +1,14 @@
 from __future__ import annotations
 
+import asyncio
 import logging
-from typing import TYPE_CHECKING, Dict, Optional, Type
+import time
+from typing import TYPE_CHECKING, Dict, List, Optional, Type
 
+from iaqualink.const import MIN_SECS_TO_REFRESH
+from iaqualink.events import AqualinkChange, AqualinkChangeEmitter
 from iaqualink.exception import AqualinkSystemUnsupportedException
+from iaqualink.tracing import AqualinkTracer, traced
 from iaqualink.typing import Payload
 
 if TYPE_CHECKING:
@@ -14,14 +19,35 @@ if TYPE_CHECKING:
 LOGGER = logging.getLogger("iaqualink")
 
 
-class AqualinkSystem:
+class AqualinkSystem(AqualinkChangeEmitter):
     subclasses: Dict[str, Type[AqualinkSystem]] = {}
 
+    # All attributes set by the library live in slots. The instance dict
+    # is only allocated when something else sets an attribute, e.g. to
+    # override a method on one instance.
+    __slots__ = (
+        "aqualink",
+        "data",
+        "devices",
+        "last_refresh",
+        "_refreshed_at",
+        "_refresh_task",
+        "last_command",
+        "online",
+        "__dict__",
+    )
+
     def __init__(self, aqualink: AqualinkClient, data: Payload):
+        super().__init__()
         self.aqualink = aqualink
         self.data = data
         self.devices: Dict[str, AqualinkDevice] = {}
         self.last_refresh = 0
+        self._refreshed_at: Optional[float] = None
+        self._refresh_task: Optional[asyncio.Future[None]] = None
+
+        # Monotonic time of the last command sent to the system, if any.
+        self.last_command: Optional[float] = None
 
         # Semantics here are somewhat odd.
         # True/False are obvious, None means "unknown".
@@ -46,6 +72,27 @@ class AqualinkSystem:
     def serial(self) -> str:
         return self.data["serial_number"]
 
+    @property
+    def tracer(self) -> AqualinkTracer:
+        return self.aqualink.tracer
+
+    @property
+    def is_active(self) -> bool:
+        """Whether equipment that warrants closer monitoring is running."""
+        return False
+
+    @property
+    def refresh_throttled(self) -> bool:
+        # Be nice to Aqualink servers since we rely on polling. The check uses
+        # a monotonic clock so that wall-clock jumps can't defeat it.
+        if self._refreshed_at is None:
+            return False
+        return time.monotonic() - self._refreshed_at < MIN_SECS_TO_REFRESH
+
+    def _mark_refreshed(self) -> None:
+        self._refreshed_at = time.monotonic()
+        self.last_refresh = int(time.time())
+
     @classmethod
     def from_data(
         cls, aqualink: AqualinkClient, data: Payload
@@ -57,10 +104,64 @@ class AqualinkSystem:
 
         return cls.subclasses[data["device_type"]](aqualink, data)
 
+    def _publish_changes(self, changes: List[AqualinkChange]) -> None:
+        if not changes:
+            return
+
+        self._emit_changes(changes)
+
+        by_device: Dict[str, List[AqualinkChange]] = {}
+        for change in changes:
+            device = self.devices.get(change.device)
+            if device is not None and device.has_change_subscribers:
+                by_device.setdefault(change.device, []).append(change)
+        for name, device_changes in by_device.items():
+            self.devices[name]._emit_changes(device_changes)
+
+        self.aqualink._emit_changes(changes)
+
     async def get_devices(self) -> Dict[str, AqualinkDevice]:
         if not self.devices:
             await self.update()
         return self.devices
 
+    @traced("iaqualink.update", lambda x: {"iaqualink.serial": x.serial})
     async def update(self) -> None:
+        if self.refresh_throttled:
+            delta = time.monotonic() - (self._refreshed_at or 0.0)
+            LOGGER.debug(f"Only {delta:.1f}s since last refresh.")
+            return
+
+        await self._refresh()
+
+    async def _refresh(self) -> None:
+        # Concurrent callers share a single in-flight refresh and all get its
+        # result or exception. Shielding keeps one caller's cancellation from
+        # aborting the refresh for everybody else.
+        if self._refresh_task is None:
+            self._refresh_task = asyncio.ensure_future(self._run_refresh())
+            self._refresh_task.add_done_callback(self._refresh_done)
+        await asyncio.shield(self._refresh_task)
+
+    async def _run_refresh(self) -> None:
+        # The slot is freed as soon as the refresh ends, not in a done
+        # callback one loop iteration later, so that callers arriving in
+        # between start a new refresh instead of getting a stale result.
+        start = time.perf_counter()
+        try:
+            await self._update()
+        finally:
+            self._refresh_task = None
+            metrics = self.aqualink.metrics
+            if metrics.enabled:
+                duration = time.perf_counter() - start
+                metrics.update(self.serial, duration)
+
+    @staticmethod
+    def _refresh_done(task: asyncio.Future[None]) -> None:
+        # Mark the exception as retrieved in case every caller went away.
+        if not task.cancelled():
+            task.exception()
+
+    async def _update(self) -> None:
         raise NotImplementedError
@@ -1,3 +1,3 @@
-from . import device, system
+from . import device, reconcile, schema, system
 
-__all__ = ["device", "system"]
+__all__ = ["device", "reconcile", "schema", "system"]
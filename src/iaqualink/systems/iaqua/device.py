@@ -2,7 +2,9 @@ from __future__ import annotations
 
 import logging
 from enum import Enum, unique
-from typing import TYPE_CHECKING, Dict, Optional, Type, cast
+from functools import lru_cache
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Dict, Mapping, Optional, Tuple, Type, cast
 
 from iaqualink.device import (
     AqualinkDevice,
@@ -11,7 +13,10 @@ from iaqualink.device import (
     AqualinkThermostat,
     AqualinkToggle,
 )
-from iaqualink.exception import AqualinkInvalidParameterException
+from iaqualink.exception import (
+    AqualinkDeviceNotFoundException,
+    AqualinkInvalidParameterException,
+)
 from iaqualink.typing import DeviceData
 
 if TYPE_CHECKING:
@@ -33,20 +38,37 @@ class AqualinkState(Enum):
 
 
 class IaquaDevice(AqualinkDevice):
+    __slots__ = ("_label",)
+
+    # Model name derived from the class name, set once per class.
+    _model = "Device"
+
+    @classmethod
+    def __init_subclass__(cls) -> None:
+        super().__init_subclass__()
+        cls._model = cls.__name__.replace("Iaqua", "")
+
     def __init__(self, system: IaquaSystem, data: DeviceData):
         super().__init__(system, data)
 
         # This silences mypy errors due to AqualinkDevice type annotations.
         self.system: IaquaSystem = system
 
+        # Formatted label along with the raw value it was derived from.
+        self._label: Optional[Tuple[str, Optional[str], str]] = None
+
     @property
     def label(self) -> str:
         if "label" in self.data:
-            label = self.data["label"]
-            return " ".join([x.capitalize() for x in label.split()])
+            raw, sep = self.data["label"], None
+        else:
+            raw, sep = self.data["name"], "_"
 
-        label = self.data["name"]
-        return " ".join([x.capitalize() for x in label.split("_")])
+        cached = self._label
+        if cached is None or cached[0] != raw or cached[1] != sep:
+            label = " ".join([x.capitalize() for x in raw.split(sep)])
+            cached = self._label = (raw, sep, label)
+        return cached[2]
 
     @property
     def state(self) -> str:
@@ -62,42 +84,22 @@ class IaquaDevice(AqualinkDevice):
 
     @property
     def model(self) -> str:
-        return self.__class__.__name__.replace("Iaqua", "")
+        return self._model
 
     @classmethod
     def from_data(cls, system: IaquaSystem, data: DeviceData) -> IaquaDevice:
-        class_: Type[IaquaDevice]
-
-        if data["name"].endswith("_heater"):
-            class_ = IaquaHeater
-        elif data["name"].endswith("_set_point"):
-            class_ = IaquaThermostat
-        elif data["name"].endswith("_pump"):
-            class_ = IaquaPump
-        elif data["name"] == "freeze_protection":
-            class_ = IaquaBinarySensor
-        elif data["name"].startswith("aux_"):
-            if data["type"] == "2":
-                class_ = light_subtype_to_class[data["subtype"]]
-            elif data["type"] == "1":
-                class_ = IaquaDimmableLight
-            elif "LIGHT" in data["label"]:
-                class_ = IaquaLightToggle
-            else:
-                class_ = IaquaAuxToggle
-        else:
-            class_ = IaquaSensor
-
-        return class_(system, data)
+        return iaqua_device_class(data)(system, data)
 
 
 class IaquaSensor(IaquaDevice, AqualinkSensor):
-    pass
+    __slots__ = ()
 
 
 class IaquaBinarySensor(IaquaSensor):
     """These are non-actionable sensors, essentially read-only on/off."""
 
+    __slots__ = ()
+
     @property
     def is_on(self) -> bool:
         return (
@@ -109,16 +111,48 @@ class IaquaBinarySensor(IaquaSensor):
 
 
 class IaquaThermostat(IaquaDevice, AqualinkThermostat):
-    @property
-    def _type(self) -> str:
-        return self.name.split("_")[0]
+    __slots__ = (
+        "_type",
+        "_linked",
+        "_temperature_key",
+        "_sensor_device",
+        "_heater_device",
+    )
+
+    def __init__(self, system: IaquaSystem, data: DeviceData):
+        super().__init__(system, data)
+
+        self._type = self.name.split("_")[0]
+
+        # Partner devices, resolved by the system through link() whenever
+        # its set of devices changes.
+        self._linked = False
+        self._temperature_key = "temp1"
+        self._sensor_device: Optional[IaquaSensor] = None
+        self._heater_device: Optional[IaquaHeater] = None
+
+    def link(self, devices: Mapping[str, AqualinkDevice]) -> None:
+        sensor = devices.get(f"{self._type}_temp")
+        heater = devices.get(f"{self._type}_heater")
+        self._sensor_device = cast(Optional[IaquaSensor], sensor)
+        self._heater_device = cast(Optional[IaquaHeater], heater)
+
+        # Spa takes precedence for temp1 if present.
+        if self._type == "pool" and "spa_set_point" in devices:
+            self._temperature_key = "temp2"
+        else:
+            self._temperature_key = "temp1"
+        self._linked = True
+
+    def _ensure_linked(self) -> None:
+        # Thermostats not created by a system merge link on first use.
+        if not self._linked:
+            self.link(self.system.devices)
 
     @property
     def _temperature(self) -> str:
-        # Spa takes precedence for temp1 if present.
-        if self._type == "pool" and "spa_set_point" in self.system.devices:
-            return "temp2"
-        return "temp1"
+        self._ensure_linked()
+        return self._temperature_key
 
     @property
     def unit(self) -> str:
@@ -126,7 +160,11 @@ class IaquaThermostat(IaquaDevice, AqualinkThermostat):
 
     @property
     def _sensor(self) -> IaquaSensor:
-        return cast(IaquaSensor, self.system.devices[f"{self._type}_temp"])
+        self._ensure_linked()
+        if self._sensor_device is None:
+            msg = f"No {self._type}_temp sensor found for {self.name}."
+            raise AqualinkDeviceNotFoundException(msg)
+        return self._sensor_device
 
     @property
     def current_temperature(self) -> str:
@@ -163,7 +201,11 @@ class IaquaThermostat(IaquaDevice, AqualinkThermostat):
 
     @property
     def _heater(self) -> IaquaHeater:
-        return cast(IaquaHeater, self.system.devices[f"{self._type}_heater"])
+        self._ensure_linked()
+        if self._heater_device is None:
+            msg = f"No {self._type}_heater found for {self.name}."
+            raise AqualinkDeviceNotFoundException(msg)
+        return self._heater_device
 
     @property
     def is_on(self) -> bool:
@@ -174,6 +216,8 @@ class IaquaThermostat(IaquaDevice, AqualinkThermostat):
 
 
 class IaquaToggle(IaquaDevice, AqualinkToggle):
+    __slots__ = ()
+
     @property
     def is_on(self) -> bool:
         return (
@@ -188,25 +232,33 @@ class IaquaToggle(IaquaDevice, AqualinkToggle):
 
 
 class IaquaPump(IaquaToggle):
+    __slots__ = ()
+
     async def toggle(self) -> None:
         await self.system.set_pump(f"set_{self.name}")
 
 
 class IaquaHeater(IaquaToggle):
+    __slots__ = ()
+
     async def toggle(self) -> None:
         await self.system.set_heater(f"set_{self.name}")
 
 
 class IaquaAuxToggle(IaquaToggle):
+    __slots__ = ()
+
     async def toggle(self) -> None:
         await self.system.set_aux(self.data["aux"])
 
 
 class IaquaLightToggle(IaquaAuxToggle, AqualinkLight):
-    pass
+    __slots__ = ()
 
 
 class IaquaDimmableLight(IaquaDevice, AqualinkLight):
+    __slots__ = ()
+
     @property
     def is_on(self) -> bool:
         return self.brightness != 0
@@ -235,6 +287,10 @@ class IaquaDimmableLight(IaquaDevice, AqualinkLight):
 
 
 class IaquaColorLight(IaquaDevice, AqualinkLight):
+    __slots__ = ()
+
+    _effects: Optional[Mapping[str, int]] = None
+
     @property
     def is_on(self) -> bool:
         return self.effect != "0"
@@ -267,13 +323,16 @@ class IaquaColorLight(IaquaDevice, AqualinkLight):
         return "On" if self.is_on else "Off"
 
     @property
-    def supported_effects(self) -> Dict[str, int]:
-        raise NotImplementedError
+    def supported_effects(self) -> Mapping[str, int]:
+        # Effects are constant per light model and shared by all instances.
+        if self._effects is None:
+            raise NotImplementedError
+        return self._effects
 
     async def set_effect_by_name(self, effect: str) -> None:
         try:
             effect_id = self.supported_effects[effect]
-        except IndexError as e:
+        except KeyError as e:
             msg = f"{repr(effect)} isn't a valid effect."
             raise AqualinkInvalidParameterException(msg) from e
         await self.set_effect_by_id(effect_id)
@@ -288,17 +347,10 @@ class IaquaColorLight(IaquaDevice, AqualinkLight):
 
 
 class IaquaColorLightJC(IaquaColorLight):
-    @property
-    def manufacturer(self) -> str:
-        return "Jandy"
-
-    @property
-    def model(self) -> str:
-        return "Colors Light"
+    __slots__ = ()
 
-    @property
-    def supported_effects(self) -> Dict[str, int]:
-        return {
+    _effects = MappingProxyType(
+        {
             "Off": 0,
             "Alpine White": 1,
             "Sky Blue": 2,
@@ -312,20 +364,22 @@ class IaquaColorLightJC(IaquaColorLight):
             "Violet": 10,
             "Color Splash": 11,
         }
+    )
 
-
-class IaquaColorLightSL(IaquaColorLight):
     @property
     def manufacturer(self) -> str:
-        return "Pentair"
+        return "Jandy"
 
     @property
     def model(self) -> str:
-        return "SAm/SAL Light"
+        return "Colors Light"
 
-    @property
-    def supported_effects(self) -> Dict[str, int]:
-        return {
+
+class IaquaColorLightSL(IaquaColorLight):
+    __slots__ = ()
+
+    _effects = MappingProxyType(
+        {
             "Off": 0,
             "White": 1,
             "Light Green": 2,
@@ -337,20 +391,22 @@ class IaquaColorLightSL(IaquaColorLight):
             "Light Magenta": 8,
             "Color Splash": 9,
         }
+    )
 
-
-class IaquaColorLightJL(IaquaColorLight):
     @property
     def manufacturer(self) -> str:
-        return "Jandy"
+        return "Pentair"
 
     @property
     def model(self) -> str:
-        return "LED WaterColors Light"
+        return "SAm/SAL Light"
 
-    @property
-    def supported_effects(self) -> Dict[str, int]:
-        return {
+
+class IaquaColorLightJL(IaquaColorLight):
+    __slots__ = ()
+
+    _effects = MappingProxyType(
+        {
             "Off": 0,
             "Alpine White": 1,
             "Sky Blue": 2,
@@ -367,20 +423,22 @@ class IaquaColorLightJL(IaquaColorLight):
             "Fat Tuesday": 13,
             "Disco Tech": 14,
         }
+    )
 
-
-class IaquaColorLightIB(IaquaColorLight):
     @property
     def manufacturer(self) -> str:
-        return "Pentair"
+        return "Jandy"
 
     @property
     def model(self) -> str:
-        return "Intellibrite Light"
+        return "LED WaterColors Light"
 
-    @property
-    def supported_effects(self) -> Dict[str, int]:
-        return {
+
+class IaquaColorLightIB(IaquaColorLight):
+    __slots__ = ()
+
+    _effects = MappingProxyType(
+        {
             "Off": 0,
             "SAm": 1,
             "Party": 2,
@@ -395,20 +453,22 @@ class IaquaColorLightIB(IaquaColorLight):
             "White": 11,
             "Magenta": 12,
         }
+    )
 
-
-class IaquaColorLightHU(IaquaColorLight):
     @property
     def manufacturer(self) -> str:
-        return "Hayward"
+        return "Pentair"
 
     @property
     def model(self) -> str:
-        return "Universal Light"
+        return "Intellibrite Light"
 
-    @property
-    def supported_effects(self) -> Dict[str, int]:
-        return {
+
+class IaquaColorLightHU(IaquaColorLight):
+    __slots__ = ()
+
+    _effects = MappingProxyType(
+        {
             "Off": 0,
             "Voodoo Lounge": 1,
             "Deep Blue Sea": 2,
@@ -426,6 +486,15 @@ class IaquaColorLightHU(IaquaColorLight):
             "Gemstone": 14,
             "USA": 15,
         }
+    )
+
+    @property
+    def manufacturer(self) -> str:
+        return "Hayward"
+
+    @property
+    def model(self) -> str:
+        return "Universal Light"
 
 
 light_subtype_to_class = {
@@ -435,3 +504,57 @@ light_subtype_to_class = {
     "5": IaquaColorLightIB,
     "6": IaquaColorLightHU,
 }
+
+# Classification tables. Home screen devices are classified by name alone,
+# aux devices by their type, subtype and label.
+name_suffix_to_class: Tuple[Tuple[str, Type[IaquaDevice]], ...] = (
+    ("_heater", IaquaHeater),
+    ("_set_point", IaquaThermostat),
+    ("_pump", IaquaPump),
+)
+
+name_to_class: Dict[str, Type[IaquaDevice]] = {
+    "freeze_protection": IaquaBinarySensor,
+}
+
+# Fields which, when changed, may call for a different device class.
+IAQUA_CLASS_FIELDS = frozenset(["type", "subtype", "label"])
+
+
+def iaqua_device_class(data: DeviceData) -> Type[IaquaDevice]:
+    # Only the parts of the data that matter for classification go into
+    # the cache key so that it stays small across a whole fleet.
+    class_ = _classify_by_name(data["name"])
+    if class_ is not None:
+        return class_
+
+    type_ = data["type"]
+    subtype = data["subtype"] if type_ == "2" else None
+    is_light = type_ not in ("1", "2") and "LIGHT" in data["label"]
+    return _classify_aux(type_, subtype, is_light)
+
+
+@lru_cache(maxsize=None)
+def _classify_by_name(name: str) -> Optional[Type[IaquaDevice]]:
+    # None means an aux device, whose class depends on more than its name.
+    for suffix, class_ in name_suffix_to_class:
+        if name.endswith(suffix):
+            return class_
+    if name in name_to_class:
+        return name_to_class[name]
+    if name.startswith("aux_"):
+        return None
+    return IaquaSensor
+
+
+@lru_cache(maxsize=None)
+def _classify_aux(
+    type_: str, subtype: Optional[str], is_light: bool
+) -> Type[IaquaDevice]:
+    if type_ == "2":
+        return light_subtype_to_class[cast(str, subtype)]
+    if type_ == "1":
+        return IaquaDimmableLight
+    if is_light:
+        return IaquaLightToggle
+    return IaquaAuxToggle
@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+from enum import IntEnum, unique
+from typing import Any, List, Mapping, NamedTuple, Union
+
+from iaqualink.device import (
+    AqualinkDevice,
+    AqualinkLight,
+    AqualinkThermostat,
+    AqualinkToggle,
+)
+from iaqualink.exception import (
+    AqualinkDeviceNotFoundException,
+    AqualinkInvalidParameterException,
+)
+from iaqualink.systems.iaqua.device import (
+    IaquaColorLight,
+    IaquaDimmableLight,
+    IaquaHeater,
+    IaquaPump,
+    IaquaThermostat,
+    IaquaToggle,
+)
+
+DesiredValue = Union[bool, int, str]
+DesiredState = Mapping[str, DesiredValue]
+
+
+@unique
+class IaquaCommandPhase(IntEnum):
+    """Order in which planned commands are sent.
+
+    Heaters are turned off before anything else and only turned back on
+    once pumps are running, pumps are only turned off at the very end.
+    """
+
+    HEATERS_OFF = 0
+    PUMPS_ON = 1
+    SETPOINTS = 2
+    AUX = 3
+    HEATERS_ON = 4
+    PUMPS_OFF = 5
+
+
+class IaquaCommandStep(NamedTuple):
+    phase: IaquaCommandPhase
+    device: str
+    field: str
+    old: Any
+    new: Any
+
+
+def _toggle_phase(device: AqualinkDevice, on: bool) -> IaquaCommandPhase:
+    if isinstance(device, IaquaHeater):
+        return (
+            IaquaCommandPhase.HEATERS_ON
+            if on
+            else IaquaCommandPhase.HEATERS_OFF
+        )
+    if isinstance(device, IaquaPump):
+        return IaquaCommandPhase.PUMPS_ON if on else IaquaCommandPhase.PUMPS_OFF
+    return IaquaCommandPhase.AUX
+
+
+def _invalid(
+    name: str, value: DesiredValue
+) -> AqualinkInvalidParameterException:
+    msg = f"{value!r} isn't a valid target state for {name}."
+    return AqualinkInvalidParameterException(msg)
+
+
+def _plan_device(
+    name: str, device: AqualinkDevice, value: DesiredValue
+) -> List[IaquaCommandStep]:
+    # Any device with an on/off state accepts a bool.
+    if isinstance(value, bool):
+        if not isinstance(
+            device, (IaquaToggle, IaquaDimmableLight, IaquaColorLight)
+        ):
+            raise _invalid(name, value)
+        if device.is_on == value:
+            return []
+        phase = _toggle_phase(device, value)
+        return [IaquaCommandStep(phase, name, "is_on", device.is_on, value)]
+
+    if isinstance(device, IaquaThermostat) and isinstance(value, int):
+        low, high = device.min_temperature, device.max_temperature
+        if value not in range(low, high + 1):
+            raise _invalid(name, value)
+        target = device.target_temperature
+        if target == str(value):
+            return []
+        phase = IaquaCommandPhase.SETPOINTS
+        field = "target_temperature"
+        return [IaquaCommandStep(phase, name, field, target, value)]
+
+    if isinstance(device, IaquaDimmableLight) and isinstance(value, int):
+        if value not in (0, 25, 50, 75, 100):
+            raise _invalid(name, value)
+        brightness = device.brightness
+        if brightness == value:
+            return []
+        phase = IaquaCommandPhase.AUX
+        return [IaquaCommandStep(phase, name, "brightness", brightness, value)]
+
+    if isinstance(device, IaquaColorLight) and isinstance(value, (int, str)):
+        if isinstance(value, str):
+            if value not in device.supported_effects:
+                raise _invalid(name, value)
+            value = device.supported_effects[value]
+        elif value not in device.supported_effects.values():
+            raise _invalid(name, value)
+        # The current effect isn't reported, only whether the light is on,
+        # so an effect is only known to be in place when turning it off.
+        if value == 0 and not device.is_on:
+            return []
+        phase = IaquaCommandPhase.AUX
+        return [IaquaCommandStep(phase, name, "effect", device.effect, value)]
+
+    raise _invalid(name, value)
+
+
+def plan_commands(
+    devices: Mapping[str, AqualinkDevice], desired: DesiredState
+) -> List[IaquaCommandStep]:
+    """Return the commands needed to go from devices to the desired state.
+
+    The whole desired state is validated before anything is returned.
+    """
+    steps: List[IaquaCommandStep] = []
+    for name, value in desired.items():
+        if name not in devices:
+            raise AqualinkDeviceNotFoundException(f"No device named {name}.")
+        steps += _plan_device(name, devices[name], value)
+
+    # Sorting is stable, steps keep the caller's order within a phase.
+    return sorted(steps, key=lambda x: x.phase)
+
+
+async def apply_step(device: AqualinkDevice, step: IaquaCommandStep) -> None:
+    if step.field == "target_temperature" and isinstance(
+        device, AqualinkThermostat
+    ):
+        await device.set_temperature(step.new)
+    elif step.field == "brightness" and isinstance(device, AqualinkLight):
+        await device.set_brightness(step.new)
+    elif step.field == "effect" and isinstance(device, AqualinkLight):
+        await device.set_effect_by_id(step.new)
+    elif step.field == "is_on" and isinstance(
+        device, (AqualinkToggle, AqualinkLight)
+    ):
+        if step.new:
+            await device.turn_on()
+        else:
+            await device.turn_off()
+    else:
+        msg = f"Can't apply {step.field} to {step.device}."
+        raise AqualinkInvalidParameterException(msg)
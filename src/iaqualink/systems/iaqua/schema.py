@@ -0,0 +1,216 @@
+from __future__ import annotations
+
+import sys
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    MutableMapping,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Union,
+)
+
+IAQUA_STATUS_OFFLINE = "Offline"
+
+# Position of fixed entries in the screens returned by the session API.
+IAQUA_HOME_STATUS = 0
+IAQUA_HOME_TEMP_SCALE = 3
+IAQUA_HOME_DEVICES = 4
+IAQUA_DEVICES_STATUS = 0
+IAQUA_DEVICES_DEVICES = 3
+
+# Fields returned for devices on either screen, in the order they come in.
+IAQUA_DEVICE_FIELDS = (
+    "aux",
+    "name",
+    "state",
+    "label",
+    "icon",
+    "type",
+    "subtype",
+)
+
+DeviceFields = Tuple[Tuple[str, str], ...]
+
+# Device entry names, in screen order, as learned from a previous response.
+IaquaHomeLayout = Tuple[str, ...]
+# Same for the devices screen, with the attribute key of each entry item.
+IaquaDevicesLayout = Tuple[Tuple[str, Tuple[str, ...]], ...]
+
+
+class IaquaDeviceRecord(NamedTuple):
+    name: str
+    fields: DeviceFields
+
+    def as_dict(self) -> Dict[str, str]:
+        return dict(self.fields)
+
+
+class IaquaDeviceData(MutableMapping[str, str]):
+    """Device data mapping with a fixed slot per known field.
+
+    Behaves like the dict it replaces, but known fields don't carry a key
+    string and a hash table entry each, and string values are interned.
+    Any other key goes to a regular dict, only created when needed.
+    """
+
+    __slots__ = tuple(f"_{x}" for x in IAQUA_DEVICE_FIELDS) + ("_extra",)
+
+    def __init__(
+        self,
+        data: Union[Mapping[str, str], Iterable[Tuple[str, str]]] = (),
+    ):
+        self._extra: Optional[Dict[str, str]] = None
+        items = data.items() if isinstance(data, Mapping) else data
+        for k, v in items:
+            self[k] = v
+
+    def __getitem__(self, key: str) -> str:
+        slot = _DEVICE_DATA_SLOTS.get(key)
+        if slot is not None:
+            try:
+                return slot.__get__(self)  # type: ignore[no-any-return]
+            except AttributeError:
+                raise KeyError(key) from None
+        if self._extra is None:
+            raise KeyError(key)
+        return self._extra[key]
+
+    def __setitem__(self, key: str, value: str) -> None:
+        # The same handful of values show up across devices and systems.
+        if type(value) is str:
+            value = sys.intern(value)
+        slot = _DEVICE_DATA_SLOTS.get(key)
+        if slot is not None:
+            slot.__set__(self, value)
+            return
+        if self._extra is None:
+            self._extra = {}
+        self._extra[sys.intern(key)] = value
+
+    def __delitem__(self, key: str) -> None:
+        slot = _DEVICE_DATA_SLOTS.get(key)
+        if slot is not None:
+            try:
+                slot.__delete__(self)
+            except AttributeError:
+                raise KeyError(key) from None
+            return
+        if self._extra is None:
+            raise KeyError(key)
+        del self._extra[key]
+        if not self._extra:
+            self._extra = None
+
+    def __iter__(self) -> Iterator[str]:
+        for key, slot in _DEVICE_DATA_SLOTS.items():
+            try:
+                slot.__get__(self)
+            except AttributeError:
+                continue
+            yield key
+        if self._extra is not None:
+            yield from self._extra
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __repr__(self) -> str:
+        return repr(dict(self))
+
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+
+_DEVICE_DATA_SLOTS: Dict[str, Any] = {
+    x: getattr(IaquaDeviceData, f"_{x}") for x in IAQUA_DEVICE_FIELDS
+}
+
+
+class IaquaHomeScreen(NamedTuple):
+    status: str
+    temp_scale: str
+    devices: Tuple[IaquaDeviceRecord, ...]
+
+    @property
+    def offline(self) -> bool:
+        return self.status == IAQUA_STATUS_OFFLINE
+
+
+class IaquaDevicesScreen(NamedTuple):
+    status: str
+    devices: Tuple[IaquaDeviceRecord, ...]
+
+    @property
+    def offline(self) -> bool:
+        return self.status == IAQUA_STATUS_OFFLINE
+
+
+def _first_item(entry: Dict[str, Any]) -> Tuple[str, Any]:
+    return next(iter(entry.items()))
+
+
+def decode_home_screen(payload: Dict[str, Any]) -> IaquaHomeScreen:
+    screen: List[Dict[str, Any]] = payload["home_screen"]
+
+    status = screen[IAQUA_HOME_STATUS]["status"]
+    if status == IAQUA_STATUS_OFFLINE:
+        return IaquaHomeScreen(status, "", ())
+
+    devices = []
+    for entry in screen[IAQUA_HOME_DEVICES:]:
+        name, state = _first_item(entry)
+        fields = (("name", name), ("state", state))
+        devices.append(IaquaDeviceRecord(name, fields))
+
+    temp_scale = screen[IAQUA_HOME_TEMP_SCALE]["temp_scale"]
+    return IaquaHomeScreen(status, temp_scale, tuple(devices))
+
+
+def decode_devices_screen(payload: Dict[str, Any]) -> IaquaDevicesScreen:
+    screen: List[Dict[str, Any]] = payload["devices_screen"]
+
+    status = screen[IAQUA_DEVICES_STATUS]["status"]
+    if status == IAQUA_STATUS_OFFLINE:
+        return IaquaDevicesScreen(status, ())
+
+    devices = []
+    for entry in screen[IAQUA_DEVICES_DEVICES:]:
+        name, attrs = _first_item(entry)
+        fields = [("aux", name.replace("aux_", "")), ("name", name)]
+        for attr in attrs:
+            fields.extend(attr.items())
+        devices.append(IaquaDeviceRecord(name, tuple(fields)))
+
+    return IaquaDevicesScreen(status, tuple(devices))
+
+
+def home_screen_layout(payload: Dict[str, Any]) -> IaquaHomeLayout:
+    screen: List[Dict[str, Any]] = payload["home_screen"]
+    return tuple(_first_item(x)[0] for x in screen[IAQUA_HOME_DEVICES:])
+
+
+def devices_screen_layout(
+    payload: Dict[str, Any],
+) -> Optional[IaquaDevicesLayout]:
+    # Only screens where every attribute item holds a single key can be
+    # walked positionally, anything else always goes through the decoder.
+    screen: List[Dict[str, Any]] = payload["devices_screen"]
+
+    layout = []
+    for entry in screen[IAQUA_DEVICES_DEVICES:]:
+        name, attrs = _first_item(entry)
+        if any(len(x) != 1 for x in attrs):
+            return None
+        keys = tuple(_first_item(x)[0] for x in attrs)
+        layout.append((name, keys))
+
+    return tuple(layout)
@@ -1,18 +1,74 @@
 from __future__ import annotations
 
+import asyncio
+import functools
+import hashlib
 import logging
 import time
-from typing import TYPE_CHECKING, Optional
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Hashable,
+    Iterable,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    TypeVar,
+)
 
 import httpx
 
-from iaqualink.const import MIN_SECS_TO_REFRESH
+from iaqualink.codec import loads
+from iaqualink.commands import AqualinkCommandQueue, CommandSender
+from iaqualink.const import (
+    COMMAND_COALESCE_WINDOW,
+    OPTIMISTIC_CONFIRM_INTERVAL,
+    OPTIMISTIC_CONFIRM_TIMEOUT,
+)
+from iaqualink.events import AqualinkChange
 from iaqualink.exception import (
+    AqualinkCommandNotConfirmedException,
     AqualinkServiceException,
     AqualinkSystemOfflineException,
 )
+from iaqualink.ratelimit import RequestPriority
 from iaqualink.system import AqualinkSystem
-from iaqualink.systems.iaqua.device import IaquaDevice
+from iaqualink.systems.iaqua.device import (
+    IAQUA_CLASS_FIELDS,
+    AqualinkState,
+    IaquaDevice,
+    IaquaHeater,
+    IaquaPump,
+    IaquaThermostat,
+    iaqua_device_class,
+)
+from iaqualink.systems.iaqua.reconcile import (
+    DesiredState,
+    IaquaCommandStep,
+    apply_step,
+    plan_commands,
+)
+from iaqualink.systems.iaqua.schema import (
+    IAQUA_DEVICES_DEVICES,
+    IAQUA_DEVICES_STATUS,
+    IAQUA_HOME_DEVICES,
+    IAQUA_HOME_STATUS,
+    IAQUA_HOME_TEMP_SCALE,
+    IAQUA_STATUS_OFFLINE,
+    IaquaDeviceData,
+    IaquaDeviceRecord,
+    IaquaDevicesLayout,
+    IaquaHomeLayout,
+    decode_devices_screen,
+    decode_home_screen,
+    devices_screen_layout,
+    home_screen_layout,
+)
+from iaqualink.tracing import traced
 from iaqualink.typing import Payload
 
 if TYPE_CHECKING:
@@ -33,27 +89,154 @@ IAQUA_COMMAND_SET_SPA_HEATER = "set_spa_heater"
 IAQUA_COMMAND_SET_SPA_PUMP = "set_spa_pump"
 IAQUA_COMMAND_SET_TEMPS = "set_temps"
 
+IAQUA_HOME_SCREEN = "home_screen"
+IAQUA_DEVICES_SCREEN = "devices_screen"
 
 LOGGER = logging.getLogger("iaqualink")
 
 
+def _fingerprint(content: bytes) -> bytes:
+    return hashlib.blake2b(content, digest_size=16).digest()
+
+
+ResponseParser = Callable[["IaquaSystem", httpx.Response], None]
+AsyncCommand = TypeVar("AsyncCommand", bound=Callable[..., Awaitable[None]])
+
+
+def _instrumented(screen: str) -> Callable[[ResponseParser], ResponseParser]:
+    # Reports how long parsing a screen takes to metrics and the loop
+    # monitor when enabled, and traces it when tracing is.
+    def decorator(func: ResponseParser) -> ResponseParser:
+        section = func.__name__
+
+        @functools.wraps(func)
+        def wrapper(self: IaquaSystem, response: httpx.Response) -> None:
+            metrics = self.aqualink.metrics
+            tracer = self.aqualink.tracer
+            monitor = self.aqualink.loop_monitor
+            if not metrics.enabled and not tracer.enabled and monitor is None:
+                return func(self, response)
+            attributes = {
+                "iaqualink.serial": self.serial,
+                "iaqualink.screen": screen,
+            }
+            with tracer.span("iaqualink.parse", attributes):
+                start = time.perf_counter()
+                try:
+                    func(self, response)
+                finally:
+                    duration = time.perf_counter() - start
+                    if metrics.enabled:
+                        metrics.parse(self.serial, screen, duration)
+                    if monitor is not None:
+                        monitor.section(section, self.serial, duration)
+
+        return wrapper
+
+    return decorator
+
+
+def _traced_command(func: AsyncCommand) -> AsyncCommand:
+    def attributes(
+        system: IaquaSystem, *args: Any, **kwargs: Any
+    ) -> Dict[str, str]:
+        return {
+            "iaqualink.serial": system.serial,
+            "iaqualink.command": func.__name__,
+        }
+
+    return traced("iaqualink.command", attributes)(func)
+
+
+def _is_on(state: Optional[str]) -> bool:
+    return state in (AqualinkState.ON.value, AqualinkState.ENABLED.value)
+
+
+class _PendingState:
+    # State of a device toggled optimistically until the system confirms it.
+    # Rolling back restores the last state the system reported.
+    __slots__ = ("screen", "expected", "reported", "deadline", "confirmed")
+
+    def __init__(
+        self,
+        screen: str,
+        reported: str,
+        confirmed: asyncio.Future[None],
+    ):
+        self.screen = screen
+        self.expected = reported
+        self.reported = reported
+        self.deadline = 0.0
+        self.confirmed = confirmed
+
+
 class IaquaSystem(AqualinkSystem):
     NAME = "iaqua"
 
+    __slots__ = (
+        "temp_unit",
+        "_home_layout",
+        "_devices_layout",
+        "_fingerprints",
+        "fingerprint_hits",
+        "fingerprint_misses",
+        "command_window",
+        "_commands",
+        "optimistic",
+        "confirm_interval",
+        "confirm_timeout",
+        "_pending",
+        "_confirm_task",
+    )
+
     def __init__(self, aqualink: AqualinkClient, data: Payload):
         super().__init__(aqualink, data)
 
         self.temp_unit: str = ""
 
+        # Screen layouts learned from the last full decode, used to merge
+        # later responses in place.
+        self._home_layout: Optional[IaquaHomeLayout] = None
+        self._devices_layout: Optional[IaquaDevicesLayout] = None
+
+        # Digest of the last response body merged for each screen. A poll
+        # returning the exact same body is skipped altogether.
+        self._fingerprints: Dict[str, bytes] = {}
+        self.fingerprint_hits = 0
+        self.fingerprint_misses = 0
+
+        # Commands sent within this many seconds of each other are
+        # coalesced, see AqualinkCommandQueue.
+        self.command_window = COMMAND_COALESCE_WINDOW
+        self._commands: Optional[AqualinkCommandQueue] = None
+
+        # With optimistic updates, toggles change the local state right away
+        # and it's held until the system confirms it or the timeout expires.
+        self.optimistic = False
+        self.confirm_interval = OPTIMISTIC_CONFIRM_INTERVAL
+        self.confirm_timeout = OPTIMISTIC_CONFIRM_TIMEOUT
+        self._pending: Dict[str, _PendingState] = {}
+        self._confirm_task: Optional[asyncio.Future[None]] = None
+
     def __repr__(self) -> str:
         attrs = ["name", "serial", "data"]
         attrs = ["%s=%r" % (i, getattr(self, i)) for i in attrs]
         return f'{self.__class__.__name__}({" ".join(attrs)})'
 
+    @property
+    def is_active(self) -> bool:
+        return any(
+            x.is_on
+            for x in self.devices.values()
+            if isinstance(x, (IaquaPump, IaquaHeater))
+        )
+
     async def _send_session_request(
         self,
         command: str,
         params: Optional[Payload] = None,
+        idempotent: bool = True,
+        priority: RequestPriority = RequestPriority.POLL,
     ) -> httpx.Response:
         if not params:
             params = {}
@@ -63,12 +246,30 @@ class IaquaSystem(AqualinkSystem):
                 "actionID": "command",
                 "command": command,
                 "serial": self.serial,
-                "sessionID": self.aqualink.client_id,
             }
         )
-        params_str = "&".join(f"{k}={v}" for k, v in params.items())
-        url = f"{IAQUA_SESSION_URL}?{params_str}"
-        return await self.aqualink.send_request(url)
+
+        # The session ID is looked up on every attempt so that a request
+        # replayed after an expired session uses the renewed one.
+        def build_url() -> str:
+            params["sessionID"] = self.aqualink.client_id
+            params_str = "&".join(f"{k}={v}" for k, v in params.items())
+            return f"{IAQUA_SESSION_URL}?{params_str}"
+
+        return await self.aqualink.send_authenticated_request(
+            build_url, idempotent=idempotent, priority=priority
+        )
+
+    async def _send_command_request(
+        self,
+        command: str,
+        params: Optional[Payload] = None,
+        idempotent: bool = True,
+    ) -> httpx.Response:
+        self.last_command = time.monotonic()
+        return await self._send_session_request(
+            command, params, idempotent, RequestPriority.COMMAND
+        )
 
     async def _send_home_screen_request(self) -> httpx.Response:
         r = await self._send_session_request(IAQUA_COMMAND_GET_HOME)
@@ -78,99 +279,460 @@ class IaquaSystem(AqualinkSystem):
         r = await self._send_session_request(IAQUA_COMMAND_GET_DEVICES)
         return r
 
-    async def update(self) -> None:
-        # Be nice to Aqualink servers since we rely on polling.
-        now = int(time.time())
-        delta = now - self.last_refresh
-        if delta < MIN_SECS_TO_REFRESH:
-            LOGGER.debug(f"Only {delta}s since last refresh.")
-            return
-
+    async def _update(self) -> None:
+        # Both screens are requested at once over the shared connection and
+        # each response is parsed as soon as it comes back. A service error
+        # on either request still takes precedence over an offline status.
+        parsers = {
+            asyncio.ensure_future(
+                self._send_home_screen_request()
+            ): self._parse_home_response,
+            asyncio.ensure_future(
+                self._send_devices_screen_request()
+            ): self._parse_devices_response,
+        }
+        offline: Optional[AqualinkSystemOfflineException] = None
+
+        pending = set(parsers)
         try:
-            r1 = await self._send_home_screen_request()
-            r2 = await self._send_devices_screen_request()
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                # Walk completed tasks in request order to keep error
+                # precedence deterministic.
+                for task in [x for x in parsers if x in done]:
+                    r = task.result()
+                    if offline is not None:
+                        continue
+                    try:
+                        parsers[task](r)
+                    except AqualinkSystemOfflineException as e:
+                        offline = e
         except AqualinkServiceException:
             self.online = None
             raise
+        finally:
+            for task in pending:
+                task.cancel()
+            # Make sure no request outlives this call unobserved.
+            await asyncio.gather(*parsers, return_exceptions=True)
 
-        try:
-            self._parse_home_response(r1)
-            self._parse_devices_response(r2)
-        except AqualinkSystemOfflineException:
+        if offline is not None:
             self.online = False
-            raise
+            raise offline
 
         self.online = True
-        self.last_refresh = int(time.time())
+        self._mark_refreshed()
 
+    def _fingerprint_unchanged(self, screen: str, digest: bytes) -> bool:
+        if self._fingerprints.get(screen) == digest:
+            self.fingerprint_hits += 1
+            return True
+        self.fingerprint_misses += 1
+        return False
+
+    @_instrumented(IAQUA_HOME_SCREEN)
     def _parse_home_response(self, response: httpx.Response) -> None:
-        data = response.json()
+        digest = _fingerprint(response.content)
+        if self._fingerprint_unchanged(IAQUA_HOME_SCREEN, digest):
+            return
 
-        LOGGER.debug(f"Home response: {data}")
+        self.aqualink.payload_log.log(
+            self.serial, "Home response", response.content
+        )
+        data = loads(response.content)
 
-        if data["home_screen"][0]["status"] == "Offline":
+        status = data["home_screen"][IAQUA_HOME_STATUS]["status"]
+        if status == IAQUA_STATUS_OFFLINE:
             LOGGER.warning(f"Status for system {self.serial} is Offline.")
             raise AqualinkSystemOfflineException
 
-        self.temp_unit = data["home_screen"][3]["temp_scale"]
-
-        # Make the data a bit flatter.
-        devices = {}
-        for x in data["home_screen"][4:]:
-            name = list(x.keys())[0]
-            state = list(x.values())[0]
-            attrs = {"name": name, "state": state}
-            devices.update({name: attrs})
+        changes: List[AqualinkChange] = []
+        if not self._merge_home_in_place(data, changes):
+            screen = decode_home_screen(data)
+            self.temp_unit = screen.temp_scale
+            self._merge_devices(screen.devices, changes)
+            self._home_layout = home_screen_layout(data)
 
-        for k, v in devices.items():
-            if k in self.devices:
-                for dk, dv in v.items():
-                    self.devices[k].data[dk] = dv
-            else:
-                self.devices[k] = IaquaDevice.from_data(self, v)
+        if self._pending:
+            changes = self._reconcile_pending(IAQUA_HOME_SCREEN, changes)
+        self._fingerprints[IAQUA_HOME_SCREEN] = digest
+        self._publish_changes(changes)
 
+    @_instrumented(IAQUA_DEVICES_SCREEN)
     def _parse_devices_response(self, response: httpx.Response) -> None:
-        data = response.json()
+        digest = _fingerprint(response.content)
+        if self._fingerprint_unchanged(IAQUA_DEVICES_SCREEN, digest):
+            return
 
-        LOGGER.debug(f"Devices response: {data}")
+        self.aqualink.payload_log.log(
+            self.serial, "Devices response", response.content
+        )
+        data = loads(response.content)
 
-        if data["devices_screen"][0]["status"] == "Offline":
+        status = data["devices_screen"][IAQUA_DEVICES_STATUS]["status"]
+        if status == IAQUA_STATUS_OFFLINE:
             LOGGER.warning(f"Status for system {self.serial} is Offline.")
             raise AqualinkSystemOfflineException
 
-        # Make the data a bit flatter.
-        devices = {}
-        for x in data["devices_screen"][3:]:
-            aux = list(x.keys())[0]
-            attrs = {"aux": aux.replace("aux_", ""), "name": aux}
-            for y in list(x.values())[0]:
-                attrs.update(y)
-            devices.update({aux: attrs})
-
-        for k, v in devices.items():
-            if k in self.devices:
-                for dk, dv in v.items():
-                    self.devices[k].data[dk] = dv
-            else:
-                self.devices[k] = IaquaDevice.from_data(self, v)
+        changes: List[AqualinkChange] = []
+        if not self._merge_devices_in_place(data, changes):
+            screen = decode_devices_screen(data)
+            self._merge_devices(screen.devices, changes)
+            self._devices_layout = devices_screen_layout(data)
+
+        if self._pending:
+            changes = self._reconcile_pending(IAQUA_DEVICES_SCREEN, changes)
+        self._fingerprints[IAQUA_DEVICES_SCREEN] = digest
+        self._publish_changes(changes)
+
+    def _merge_home_in_place(
+        self, data: Dict[str, Any], changes: List[AqualinkChange]
+    ) -> bool:
+        # Walks the screen along the learned layout and writes changed
+        # states straight into the device data. Returns False as soon as the
+        # screen doesn't match the layout, changes merged up to that point
+        # stay in place and the full decode picks up the rest.
+        layout = self._home_layout
+        screen = data["home_screen"]
+        if layout is None or len(screen) != IAQUA_HOME_DEVICES + len(layout):
+            return False
+
+        self.temp_unit = screen[IAQUA_HOME_TEMP_SCALE]["temp_scale"]
+
+        devices = self.devices
+        pos = IAQUA_HOME_DEVICES
+        for name in layout:
+            entry = screen[pos]
+            pos += 1
+            state = entry.get(name)
+            if state is None or len(entry) != 1 or name not in devices:
+                return False
+            device_data = devices[name].data
+            old = device_data.get("state")
+            if old != state:
+                device_data["state"] = state
+                changes.append(
+                    AqualinkChange(self.serial, name, "state", old, state)
+                )
+
+        return True
+
+    def _merge_devices_in_place(
+        self, data: Dict[str, Any], changes: List[AqualinkChange]
+    ) -> bool:
+        # Same as above for the devices screen, where each entry is a list
+        # of single-key attribute items.
+        layout = self._devices_layout
+        screen = data["devices_screen"]
+        if layout is None or len(screen) != IAQUA_DEVICES_DEVICES + len(layout):
+            return False
+
+        devices = self.devices
+        pos = IAQUA_DEVICES_DEVICES
+        for name, keys in layout:
+            entry = screen[pos]
+            pos += 1
+            attrs = entry.get(name)
+            if (
+                attrs is None
+                or len(entry) != 1
+                or len(attrs) != len(keys)
+                or name not in devices
+            ):
+                return False
+            device_data = devices[name].data
+            reclassify = False
+            for attr, key in zip(attrs, keys):
+                value = attr.get(key)
+                if value is None or len(attr) != 1:
+                    return False
+                old = device_data.get(key)
+                if old != value:
+                    device_data[key] = value
+                    changes.append(
+                        AqualinkChange(self.serial, name, key, old, value)
+                    )
+                    reclassify |= key in IAQUA_CLASS_FIELDS
+            if reclassify:
+                self._reclassify_device(name)
+
+        return True
+
+    def _merge_devices(
+        self,
+        records: Iterable[IaquaDeviceRecord],
+        changes: List[AqualinkChange],
+    ) -> None:
+        # Only fields whose value actually changed are written and reported.
+        added = False
+        for record in records:
+            name = record.name
+            device = self.devices.get(name)
+            if device is None:
+                self.devices[name] = IaquaDevice.from_data(
+                    self, IaquaDeviceData(record.fields)
+                )
+                changes += [
+                    AqualinkChange(self.serial, name, dk, None, dv)
+                    for dk, dv in record.fields
+                ]
+                added = True
+                continue
+
+            data = device.data
+            reclassify = False
+            for dk, dv in record.fields:
+                old = data.get(dk)
+                if old != dv:
+                    data[dk] = dv
+                    changes.append(
+                        AqualinkChange(self.serial, name, dk, old, dv)
+                    )
+                    reclassify |= dk in IAQUA_CLASS_FIELDS
+            if reclassify:
+                self._reclassify_device(name)
+
+        if added:
+            self._link_devices()
+
+    def _link_devices(self) -> None:
+        # Thermostats keep direct references to their sensor and heater,
+        # refreshed whenever devices are added or replaced.
+        for device in self.devices.values():
+            if isinstance(device, IaquaThermostat):
+                device.link(self.devices)
+
+    def _reclassify_device(self, name: str) -> None:
+        # A device reconfigured in place, e.g. an aux turned into a color
+        # light, gets a new instance of the right class. Subscribers carry
+        # over to it.
+        device = self.devices[name]
+        class_ = iaqua_device_class(device.data)
+        if type(device) is class_:
+            return
 
+        LOGGER.debug(
+            f"Device {name} on {self.serial} is now a {class_.__name__}."
+        )
+        new = class_(self, device.data)
+        new._change_subscribers = device._change_subscribers
+        self.devices[name] = new
+        self._link_devices()
+
+    async def _submit_command(
+        self, key: Hashable, send: CommandSender, toggle: bool = False
+    ) -> None:
+        if self.command_window <= 0:
+            await send()
+            return
+
+        if self._commands is None:
+            self._commands = AqualinkCommandQueue()
+        await self._commands.submit(key, send, self.command_window, toggle)
+
+    async def _submit_toggle(
+        self, name: str, screen: str, key: Hashable, send: CommandSender
+    ) -> None:
+        if self.optimistic:
+            self._expect_toggled(name, screen)
+        try:
+            await self._submit_command(key, send, toggle=True)
+        except Exception as e:
+            if name in self._pending:
+                self._rollback(name, e)
+            raise
+        finally:
+            if self._pending and self._confirm_task is None:
+                task = asyncio.ensure_future(self._confirm_pending())
+                self._confirm_task = task
+
+    def _expect_toggled(self, name: str, screen: str) -> None:
+        device = self.devices.get(name)
+        old = None if device is None else device.data.get("state")
+        if device is None or old is None:
+            return
+
+        pending = self._pending.get(name)
+        if pending is None:
+            future = asyncio.get_running_loop().create_future()
+            pending = self._pending[name] = _PendingState(screen, old, future)
+        new = AqualinkState.OFF.value if _is_on(old) else AqualinkState.ON.value
+        pending.expected = new
+        pending.deadline = time.monotonic() + self.confirm_timeout
+
+        device.data["state"] = new
+        self._publish_changes(
+            [AqualinkChange(self.serial, name, "state", old, new)]
+        )
+
+    def _reconcile_pending(
+        self, screen: str, changes: List[AqualinkChange]
+    ) -> List[AqualinkChange]:
+        # Called once a screen has been merged. Devices reporting the
+        # expected state are confirmed, the others get their expected state
+        # back and the changes that briefly undid it aren't published.
+        held: Set[str] = set()
+        for name, pending in list(self._pending.items()):
+            device = self.devices.get(name)
+            if pending.screen != screen or device is None:
+                continue
+            state = device.data.get("state")
+            if state is None:
+                continue
+            pending.reported = state
+            if _is_on(state) == _is_on(pending.expected):
+                del self._pending[name]
+                if not pending.confirmed.done():
+                    pending.confirmed.set_result(None)
+            else:
+                device.data["state"] = pending.expected
+                held.add(name)
+
+        if not held:
+            return changes
+        return [
+            x for x in changes if x.field != "state" or x.device not in held
+        ]
+
+    def _rollback(self, name: str, exception: Exception) -> None:
+        pending = self._pending.pop(name)
+        device = self.devices.get(name)
+        if device is not None:
+            old = device.data.get("state")
+            if old != pending.reported:
+                device.data["state"] = pending.reported
+                self._publish_changes(
+                    [
+                        AqualinkChange(
+                            self.serial, name, "state", old, pending.reported
+                        )
+                    ]
+                )
+        if not pending.confirmed.done():
+            pending.confirmed.set_exception(exception)
+            # Mark the exception as retrieved in case nobody waits for it.
+            pending.confirmed.exception()
+
+    async def _confirm_pending(self) -> None:
+        screens: Dict[
+            str,
+            Tuple[
+                Callable[[], Awaitable[httpx.Response]],
+                Callable[[httpx.Response], None],
+            ],
+        ] = {
+            IAQUA_HOME_SCREEN: (
+                self._send_home_screen_request,
+                self._parse_home_response,
+            ),
+            IAQUA_DEVICES_SCREEN: (
+                self._send_devices_screen_request,
+                self._parse_devices_response,
+            ),
+        }
+        try:
+            while self._pending:
+                deadline = min(x.deadline for x in self._pending.values())
+                delay = min(self.confirm_interval, deadline - time.monotonic())
+                await asyncio.sleep(max(delay, 0.0))
+
+                # Only the screens showing a pending device are polled.
+                for screen in sorted(
+                    {x.screen for x in self._pending.values()}
+                ):
+                    request, parse = screens[screen]
+                    try:
+                        parse(await request())
+                    except Exception as e:  # pylint: disable=broad-except
+                        LOGGER.debug(f"Confirmation poll failed: {e!r}")
+
+                now = time.monotonic()
+                for name, pending in list(self._pending.items()):
+                    if pending.deadline > now:
+                        continue
+                    LOGGER.warning(
+                        f"{name} on {self.serial} wasn't confirmed within "
+                        f"{self.confirm_timeout}s, rolling back."
+                    )
+                    msg = f"{self.serial} didn't confirm the state of {name}."
+                    exception = AqualinkCommandNotConfirmedException(msg)
+                    self._rollback(name, exception)
+        finally:
+            self._confirm_task = None
+
+    async def wait_confirmed(self, name: str) -> None:
+        """Wait until the system confirms an optimistic toggle of a device.
+
+        Raises AqualinkCommandNotConfirmedException if it was rolled back.
+        """
+        pending = self._pending.get(name)
+        if pending is not None:
+            await asyncio.shield(pending.confirmed)
+
+    # Toggles aren't idempotent and never get replayed after a 401.
+    @_traced_command
     async def set_pump(self, command: str) -> None:
-        r = await self._send_session_request(command)
-        self._parse_home_response(r)
+        async def send() -> None:
+            r = await self._send_command_request(command, idempotent=False)
+            self._parse_home_response(r)
+
+        name = command.split("_", 1)[1]
+        await self._submit_toggle(name, IAQUA_HOME_SCREEN, command, send)
 
+    @_traced_command
     async def set_heater(self, command: str) -> None:
-        r = await self._send_session_request(command)
-        self._parse_home_response(r)
+        async def send() -> None:
+            r = await self._send_command_request(command, idempotent=False)
+            self._parse_home_response(r)
 
+        name = command.split("_", 1)[1]
+        await self._submit_toggle(name, IAQUA_HOME_SCREEN, command, send)
+
+    @_traced_command
     async def set_temps(self, temps: Payload) -> None:
-        r = await self._send_session_request(IAQUA_COMMAND_SET_TEMPS, temps)
-        self._parse_home_response(r)
+        async def send() -> None:
+            r = await self._send_command_request(IAQUA_COMMAND_SET_TEMPS, temps)
+            self._parse_home_response(r)
+
+        key = (IAQUA_COMMAND_SET_TEMPS, tuple(sorted(temps)))
+        await self._submit_command(key, send)
 
+    @_traced_command
     async def set_aux(self, aux: str) -> None:
         aux = IAQUA_COMMAND_SET_AUX + "_" + aux.replace("aux_", "")
-        r = await self._send_session_request(aux)
-        self._parse_devices_response(r)
 
+        async def send() -> None:
+            r = await self._send_command_request(aux, idempotent=False)
+            self._parse_devices_response(r)
+
+        name = aux.split("_", 1)[1]
+        await self._submit_toggle(name, IAQUA_DEVICES_SCREEN, aux, send)
+
+    @_traced_command
     async def set_light(self, data: Payload) -> None:
-        r = await self._send_session_request(IAQUA_COMMAND_SET_LIGHT, data)
-        self._parse_devices_response(r)
+        async def send() -> None:
+            r = await self._send_command_request(IAQUA_COMMAND_SET_LIGHT, data)
+            self._parse_devices_response(r)
+
+        key = (IAQUA_COMMAND_SET_LIGHT, data.get("aux"))
+        await self._submit_command(key, send)
+
+    def plan(self, desired: DesiredState) -> List[IaquaCommandStep]:
+        return plan_commands(self.devices, desired)
+
+    async def apply(self, desired: DesiredState) -> List[IaquaCommandStep]:
+        """Bring devices to the desired state with as few commands as possible.
+
+        The desired state maps device names to a bool (on/off), a set point
+        for thermostats, a brightness for dimmable lights or an effect id or
+        name for color lights. Devices already in the desired state aren't
+        sent anything. Returns the steps that were applied, in the order
+        they were sent.
+        """
+        devices = await self.get_devices()
+        steps = plan_commands(devices, desired)
+        for step in steps:
+            await apply_step(devices[step.device], step)
+        return steps
@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import functools
+from contextlib import nullcontext
+from typing import Any, Awaitable, Callable, ContextManager, Dict, TypeVar, cast
+
+Attributes = Dict[str, str]
+
+AsyncMethod = TypeVar("AsyncMethod", bound=Callable[..., Awaitable[Any]])
+
+
+class AqualinkTracer:
+    """Opens spans around library calls.
+
+    This default implementation is disabled, traced calls then skip span
+    handling altogether.
+    """
+
+    __slots__ = ()
+
+    enabled = False
+
+    def span(self, name: str, attributes: Attributes) -> ContextManager[Any]:
+        return nullcontext()
+
+
+NULL_TRACER = AqualinkTracer()
+
+
+class OpenTelemetryTracer(AqualinkTracer):
+    """Reports spans to OpenTelemetry.
+
+    Uses the given OpenTelemetry tracer, or one from the global tracer
+    provider. The opentelemetry-api package is only needed in the latter
+    case.
+    """
+
+    __slots__ = ("_tracer",)
+
+    enabled = True
+
+    def __init__(self, tracer: Any = None):
+        if tracer is None:
+            from opentelemetry import trace
+
+            tracer = trace.get_tracer("iaqualink")
+        self._tracer = tracer
+
+    def span(self, name: str, attributes: Attributes) -> ContextManager[Any]:
+        return cast(
+            ContextManager[Any],
+            self._tracer.start_as_current_span(name, attributes=attributes),
+        )
+
+
+def traced(
+    name: str, attributes: Callable[..., Attributes]
+) -> Callable[[AsyncMethod], AsyncMethod]:
+    """Run an async method of an object with a `tracer` within a span.
+
+    The span attributes are built from the method arguments, only when
+    tracing is enabled.
+    """
+
+    def decorator(func: AsyncMethod) -> AsyncMethod:
+        @functools.wraps(func)
+        async def wrapper(self: Any, *args: Any, **kwargs: Any) -> Any:
+            tracer = self.tracer
+            if not tracer.enabled:
+                return await func(self, *args, **kwargs)
+            with tracer.span(name, attributes(self, *args, **kwargs)):
+                return await func(self, *args, **kwargs)
+
+        return cast(AsyncMethod, wrapper)
+
+    return decorator
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from typing import Dict
+from typing import Dict, MutableMapping
 
-DeviceData = Dict[str, str]
+DeviceData = MutableMapping[str, str]
 Payload = Dict[str, str]
@@ -2,6 +2,8 @@ from __future__ import annotations
 
 from unittest.mock import AsyncMock
 
+import httpx
+
 async_noop = AsyncMock(return_value=None)
 
 
@@ -11,3 +13,7 @@ def async_returns(x):
 
 def async_raises(x):
     return AsyncMock(side_effect=x)
+
+
+def json_response(data, status_code=200):
+    return httpx.Response(status_code, json=data)
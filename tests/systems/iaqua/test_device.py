@@ -2,18 +2,28 @@ from __future__ import annotations
 
 import copy
 import unittest
-from unittest.mock import AsyncMock, MagicMock
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 
+from iaqualink.exception import (
+    AqualinkDeviceNotFoundException,
+    AqualinkInvalidParameterException,
+)
 from iaqualink.systems.iaqua.device import (
+    IaquaAuxToggle,
+    IaquaBinarySensor,
     IaquaColorLight,
+    IaquaColorLightIB,
+    IaquaColorLightJC,
     IaquaDevice,
     IaquaDimmableLight,
     IaquaHeater,
     IaquaLightToggle,
+    IaquaPump,
     IaquaSensor,
     IaquaThermostat,
+    iaqua_device_class,
 )
 
 from ...common import async_noop
@@ -36,6 +46,49 @@ class TestIaquaDevice(unittest.IsolatedAsyncioTestCase):
     def test_not_equal_different_type(self) -> None:
         assert (self.obj == {}) is False
 
+    def test_label(self) -> None:
+        assert self.obj.label == "Test device"
+        self.obj.data["label"] = "POOL LIGHT"
+        assert self.obj.label == "Pool Light"
+        self.obj.data["label"] = "SPA LIGHT"
+        assert self.obj.label == "Spa Light"
+        del self.obj.data["label"]
+        assert self.obj.label == "Test device"
+
+    def test_model(self) -> None:
+        assert self.obj.model == "Device"
+        assert IaquaDimmableLight(MagicMock(), {}).model == "DimmableLight"
+
+
+class TestIaquaDeviceClass(unittest.TestCase):
+    def test_classify_by_name(self) -> None:
+        cases = {
+            "pool_heater": IaquaHeater,
+            "spa_set_point": IaquaThermostat,
+            "pool_pump": IaquaPump,
+            "freeze_protection": IaquaBinarySensor,
+            "air_temp": IaquaSensor,
+        }
+        for name, class_ in cases.items():
+            assert iaqua_device_class({"name": name}) is class_
+
+    def test_classify_aux(self) -> None:
+        def aux(type_, subtype="0", label="CLEANER"):
+            data = {"name": "aux_1", "type": type_, "subtype": subtype}
+            return iaqua_device_class(dict(data, label=label))
+
+        assert aux("0") is IaquaAuxToggle
+        assert aux("0", label="POOL LIGHT") is IaquaLightToggle
+        assert aux("1", label="POOL LIGHT") is IaquaDimmableLight
+        assert aux("2", "1") is IaquaColorLightJC
+
+    def test_from_data(self) -> None:
+        system = MagicMock()
+        data = {"name": "pool_pump", "state": "1"}
+        device = IaquaDevice.from_data(system, data)
+        assert type(device) is IaquaPump
+        assert device.data is data
+
 
 class TestIaquaSensor(unittest.IsolatedAsyncioTestCase):
     pass
@@ -215,6 +268,26 @@ class TestIaquaColorLight(unittest.IsolatedAsyncioTestCase):
         with pytest.raises(Exception):
             await self.obj.set_effect_by_name("bad effect name")
 
+    async def test_set_effect_by_name(self) -> None:
+        obj = IaquaColorLightIB(self.obj.system, self.obj.data)
+        obj.system.set_light.reset_mock()
+        await obj.set_effect_by_name("Party")
+        data = {"aux": "1", "light": "2", "subtype": "5"}
+        obj.system.set_light.assert_called_once_with(data)
+
+    async def test_set_effect_by_name_invalid(self) -> None:
+        obj = IaquaColorLightIB(self.obj.system, self.obj.data)
+        with pytest.raises(AqualinkInvalidParameterException):
+            await obj.set_effect_by_name("bad effect name")
+
+    def test_supported_effects_shared(self) -> None:
+        obj = IaquaColorLightIB(self.obj.system, self.obj.data)
+        other = IaquaColorLightIB(MagicMock(), {})
+        assert obj.supported_effects is other.supported_effects
+        assert obj.supported_effects["Party"] == 2
+        with pytest.raises(TypeError):
+            obj.supported_effects["Party"] = 3
+
 
 class TestIaquaThermostat(unittest.IsolatedAsyncioTestCase):
     def setUp(self) -> None:
@@ -227,7 +300,9 @@ class TestIaquaThermostat(unittest.IsolatedAsyncioTestCase):
         self.pool_temp = IaquaSensor(system, pool_temp)
         pool_heater = {"name": "pool_heater", "state": "0"}
         self.pool_heater = IaquaHeater(system, pool_heater)
-        self.pool_heater.toggle = AsyncMock()
+        patcher = patch.object(IaquaHeater, "toggle", AsyncMock())
+        patcher.start()
+        self.addCleanup(patcher.stop)
         spa_set_point = {"name": "spa_set_point", "state": "102"}
         self.spa_set_point = IaquaThermostat(system, spa_set_point)
         devices = [
@@ -299,3 +374,18 @@ class TestIaquaThermostat(unittest.IsolatedAsyncioTestCase):
         self.system.temp_unit = "C"
         await self.pool_set_point.set_temperature(18)
         self.pool_set_point.system.set_temps.assert_called_once()
+
+    def test_linked_partners(self):
+        self.pool_set_point.link(self.system.devices)
+        assert self.pool_set_point._sensor is self.pool_temp
+        assert self.pool_set_point._heater is self.pool_heater
+        assert self.pool_set_point._temperature == "temp2"
+
+    async def test_missing_partners(self):
+        obj = IaquaThermostat(self.system, {"name": "solar_set_point"})
+        with pytest.raises(AqualinkDeviceNotFoundException):
+            obj.current_temperature
+        with pytest.raises(AqualinkDeviceNotFoundException):
+            obj.is_on
+        with pytest.raises(AqualinkDeviceNotFoundException):
+            await obj.toggle()
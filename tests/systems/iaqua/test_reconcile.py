@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import unittest
+from unittest.mock import AsyncMock, MagicMock, call, patch
+
+import pytest
+
+from iaqualink.exception import (
+    AqualinkDeviceNotFoundException,
+    AqualinkInvalidParameterException,
+)
+from iaqualink.systems.iaqua.device import IaquaDevice
+from iaqualink.systems.iaqua.reconcile import (
+    IaquaCommandPhase,
+    IaquaCommandStep,
+)
+from iaqualink.systems.iaqua.system import IaquaSystem
+
+
+def aux(n, state, label, type_="0", subtype="0"):
+    return {
+        "aux": str(n),
+        "name": f"aux_{n}",
+        "state": state,
+        "label": label,
+        "type": type_,
+        "subtype": subtype,
+    }
+
+
+class TestIaquaReconcile(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        data = {"id": 1, "serial_number": "ABCDEFG", "device_type": "iaqua"}
+        self.system = system = IaquaSystem(MagicMock(), data)
+        system.temp_unit = "F"
+        devices = [
+            {"name": "pool_pump", "state": "1"},
+            {"name": "spa_pump", "state": "0"},
+            {"name": "pool_heater", "state": "0"},
+            {"name": "spa_heater", "state": "3"},
+            {"name": "pool_set_point", "state": "80"},
+            {"name": "pool_temp", "state": "78"},
+            aux(1, "0", "CLEANER"),
+            aux(2, "1", "POOL LIGHT", "1", "50"),
+            aux(3, "0", "SPA LIGHT", "2", "1"),
+        ]
+        for x in devices:
+            system.devices[x["name"]] = IaquaDevice.from_data(system, x)
+
+    def test_plan_noop(self) -> None:
+        desired = {
+            "pool_pump": True,
+            "spa_heater": True,
+            "pool_set_point": 80,
+            "aux_1": False,
+            "aux_2": 50,
+            "aux_3": "Off",
+        }
+        assert self.system.plan(desired) == []
+
+    def test_plan_order(self) -> None:
+        desired = {
+            "pool_pump": False,
+            "pool_heater": True,
+            "aux_1": True,
+            "spa_pump": True,
+            "pool_set_point": 82,
+            "spa_heater": False,
+            "aux_2": 100,
+            "aux_3": "Magenta",
+        }
+        assert self.system.plan(desired) == [
+            IaquaCommandStep(
+                IaquaCommandPhase.HEATERS_OFF,
+                "spa_heater",
+                "is_on",
+                True,
+                False,
+            ),
+            IaquaCommandStep(
+                IaquaCommandPhase.PUMPS_ON, "spa_pump", "is_on", False, True
+            ),
+            IaquaCommandStep(
+                IaquaCommandPhase.SETPOINTS,
+                "pool_set_point",
+                "target_temperature",
+                "80",
+                82,
+            ),
+            IaquaCommandStep(
+                IaquaCommandPhase.AUX, "aux_1", "is_on", False, True
+            ),
+            IaquaCommandStep(
+                IaquaCommandPhase.AUX, "aux_2", "brightness", 50, 100
+            ),
+            IaquaCommandStep(IaquaCommandPhase.AUX, "aux_3", "effect", "0", 8),
+            IaquaCommandStep(
+                IaquaCommandPhase.HEATERS_ON,
+                "pool_heater",
+                "is_on",
+                False,
+                True,
+            ),
+            IaquaCommandStep(
+                IaquaCommandPhase.PUMPS_OFF, "pool_pump", "is_on", True, False
+            ),
+        ]
+
+    def test_plan_invalid(self) -> None:
+        invalid = [
+            {"pool_temp": True},
+            {"pool_set_point": 200},
+            {"pool_pump": 1},
+            {"aux_2": 30},
+            {"aux_3": "Bad Effect"},
+            {"aux_3": 42},
+        ]
+        for desired in invalid:
+            with pytest.raises(AqualinkInvalidParameterException):
+                self.system.plan(desired)
+
+        with pytest.raises(AqualinkDeviceNotFoundException):
+            self.system.plan({"aux_9": True})
+
+    async def test_apply(self) -> None:
+        desired = {
+            "pool_pump": False,
+            "pool_heater": True,
+            "spa_pump": True,
+            "pool_set_point": 82,
+            "aux_2": 100,
+            "aux_1": False,
+        }
+        with patch.multiple(
+            IaquaSystem,
+            _send_command_request=AsyncMock(),
+            _parse_home_response=MagicMock(),
+            _parse_devices_response=MagicMock(),
+        ):
+            steps = await self.system.apply(desired)
+            send = IaquaSystem._send_command_request
+
+        assert [x.device for x in steps] == [
+            "spa_pump",
+            "pool_set_point",
+            "aux_2",
+            "pool_heater",
+            "pool_pump",
+        ]
+        assert send.await_args_list == [
+            call("set_spa_pump", idempotent=False),
+            call("set_temps", {"temp1": "82"}),
+            call("set_light", {"aux": "2", "light": "100"}),
+            call("set_pool_heater", idempotent=False),
+            call("set_pool_pump", idempotent=False),
+        ]
+
+    async def test_apply_invalid_sends_nothing(self) -> None:
+        with patch.object(
+            IaquaSystem, "_send_command_request", AsyncMock()
+        ) as send:
+            with pytest.raises(AqualinkInvalidParameterException):
+                await self.system.apply({"spa_pump": True, "aux_2": 30})
+        send.assert_not_awaited()
@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import unittest
+
+import pytest
+
+from iaqualink.systems.iaqua.schema import (
+    IaquaDeviceData,
+    IaquaDeviceRecord,
+    decode_devices_screen,
+    decode_home_screen,
+    devices_screen_layout,
+    home_screen_layout,
+)
+
+HOME = {
+    "message": "",
+    "home_screen": [
+        {"status": "Online"},
+        {"response": ""},
+        {"system_type": "0"},
+        {"temp_scale": "F"},
+        {"spa_temp": "102"},
+        {"pool_pump": "1"},
+    ],
+}
+
+DEVICES = {
+    "message": "",
+    "devices_screen": [
+        {"status": "Online"},
+        {"response": ""},
+        {"group": "1"},
+        {
+            "aux_1": [
+                {"state": "0"},
+                {"label": "CLEANER"},
+                {"icon": "aux_1_0.png"},
+                {"type": "0"},
+                {"subtype": "0"},
+            ]
+        },
+    ],
+}
+
+
+class TestIaquaSchema(unittest.TestCase):
+    def test_decode_home_screen(self) -> None:
+        screen = decode_home_screen(HOME)
+        assert screen.offline is False
+        assert screen.temp_scale == "F"
+        assert screen.devices == (
+            IaquaDeviceRecord(
+                "spa_temp", (("name", "spa_temp"), ("state", "102"))
+            ),
+            IaquaDeviceRecord(
+                "pool_pump", (("name", "pool_pump"), ("state", "1"))
+            ),
+        )
+
+    def test_decode_home_screen_offline(self) -> None:
+        screen = decode_home_screen({"home_screen": [{"status": "Offline"}]})
+        assert screen.offline is True
+        assert screen.devices == ()
+
+    def test_decode_devices_screen(self) -> None:
+        screen = decode_devices_screen(DEVICES)
+        assert screen.offline is False
+        assert len(screen.devices) == 1
+        assert screen.devices[0].as_dict() == {
+            "aux": "1",
+            "name": "aux_1",
+            "state": "0",
+            "label": "CLEANER",
+            "icon": "aux_1_0.png",
+            "type": "0",
+            "subtype": "0",
+        }
+
+    def test_decode_devices_screen_offline(self) -> None:
+        payload = {"devices_screen": [{"status": "Offline"}]}
+        screen = decode_devices_screen(payload)
+        assert screen.offline is True
+        assert screen.devices == ()
+
+    def test_home_screen_layout(self) -> None:
+        assert home_screen_layout(HOME) == ("spa_temp", "pool_pump")
+
+    def test_devices_screen_layout(self) -> None:
+        assert devices_screen_layout(DEVICES) == (
+            ("aux_1", ("state", "label", "icon", "type", "subtype")),
+        )
+
+    def test_devices_screen_layout_multi_key_items(self) -> None:
+        payload = {
+            "devices_screen": [
+                {"status": "Online"},
+                {"response": ""},
+                {"group": "1"},
+                {"aux_1": [{"state": "0", "label": "CLEANER"}]},
+            ]
+        }
+        assert devices_screen_layout(payload) is None
+
+
+class TestIaquaDeviceData(unittest.TestCase):
+    def test_mapping(self) -> None:
+        data = IaquaDeviceData({"name": "aux_1", "state": "0"})
+        assert data == {"name": "aux_1", "state": "0"}
+        assert len(data) == 2
+        assert "state" in data
+        assert "label" not in data
+        assert data.get("label") is None
+        with pytest.raises(KeyError):
+            data["label"]
+
+    def test_order(self) -> None:
+        fields = (("aux", "1"), ("name", "aux_1"), ("state", "0"))
+        assert list(IaquaDeviceData(fields)) == ["aux", "name", "state"]
+
+    def test_unknown_fields(self) -> None:
+        data = IaquaDeviceData({"name": "aux_1", "color": "red"})
+        assert data["color"] == "red"
+        assert list(data.items()) == [("name", "aux_1"), ("color", "red")]
+        del data["color"]
+        assert data == {"name": "aux_1"}
+        assert data._extra is None
+
+    def test_update_and_delete(self) -> None:
+        data = IaquaDeviceData({"name": "aux_1", "state": "0"})
+        data["state"] = "1"
+        data.update({"label": "CLEANER"})
+        assert data == {"name": "aux_1", "state": "1", "label": "CLEANER"}
+        del data["state"]
+        assert "state" not in data
+        with pytest.raises(KeyError):
+            del data["state"]
+        with pytest.raises(KeyError):
+            del data["color"]
+
+    def test_compact(self) -> None:
+        data = IaquaDeviceData({"name": "aux_1"})
+        assert not hasattr(data, "__dict__")
+        assert data._extra is None
@@ -1,21 +1,34 @@
 from __future__ import annotations
 
+import asyncio
 import unittest
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, call, patch
 
 import pytest
 
 from iaqualink.client import AqualinkClient
+from iaqualink.events import AqualinkChange
 from iaqualink.exception import (
+    AqualinkCommandNotConfirmedException,
     AqualinkServiceException,
     AqualinkServiceUnauthorizedException,
     AqualinkSystemOfflineException,
 )
+from iaqualink.ratelimit import RequestPriority
 from iaqualink.system import AqualinkSystem
-from iaqualink.systems.iaqua.device import IaquaAuxToggle
+from iaqualink.systems.iaqua.device import (
+    IaquaAuxToggle,
+    IaquaColorLightJC,
+    IaquaDimmableLight,
+    IaquaHeater,
+    IaquaLightToggle,
+    IaquaPump,
+    IaquaThermostat,
+)
+from iaqualink.systems.iaqua.schema import IaquaDeviceData
 from iaqualink.systems.iaqua.system import IaquaSystem
 
-from ...common import async_noop, async_raises
+from ...common import async_noop, async_raises, json_response
 
 
 class TestIaquaSystem(unittest.IsolatedAsyncioTestCase):
@@ -45,10 +58,61 @@ class TestIaquaSystem(unittest.IsolatedAsyncioTestCase):
         data = {"id": 1, "serial_number": "ABCDEFG", "device_type": "iaqua"}
         r = AqualinkSystem.from_data(aqualink, data)
         r._send_home_screen_request = async_raises(AqualinkServiceException)
+        r._send_devices_screen_request = async_noop
+        with pytest.raises(AqualinkServiceException):
+            await r.update()
+        assert r.online is None
+
+    async def test_update_devices_service_exception(self):
+        aqualink = MagicMock()
+        data = {"id": 1, "serial_number": "ABCDEFG", "device_type": "iaqua"}
+        r = AqualinkSystem.from_data(aqualink, data)
+        r._send_home_screen_request = async_noop
+        r._send_devices_screen_request = async_raises(AqualinkServiceException)
+        r._parse_home_response = MagicMock()
         with pytest.raises(AqualinkServiceException):
             await r.update()
         assert r.online is None
 
+    async def test_update_offline_and_service_exception(self):
+        aqualink = MagicMock()
+        data = {"id": 1, "serial_number": "ABCDEFG", "device_type": "iaqua"}
+        r = AqualinkSystem.from_data(aqualink, data)
+        r._send_home_screen_request = async_noop
+        r._send_devices_screen_request = async_raises(AqualinkServiceException)
+        r._parse_home_response = MagicMock(
+            side_effect=AqualinkSystemOfflineException
+        )
+        with pytest.raises(AqualinkServiceException):
+            await r.update()
+        assert r.online is None
+
+    async def test_update_concurrent_requests(self):
+        aqualink = MagicMock()
+        data = {"id": 1, "serial_number": "ABCDEFG", "device_type": "iaqua"}
+        r = AqualinkSystem.from_data(aqualink, data)
+        started = []
+        release = asyncio.Event()
+
+        async def request(name):
+            started.append(name)
+            await release.wait()
+
+        r._send_home_screen_request = lambda: request("home")
+        r._send_devices_screen_request = lambda: request("devices")
+        r._parse_home_response = MagicMock()
+        r._parse_devices_response = MagicMock()
+
+        task = asyncio.ensure_future(r.update())
+        for _ in range(3):
+            await asyncio.sleep(0)
+        assert sorted(started) == ["devices", "home"]
+        release.set()
+        await task
+        r._parse_home_response.assert_called_once()
+        r._parse_devices_response.assert_called_once()
+        assert r.online is True
+
     async def test_update_offline(self):
         aqualink = MagicMock()
         data = {"id": 1, "serial_number": "ABCDEFG", "device_type": "iaqua"}
@@ -69,8 +133,7 @@ class TestIaquaSystem(unittest.IsolatedAsyncioTestCase):
         system = AqualinkSystem.from_data(aqualink, data)
 
         message = {"message": "", "devices_screen": [{"status": "Offline"}]}
-        response = MagicMock()
-        response.json.return_value = message
+        response = json_response(message)
 
         with pytest.raises(AqualinkSystemOfflineException):
             system._parse_devices_response(response)
@@ -98,8 +161,7 @@ class TestIaquaSystem(unittest.IsolatedAsyncioTestCase):
                 },
             ],
         }
-        response = MagicMock()
-        response.json.return_value = message
+        response = json_response(message)
 
         expected = {
             "aux_B1": IaquaAuxToggle(
@@ -117,6 +179,8 @@ class TestIaquaSystem(unittest.IsolatedAsyncioTestCase):
         }
         system._parse_devices_response(response)
         assert system.devices == expected
+        assert isinstance(system.devices["aux_B1"].data, IaquaDeviceData)
+        assert not hasattr(system.devices["aux_B1"], "__dict__")
 
     @patch("httpx.AsyncClient.request")
     async def test_home_request(self, mock_request):
@@ -159,3 +223,446 @@ class TestIaquaSystem(unittest.IsolatedAsyncioTestCase):
 
         with pytest.raises(AqualinkServiceUnauthorizedException):
             await system._send_devices_screen_request()
+
+    def _make_system_with_devices(self, pump="0", heater="0"):
+        data = {"id": 1, "serial_number": "ABCDEFG", "device_type": "iaqua"}
+        system = IaquaSystem.from_data(MagicMock(), data)
+        system.devices = {
+            "pool_pump": IaquaPump(
+                system, {"name": "pool_pump", "state": pump}
+            ),
+            "pool_heater": IaquaHeater(
+                system, {"name": "pool_heater", "state": heater}
+            ),
+            "aux_1": IaquaAuxToggle(
+                system, {"name": "aux_1", "aux": "1", "state": "1"}
+            ),
+        }
+        return system
+
+    def test_is_active_idle(self):
+        system = self._make_system_with_devices()
+        assert system.is_active is False
+
+    def test_is_active_pump_on(self):
+        system = self._make_system_with_devices(pump="1")
+        assert system.is_active is True
+
+    def test_is_active_heater_enabled(self):
+        system = self._make_system_with_devices(heater="3")
+        assert system.is_active is True
+
+    async def test_commands_set_last_command(self):
+        data = {"id": 1, "serial_number": "ABCDEFG", "device_type": "iaqua"}
+        system = IaquaSystem.from_data(MagicMock(), data)
+        system._send_session_request = async_noop
+        system._parse_home_response = MagicMock()
+        system._parse_devices_response = MagicMock()
+
+        commands = [
+            (system.set_pump, "set_pool_pump"),
+            (system.set_heater, "set_pool_heater"),
+            (system.set_temps, {"temp1": "80"}),
+            (system.set_aux, "aux_1"),
+            (system.set_light, {"aux": "1", "light": "1"}),
+        ]
+        for command, arg in commands:
+            system.last_command = None
+            await command(arg)
+            assert system.last_command is not None
+
+    async def test_update_does_not_set_last_command(self):
+        data = {"id": 1, "serial_number": "ABCDEFG", "device_type": "iaqua"}
+        system = IaquaSystem.from_data(MagicMock(), data)
+        system._send_session_request = async_noop
+        system._parse_home_response = MagicMock()
+        system._parse_devices_response = MagicMock()
+        await system.update()
+        assert system.last_command is None
+
+    async def test_request_priorities(self):
+        data = {"id": 1, "serial_number": "ABCDEFG", "device_type": "iaqua"}
+        aqualink = MagicMock()
+        aqualink.send_authenticated_request = async_noop
+        system = IaquaSystem.from_data(aqualink, data)
+        system._parse_home_response = MagicMock()
+
+        async_noop.reset_mock()
+        await system._send_home_screen_request()
+        kwargs = async_noop.call_args.kwargs
+        assert kwargs["priority"] is RequestPriority.POLL
+
+        await system.set_pump("set_pool_pump")
+        kwargs = async_noop.call_args.kwargs
+        assert kwargs["priority"] is RequestPriority.COMMAND
+
+    def test_parse_home_publishes_changes(self):
+        data = {"id": 1, "serial_number": "ABCDEFG", "device_type": "iaqua"}
+        aqualink = MagicMock()
+        system = IaquaSystem.from_data(aqualink, data)
+
+        def home(pump):
+            message = {
+                "home_screen": [
+                    {"status": "Online"},
+                    {"response": ""},
+                    {"system_type": "0"},
+                    {"temp_scale": "F"},
+                    {"pool_pump": pump},
+                    {"air_temp": "70"},
+                ]
+            }
+            response = json_response(message)
+            return response
+
+        system._parse_home_response(home("0"))
+        aqualink._emit_changes.assert_called_once()
+        added = aqualink._emit_changes.call_args.args[0]
+        assert {(x.device, x.field) for x in added} == {
+            ("pool_pump", "name"),
+            ("pool_pump", "state"),
+            ("air_temp", "name"),
+            ("air_temp", "state"),
+        }
+
+        system_callback = MagicMock()
+        device_callback = MagicMock()
+        system.subscribe(system_callback)
+        system.devices["pool_pump"].subscribe(device_callback)
+        aqualink._emit_changes.reset_mock()
+
+        system._parse_home_response(home("0"))
+        system_callback.assert_not_called()
+        aqualink._emit_changes.assert_not_called()
+
+        system._parse_home_response(home("1"))
+        change = AqualinkChange("ABCDEFG", "pool_pump", "state", "0", "1")
+        system_callback.assert_called_once_with([change])
+        device_callback.assert_called_once_with([change])
+        aqualink._emit_changes.assert_called_once_with([change])
+        assert system.devices["pool_pump"].state == "1"
+
+    def test_parse_home_in_place(self):
+        data = {"id": 1, "serial_number": "ABCDEFG", "device_type": "iaqua"}
+        aqualink = MagicMock()
+        system = IaquaSystem.from_data(aqualink, data)
+
+        def home(*devices):
+            message = {
+                "home_screen": [
+                    {"status": "Online"},
+                    {"response": ""},
+                    {"system_type": "0"},
+                    {"temp_scale": "F"},
+                    *[{k: v} for k, v in devices],
+                ]
+            }
+            return json_response(message)
+
+        system._parse_home_response(home(("pool_pump", "0")))
+        pump = system.devices["pool_pump"]
+        aqualink._emit_changes.reset_mock()
+
+        with patch(
+            "iaqualink.systems.iaqua.system.decode_home_screen"
+        ) as decode:
+            system._parse_home_response(home(("pool_pump", "1")))
+        decode.assert_not_called()
+        assert system.devices["pool_pump"] is pump
+        assert pump.state == "1"
+        change = AqualinkChange("ABCDEFG", "pool_pump", "state", "0", "1")
+        aqualink._emit_changes.assert_called_once_with([change])
+
+        # A device showing up changes the layout and goes through the
+        # full decode again.
+        aqualink._emit_changes.reset_mock()
+        system._parse_home_response(home(("pool_pump", "0"), ("spa", "1")))
+        assert pump.state == "0"
+        assert system.devices["spa"].state == "1"
+        changes = aqualink._emit_changes.call_args.args[0]
+        assert {(x.device, x.field) for x in changes} == {
+            ("pool_pump", "state"),
+            ("spa", "name"),
+            ("spa", "state"),
+        }
+        assert system._home_layout == ("pool_pump", "spa")
+
+    def test_parse_devices_in_place(self):
+        data = {"id": 1, "serial_number": "ABCDEFG", "device_type": "iaqua"}
+        aqualink = MagicMock()
+        system = IaquaSystem.from_data(aqualink, data)
+
+        def devices(state, label="CLEANER"):
+            message = {
+                "devices_screen": [
+                    {"status": "Online"},
+                    {"response": ""},
+                    {"group": "1"},
+                    {
+                        "aux_1": [
+                            {"state": state},
+                            {"label": label},
+                            {"icon": "aux_1_0.png"},
+                            {"type": "0"},
+                            {"subtype": "0"},
+                        ]
+                    },
+                ]
+            }
+            return json_response(message)
+
+        system._parse_devices_response(devices("0"))
+        aux = system.devices["aux_1"]
+        aqualink._emit_changes.reset_mock()
+
+        with patch(
+            "iaqualink.systems.iaqua.system.decode_devices_screen"
+        ) as decode:
+            system._parse_devices_response(devices("0"))
+            aqualink._emit_changes.assert_not_called()
+            system._parse_devices_response(devices("1", "PUMP"))
+        decode.assert_not_called()
+        assert system.devices["aux_1"] is aux
+        assert aux.data["state"] == "1"
+        assert aux.data["label"] == "PUMP"
+        aqualink._emit_changes.assert_called_once_with(
+            [
+                AqualinkChange("ABCDEFG", "aux_1", "state", "0", "1"),
+                AqualinkChange("ABCDEFG", "aux_1", "label", "CLEANER", "PUMP"),
+            ]
+        )
+
+    def test_parse_unchanged_response_skipped(self):
+        data = {"id": 1, "serial_number": "ABCDEFG", "device_type": "iaqua"}
+        aqualink = MagicMock()
+        system = IaquaSystem.from_data(aqualink, data)
+
+        def home(pump):
+            message = {
+                "home_screen": [
+                    {"status": "Online"},
+                    {"response": ""},
+                    {"system_type": "0"},
+                    {"temp_scale": "F"},
+                    {"pool_pump": pump},
+                ]
+            }
+            return json_response(message)
+
+        system._parse_home_response(home("0"))
+        assert (system.fingerprint_hits, system.fingerprint_misses) == (0, 1)
+
+        with patch("iaqualink.systems.iaqua.system.loads") as loads:
+            system._parse_home_response(home("0"))
+        loads.assert_not_called()
+        assert (system.fingerprint_hits, system.fingerprint_misses) == (1, 1)
+
+        system._parse_home_response(home("1"))
+        assert system.devices["pool_pump"].state == "1"
+        assert (system.fingerprint_hits, system.fingerprint_misses) == (1, 2)
+
+    def test_parse_offline_response_not_fingerprinted(self):
+        data = {"id": 1, "serial_number": "ABCDEFG", "device_type": "iaqua"}
+        aqualink = MagicMock()
+        system = IaquaSystem.from_data(aqualink, data)
+
+        message = {"message": "", "devices_screen": [{"status": "Offline"}]}
+        for _ in range(2):
+            with pytest.raises(AqualinkSystemOfflineException):
+                system._parse_devices_response(json_response(message))
+        assert system.fingerprint_hits == 0
+
+    def test_parse_devices_reclassify(self):
+        data = {"id": 1, "serial_number": "ABCDEFG", "device_type": "iaqua"}
+        aqualink = MagicMock()
+        system = IaquaSystem.from_data(aqualink, data)
+
+        def devices(type_, subtype, state="0"):
+            message = {
+                "devices_screen": [
+                    {"status": "Online"},
+                    {"response": ""},
+                    {"group": "1"},
+                    {
+                        "aux_1": [
+                            {"state": state},
+                            {"label": "POOL LIGHT"},
+                            {"icon": "aux_1_0.png"},
+                            {"type": type_},
+                            {"subtype": subtype},
+                        ]
+                    },
+                ]
+            }
+            return json_response(message)
+
+        system._parse_devices_response(devices("0", "0"))
+        aux = system.devices["aux_1"]
+        assert type(aux) is IaquaLightToggle
+        callback = MagicMock()
+        aux.subscribe(callback)
+
+        # Reconfigured in place, merged along the learned layout.
+        system._parse_devices_response(devices("2", "1"))
+        light = system.devices["aux_1"]
+        assert type(light) is IaquaColorLightJC
+        assert light.data is aux.data
+        assert callback.call_count == 1
+
+        system._parse_devices_response(devices("2", "1", "1"))
+        assert callback.call_count == 2
+
+        # Same through the full decode.
+        system._devices_layout = None
+        system._parse_devices_response(devices("1", "50"))
+        assert type(system.devices["aux_1"]) is IaquaDimmableLight
+        assert callback.call_count == 3
+
+    def test_parse_home_links_thermostats(self):
+        data = {"id": 1, "serial_number": "ABCDEFG", "device_type": "iaqua"}
+        aqualink = MagicMock()
+        system = IaquaSystem.from_data(aqualink, data)
+
+        def home(*names):
+            message = {
+                "home_screen": [
+                    {"status": "Online"},
+                    {"response": ""},
+                    {"system_type": "0"},
+                    {"temp_scale": "F"},
+                    *[{x: "1"} for x in names],
+                ]
+            }
+            return json_response(message)
+
+        system._parse_home_response(home("pool_set_point", "pool_temp"))
+        thermostat = system.devices["pool_set_point"]
+        assert isinstance(thermostat, IaquaThermostat)
+        assert thermostat._sensor is system.devices["pool_temp"]
+        assert thermostat._heater_device is None
+        assert thermostat._temperature == "temp1"
+
+        system._parse_home_response(
+            home("pool_set_point", "pool_temp", "pool_heater", "spa_set_point")
+        )
+        assert thermostat._heater is system.devices["pool_heater"]
+        assert thermostat._temperature == "temp2"
+        assert thermostat.is_on is True
+
+    async def test_commands_coalesced(self):
+        data = {"id": 1, "serial_number": "ABCDEFG", "device_type": "iaqua"}
+        aqualink = MagicMock()
+        system = IaquaSystem.from_data(aqualink, data)
+        system.command_window = 0.01
+        system._parse_home_response = MagicMock()
+        system._parse_devices_response = MagicMock()
+
+        with patch.object(
+            IaquaSystem, "_send_command_request", AsyncMock()
+        ) as send:
+            await asyncio.gather(
+                system.set_temps({"temp1": "80"}),
+                system.set_temps({"temp1": "81"}),
+                system.set_temps({"temp2": "100"}),
+                system.set_temps({"temp1": "82"}),
+                system.set_pump("set_pool_pump"),
+                system.set_pump("set_pool_pump"),
+                system.set_aux("aux_1"),
+            )
+
+        assert send.await_args_list == [
+            call("set_temps", {"temp1": "82"}),
+            call("set_temps", {"temp2": "100"}),
+            call("set_aux_1", idempotent=False),
+        ]
+
+    def _optimistic_system(self):
+        data = {"id": 1, "serial_number": "ABCDEFG", "device_type": "iaqua"}
+        system = IaquaSystem.from_data(MagicMock(), data)
+        system.optimistic = True
+        system.confirm_interval = 0.01
+        system._parse_home_response(self._home("0"))
+        callback = MagicMock()
+        system.subscribe(callback)
+        return system, callback
+
+    @staticmethod
+    def _home(pump):
+        message = {
+            "home_screen": [
+                {"status": "Online"},
+                {"response": ""},
+                {"system_type": "0"},
+                {"temp_scale": "F"},
+                {"pool_pump": pump},
+            ]
+        }
+        return json_response(message)
+
+    async def test_optimistic_toggle_confirmed(self):
+        system, callback = self._optimistic_system()
+        system._send_command_request = AsyncMock(return_value=self._home("0"))
+        system._send_home_screen_request = AsyncMock(
+            side_effect=[self._home("0"), self._home("1")]
+        )
+
+        await system.set_pump("set_pool_pump")
+        pump = system.devices["pool_pump"]
+        assert pump.is_on is True
+        change = AqualinkChange("ABCDEFG", "pool_pump", "state", "0", "1")
+        callback.assert_called_once_with([change])
+
+        await asyncio.wait_for(system.wait_confirmed("pool_pump"), 1)
+        assert pump.is_on is True
+        assert system._send_home_screen_request.await_count == 2
+        # Neither the unconfirmed poll nor the confirmation are published.
+        callback.assert_called_once()
+        assert not system._pending
+
+    async def test_optimistic_toggle_confirmed_by_response(self):
+        system, callback = self._optimistic_system()
+        system._send_command_request = AsyncMock(return_value=self._home("3"))
+
+        await system.set_pump("set_pool_pump")
+        assert not system._pending
+        assert system._confirm_task is None
+        assert system.devices["pool_pump"].state == "3"
+        assert [x.new for x in callback.call_args_list[-1].args[0]] == ["3"]
+
+    async def test_optimistic_toggle_rolled_back(self):
+        system, callback = self._optimistic_system()
+        system.confirm_timeout = 0.05
+        system._send_command_request = AsyncMock(return_value=self._home("0"))
+        system._send_home_screen_request = AsyncMock(
+            return_value=self._home("0")
+        )
+
+        await system.set_pump("set_pool_pump")
+        assert system.devices["pool_pump"].is_on is True
+
+        with pytest.raises(AqualinkCommandNotConfirmedException):
+            await asyncio.wait_for(system.wait_confirmed("pool_pump"), 1)
+        assert system.devices["pool_pump"].is_on is False
+        assert callback.call_args.args[0] == [
+            AqualinkChange("ABCDEFG", "pool_pump", "state", "1", "0")
+        ]
+
+    async def test_optimistic_toggle_send_failure(self):
+        system, callback = self._optimistic_system()
+        system._send_command_request = async_raises(AqualinkServiceException)
+
+        with pytest.raises(AqualinkServiceException):
+            await system.set_pump("set_pool_pump")
+        assert system.devices["pool_pump"].is_on is False
+        assert not system._pending
+        assert [x.args[0][0].new for x in callback.call_args_list] == ["1", "0"]
+
+    async def test_toggle_not_optimistic_by_default(self):
+        system, callback = self._optimistic_system()
+        system.optimistic = False
+        system._send_command_request = AsyncMock(return_value=self._home("0"))
+
+        await system.set_pump("set_pool_pump")
+        assert system.devices["pool_pump"].is_on is False
+        assert system._confirm_task is None
+        callback.assert_not_called()
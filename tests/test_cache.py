@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import os
+import stat
+import tempfile
+import time
+import unittest
+
+import pytest
+
+from iaqualink.cache import (
+    AqualinkCache,
+    AqualinkFileCache,
+    AqualinkMemoryCache,
+)
+
+
+class TestAqualinkCache(unittest.TestCase):
+    def test_read_not_implemented(self) -> None:
+        with pytest.raises(NotImplementedError):
+            AqualinkCache().load("foo")
+
+    def test_write_not_implemented(self) -> None:
+        with pytest.raises(NotImplementedError):
+            AqualinkCache().store("foo", {})
+
+    def test_delete_not_implemented(self) -> None:
+        with pytest.raises(NotImplementedError):
+            AqualinkCache().clear("foo")
+
+
+class TestAqualinkMemoryCache(unittest.TestCase):
+    def setUp(self) -> None:
+        self.obj = AqualinkMemoryCache(ttl=60)
+
+    def test_missing(self) -> None:
+        assert self.obj.load("foo") is None
+
+    def test_store_load(self) -> None:
+        entry = {"client_id": "bar", "timestamp": time.time()}
+        self.obj.store("foo", entry)
+        assert self.obj.load("foo") == entry
+
+    def test_expired(self) -> None:
+        entry = {"client_id": "bar", "timestamp": time.time() - 120}
+        self.obj.store("foo", entry)
+        assert self.obj.load("foo") is None
+
+    def test_clear(self) -> None:
+        self.obj.store("foo", {"timestamp": time.time()})
+        self.obj.clear("foo")
+        assert self.obj.load("foo") is None
+
+
+class TestAqualinkFileCache(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "cache.json")
+        self.obj = AqualinkFileCache(self.path, ttl=60)
+
+    def tearDown(self) -> None:
+        self.tmpdir.cleanup()
+
+    def test_missing_file(self) -> None:
+        assert self.obj.load("foo") is None
+
+    def test_store_load(self) -> None:
+        entry = {"client_id": "bar", "timestamp": time.time()}
+        self.obj.store("foo", entry)
+        self.obj.store("baz", entry)
+        other = AqualinkFileCache(self.path, ttl=60)
+        assert other.load("foo") == entry
+        assert other.load("baz") == entry
+
+    def test_file_mode(self) -> None:
+        self.obj.store("foo", {"timestamp": time.time()})
+        mode = stat.S_IMODE(os.stat(self.path).st_mode)
+        assert mode == 0o600
+
+    def test_corrupted_file(self) -> None:
+        with open(self.path, "w") as f:
+            f.write("{not json")
+        assert self.obj.load("foo") is None
+
+    def test_clear(self) -> None:
+        self.obj.store("foo", {"timestamp": time.time()})
+        self.obj.clear("foo")
+        assert self.obj.load("foo") is None
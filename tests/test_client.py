@@ -1,18 +1,33 @@
 from __future__ import annotations
 
+import asyncio
+import time
 import unittest
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import httpx
 import pytest
 
+from iaqualink.cache import AqualinkMemoryCache
 from iaqualink.client import AqualinkClient
 from iaqualink.exception import (
+    AqualinkDeviceNotFoundException,
+    AqualinkInvalidParameterException,
     AqualinkServiceException,
     AqualinkServiceUnauthorizedException,
+    AqualinkSystemOfflineException,
 )
+from iaqualink.fleet import (
+    CommandStatus,
+    FleetCommand,
+    UpdateStatus,
+    select_commands,
+)
+from iaqualink.system import AqualinkSystem
+from iaqualink.systems.iaqua.device import IaquaDevice, IaquaPump
+from iaqualink.systems.iaqua.system import IaquaSystem
 
-from .common import async_noop, async_raises
+from .common import async_noop, async_raises, json_response
 
 LOGIN_DATA = {
     "id": "id",
@@ -110,12 +125,14 @@ class TestAqualinkClient(unittest.IsolatedAsyncioTestCase):
         await self.aqualink.login()
 
         mock_request.return_value.status_code = 200
-        mock_request.return_value.json.return_value = [
-            {
-                "device_type": "foo",
-                "serial_number": "SN123456",
-            }
-        ]
+        mock_request.return_value = json_response(
+            [
+                {
+                    "device_type": "foo",
+                    "serial_number": "SN123456",
+                }
+            ]
+        )
 
         systems = await self.aqualink.get_systems()
         assert len(systems) == 0
@@ -128,12 +145,14 @@ class TestAqualinkClient(unittest.IsolatedAsyncioTestCase):
         await self.aqualink.login()
 
         mock_request.return_value.status_code = 200
-        mock_request.return_value.json.return_value = [
-            {
-                "device_type": "iaqua",
-                "serial_number": "SN123456",
-            }
-        ]
+        mock_request.return_value = json_response(
+            [
+                {
+                    "device_type": "iaqua",
+                    "serial_number": "SN123456",
+                }
+            ]
+        )
 
         systems = await self.aqualink.get_systems()
         assert len(systems) == 1
@@ -144,3 +163,426 @@ class TestAqualinkClient(unittest.IsolatedAsyncioTestCase):
 
         with pytest.raises(AqualinkServiceUnauthorizedException):
             await self.aqualink.get_systems()
+
+    def _make_systems(self, *updates):
+        systems = {}
+        for i, update in enumerate(updates):
+            data = {"serial_number": f"SN{i}", "device_type": "iaqua"}
+            system = AqualinkSystem.from_data(self.aqualink, data)
+            system.update = update
+            systems[system.serial] = system
+        return systems
+
+    async def test_update_all(self):
+        systems = self._make_systems(
+            async_noop,
+            async_raises(AqualinkSystemOfflineException),
+            async_raises(AqualinkServiceException),
+        )
+
+        result = await self.aqualink.update_all(systems)
+
+        assert result.results["SN0"].status is UpdateStatus.SUCCESS
+        assert result.results["SN1"].status is UpdateStatus.OFFLINE
+        assert result.results["SN2"].status is UpdateStatus.ERROR
+        assert isinstance(
+            result.results["SN2"].exception, AqualinkServiceException
+        )
+        assert result.counts[UpdateStatus.SUCCESS] == 1
+
+    async def test_update_all_skips_throttled(self):
+        update = async_noop
+        update.reset_mock()
+        systems = self._make_systems(update)
+        systems["SN0"]._mark_refreshed()
+
+        result = await self.aqualink.update_all(systems)
+
+        assert result.results["SN0"].status is UpdateStatus.SKIPPED
+        update.assert_not_called()
+
+    async def test_update_all_concurrency(self):
+        running = 0
+        peak = 0
+
+        async def update():
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0)
+            running -= 1
+
+        systems = self._make_systems(*[update] * 10)
+
+        result = await self.aqualink.update_all(systems, concurrency=3)
+
+        assert peak == 3
+        assert result.counts[UpdateStatus.SUCCESS] == 10
+
+    async def test_update_all_bad_concurrency(self):
+        with pytest.raises(AqualinkInvalidParameterException):
+            await self.aqualink.update_all({}, concurrency=0)
+
+    def _make_pump_systems(self, count):
+        systems = {}
+        for i in range(count):
+            data = {"serial_number": f"SN{i}", "device_type": "iaqua"}
+            system = AqualinkSystem.from_data(self.aqualink, data)
+            for name in ("pool_pump", "spa_heater"):
+                data = {"name": name, "state": "1"}
+                system.devices[name] = IaquaDevice.from_data(system, data)
+            systems[system.serial] = system
+        return systems
+
+    async def test_run_commands(self):
+        systems = self._make_pump_systems(3)
+
+        async def set_pump(system, command):
+            if system.serial == "SN1":
+                raise AqualinkSystemOfflineException
+
+        commands = select_commands(
+            systems,
+            lambda _, device: isinstance(device, IaquaPump),
+            "turn_off",
+        )
+        commands += [
+            FleetCommand("SN1", "spa_heater", "turn_off"),
+            FleetCommand("SN2", "aux_1", "turn_on"),
+        ]
+        with patch.object(
+            IaquaSystem, "set_pump", autospec=True, side_effect=set_pump
+        ):
+            result = await self.aqualink.run_commands(systems, commands)
+
+        assert [x.command for x in result.results] == commands
+        assert [x.status for x in result.results] == [
+            CommandStatus.SUCCESS,
+            CommandStatus.OFFLINE,
+            CommandStatus.SUCCESS,
+            CommandStatus.SKIPPED,
+            CommandStatus.ERROR,
+        ]
+        assert isinstance(
+            result.results[4].exception, AqualinkDeviceNotFoundException
+        )
+
+    async def test_run_commands_concurrency(self):
+        systems = self._make_pump_systems(10)
+        running = 0
+        peak = 0
+
+        async def set_pump(system, command):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0)
+            running -= 1
+
+        commands = [FleetCommand(x, "pool_pump", "turn_off") for x in systems]
+        commands += [FleetCommand(x, "pool_pump", "toggle") for x in systems]
+        with patch.object(
+            IaquaSystem, "set_pump", autospec=True, side_effect=set_pump
+        ):
+            result = await self.aqualink.run_commands(
+                systems, commands, concurrency=3
+            )
+
+        assert peak == 3
+        assert result.counts[CommandStatus.SUCCESS] == 20
+
+    async def test_run_commands_invalid(self):
+        systems = self._make_pump_systems(1)
+        invalid = [
+            FleetCommand("SN0", "pool_pump", "delete"),
+            FleetCommand("SN9", "pool_pump", "turn_off"),
+        ]
+        for command in invalid:
+            with pytest.raises(AqualinkInvalidParameterException):
+                await self.aqualink.run_commands(systems, [command])
+        with pytest.raises(AqualinkInvalidParameterException):
+            await self.aqualink.run_commands(systems, [], concurrency=0)
+
+    async def test_authenticated_request_relogin_and_replay(self):
+        responses = [AqualinkServiceUnauthorizedException, MagicMock()]
+        urls = []
+
+        async def send_request(url, method="get", **kwargs):
+            urls.append(url)
+            r = responses.pop(0)
+            if r is AqualinkServiceUnauthorizedException:
+                raise r
+            return r
+
+        async def login():
+            self.aqualink.client_id = "new"
+            self.aqualink._session_generation += 1
+
+        self.aqualink.client_id = "old"
+        with patch.object(self.aqualink, "send_request", send_request):
+            with patch.object(self.aqualink, "login", login):
+                await self.aqualink.send_authenticated_request(
+                    lambda: self.aqualink.client_id
+                )
+
+        assert urls == ["old", "new"]
+        assert self.aqualink.relogin_count == 1
+        assert self.aqualink.replay_count == 1
+
+    async def test_authenticated_request_single_flight_relogin(self):
+        release = asyncio.Event()
+        login_calls = 0
+
+        async def send_request(url, method="get", **kwargs):
+            if url != "new":
+                raise AqualinkServiceUnauthorizedException
+            return MagicMock()
+
+        async def login():
+            nonlocal login_calls
+            login_calls += 1
+            await release.wait()
+            self.aqualink.client_id = "new"
+            self.aqualink._session_generation += 1
+
+        self.aqualink.client_id = "old"
+        with patch.object(self.aqualink, "send_request", send_request):
+            with patch.object(self.aqualink, "login", login):
+                tasks = [
+                    asyncio.ensure_future(
+                        self.aqualink.send_authenticated_request(
+                            lambda: self.aqualink.client_id
+                        )
+                    )
+                    for _ in range(5)
+                ]
+                await asyncio.sleep(0)
+                release.set()
+                await asyncio.gather(*tasks)
+
+        assert login_calls == 1
+        assert self.aqualink.relogin_count == 1
+        assert self.aqualink.replay_count == 5
+
+    async def test_authenticated_request_attempts_capped(self):
+        send_request = async_raises(AqualinkServiceUnauthorizedException)
+
+        async def login():
+            self.aqualink._session_generation += 1
+
+        with patch.object(self.aqualink, "send_request", send_request):
+            with patch.object(self.aqualink, "login", login):
+                with pytest.raises(AqualinkServiceUnauthorizedException):
+                    await self.aqualink.send_authenticated_request(str)
+
+        assert send_request.await_count == 2
+        assert self.aqualink.relogin_count == 1
+
+    async def test_authenticated_request_not_idempotent(self):
+        send_request = async_raises(AqualinkServiceUnauthorizedException)
+        login = AsyncMock()
+
+        with patch.object(self.aqualink, "send_request", send_request):
+            with patch.object(self.aqualink, "login", login):
+                with pytest.raises(AqualinkServiceUnauthorizedException):
+                    await self.aqualink.send_authenticated_request(
+                        str, idempotent=False
+                    )
+
+        assert send_request.await_count == 1
+        login.assert_awaited_once()
+        assert self.aqualink.replay_count == 0
+
+    async def test_authenticated_request_relogin_disabled(self):
+        aqualink = AqualinkClient("user", "pass", max_relogin_attempts=0)
+        send_request = async_raises(AqualinkServiceUnauthorizedException)
+        login = AsyncMock()
+
+        with patch.object(aqualink, "send_request", send_request):
+            with patch.object(aqualink, "login", login):
+                with pytest.raises(AqualinkServiceUnauthorizedException):
+                    await aqualink.send_authenticated_request(str)
+
+        login.assert_not_awaited()
+
+    @patch("httpx.AsyncClient.request")
+    async def test_session_refresh_in_background(self, mock_request):
+        mock_request.return_value.status_code = 200
+        mock_request.return_value.json = MagicMock(return_value=LOGIN_DATA)
+        aqualink = AqualinkClient("user", "pass", session_refresh_interval=60)
+        clock = [1000.0]
+        sleep = asyncio.sleep
+        sleeps = []
+
+        async def fake_sleep(delay):
+            sleeps.append(delay)
+            clock[0] += delay
+            await sleep(0)
+
+        with patch("iaqualink.client.time.monotonic", lambda: clock[0]):
+            with patch("iaqualink.client.asyncio.sleep", fake_sleep):
+                await aqualink.login()
+                assert mock_request.await_count == 1
+
+                for _ in range(5):
+                    await sleep(0)
+
+                # One login per elapsed interval, never back to back.
+                assert sleeps[:2] == [60.0, 60.0]
+                assert mock_request.await_count == len(sleeps)
+                assert aqualink.logged is True
+
+                await aqualink.close()
+
+        assert aqualink._session_refresh_task is None
+
+    def test_session_refresh_interval_invalid(self):
+        for interval in (0, -1):
+            with pytest.raises(AqualinkInvalidParameterException):
+                AqualinkClient(
+                    "user", "pass", session_refresh_interval=interval
+                )
+
+    @patch("httpx.AsyncClient.request")
+    async def test_session_refresh_disabled(self, mock_request):
+        mock_request.return_value.status_code = 200
+        mock_request.return_value.json = MagicMock(return_value=LOGIN_DATA)
+
+        await self.aqualink.login()
+
+        assert self.aqualink._session_refresh_task is None
+        assert self.aqualink.session_age < 60
+
+    def _make_cache(self, **kwargs):
+        cache = AqualinkMemoryCache()
+        entry = {
+            "client_id": "cached_session",
+            "authentication_token": "cached_token",
+            "user_id": "cached_id",
+            "timestamp": time.time(),
+        }
+        entry.update(kwargs)
+        cache.store("user", entry)
+        return cache
+
+    @patch("httpx.AsyncClient.request")
+    async def test_login_from_cache(self, mock_request):
+        aqualink = AqualinkClient("user", "pass", cache=self._make_cache())
+
+        await aqualink.login()
+
+        mock_request.assert_not_called()
+        assert aqualink.logged is True
+        assert aqualink.client_id == "cached_session"
+
+    @patch("httpx.AsyncClient.request")
+    async def test_login_stores_cache(self, mock_request):
+        mock_request.return_value.status_code = 200
+        mock_request.return_value.json = MagicMock(return_value=LOGIN_DATA)
+        cache = AqualinkMemoryCache()
+        aqualink = AqualinkClient("user", "pass", cache=cache)
+
+        await aqualink.login()
+
+        entry = cache.load("user")
+        assert entry["client_id"] == "session_id"
+        assert entry["authentication_token"] == "token"
+        assert "pass" not in entry.values()
+        await aqualink.close()
+
+    @patch("httpx.AsyncClient.request")
+    async def test_get_systems_from_cache(self, mock_request):
+        cached = [{"device_type": "iaqua", "serial_number": "SN1"}]
+        fresh = [{"device_type": "iaqua", "serial_number": "SN1", "name": "x"}]
+        cache = self._make_cache(systems=cached)
+        aqualink = AqualinkClient("user", "pass", cache=cache)
+        mock_request.return_value.status_code = 200
+        mock_request.return_value = json_response(fresh)
+
+        await aqualink.login()
+        systems = await aqualink.get_systems()
+
+        assert list(systems) == ["SN1"]
+        mock_request.assert_not_called()
+
+        await aqualink._revalidate_task
+        mock_request.assert_called_once()
+        assert systems["SN1"].name == "x"
+        assert cache.load("user")["systems"] == fresh
+        await aqualink.close()
+
+    @patch("httpx.AsyncClient.request")
+    async def test_stale_cache_falls_back_to_login(self, mock_request):
+        aqualink = AqualinkClient("user", "pass", cache=self._make_cache())
+        await aqualink.login()
+
+        unauthorized = MagicMock(status_code=401)
+        login = MagicMock(status_code=200)
+        login.json.return_value = LOGIN_DATA
+        systems = json_response([])
+        mock_request.side_effect = [unauthorized, login, systems]
+
+        await aqualink.get_systems()
+
+        assert aqualink.client_id == "session_id"
+        assert aqualink.relogin_count == 1
+        await aqualink.close()
+
+    @patch("httpx.AsyncClient.request")
+    async def test_revalidation_adds_and_removes_systems(self, mock_request):
+        cached = [
+            {"device_type": "iaqua", "serial_number": "SN1"},
+            {"device_type": "iaqua", "serial_number": "SN2"},
+        ]
+        fresh = [
+            {"device_type": "iaqua", "serial_number": "SN1"},
+            {"device_type": "iaqua", "serial_number": "SN3"},
+        ]
+        cache = self._make_cache(systems=cached)
+        aqualink = AqualinkClient("user", "pass", cache=cache)
+        mock_request.return_value.status_code = 200
+        mock_request.return_value = json_response(fresh)
+
+        await aqualink.login()
+        systems = await aqualink.get_systems()
+        sn1 = systems["SN1"]
+        assert sorted(systems) == ["SN1", "SN2"]
+
+        await aqualink._revalidate_task
+
+        assert sorted(systems) == ["SN1", "SN3"]
+        assert systems["SN1"] is sn1
+        await aqualink.close()
+
+    @patch("httpx.AsyncClient.request")
+    async def test_stale_cache_without_explicit_login(self, mock_request):
+        aqualink = AqualinkClient("user", "pass", cache=self._make_cache())
+
+        unauthorized = MagicMock(status_code=401)
+        login = MagicMock(status_code=200)
+        login.json.return_value = LOGIN_DATA
+        systems = json_response([])
+        mock_request.side_effect = [unauthorized, login, systems]
+
+        # No login() yet: the 401 must trigger a real login, not a reload
+        # of the same cached session.
+        await aqualink.get_systems()
+
+        assert aqualink.client_id == "session_id"
+        assert mock_request.await_count == 3
+        await aqualink.close()
+
+    @patch("httpx.AsyncClient.request")
+    async def test_malformed_cache_entry(self, mock_request):
+        mock_request.return_value.status_code = 200
+        mock_request.return_value.json = MagicMock(return_value=LOGIN_DATA)
+        cache = AqualinkMemoryCache()
+        cache.store("user", {"client_id": "x", "timestamp": time.time()})
+        aqualink = AqualinkClient("user", "pass", cache=cache)
+
+        await aqualink.login()
+
+        mock_request.assert_called_once()
+        assert aqualink.client_id == "session_id"
+        assert cache.load("user")["authentication_token"] == "token"
+        await aqualink.close()
@@ -0,0 +1,16 @@
+from __future__ import annotations
+
+import unittest
+
+from iaqualink.codec import JSON_BACKEND, loads
+
+
+class TestCodec(unittest.TestCase):
+    def test_backend(self) -> None:
+        assert JSON_BACKEND in ("json", "orjson")
+
+    def test_loads_bytes(self) -> None:
+        assert loads(b'{"foo": ["bar", 1]}') == {"foo": ["bar", 1]}
+
+    def test_loads_str(self) -> None:
+        assert loads('{"foo": null}') == {"foo": None}
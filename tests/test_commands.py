@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import asyncio
+import unittest
+from unittest.mock import AsyncMock
+
+import pytest
+
+from iaqualink.commands import AqualinkCommandQueue
+
+WINDOW = 0.01
+
+
+class TestAqualinkCommandQueue(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.obj = AqualinkCommandQueue()
+
+    async def test_last_wins(self) -> None:
+        sends = [AsyncMock() for _ in range(3)]
+        waiters = [self.obj.submit("temp1", x, WINDOW) for x in sends]
+        await asyncio.gather(*waiters)
+
+        sends[0].assert_not_awaited()
+        sends[1].assert_not_awaited()
+        sends[2].assert_awaited_once()
+        assert (self.obj.submitted, self.obj.sent) == (3, 1)
+
+    async def test_toggles_cancel_out(self) -> None:
+        send = AsyncMock()
+        waiters = [self.obj.submit("aux_1", send, WINDOW, True)]
+        waiters += [self.obj.submit("aux_1", send, WINDOW, True)]
+        await asyncio.gather(*waiters)
+
+        send.assert_not_awaited()
+        assert self.obj.sent == 0
+
+    async def test_odd_toggles_send_once(self) -> None:
+        send = AsyncMock()
+        waiters = [self.obj.submit("aux_1", send, WINDOW, True)]
+        waiters += [self.obj.submit("aux_1", send, WINDOW, True)]
+        waiters += [self.obj.submit("aux_1", send, WINDOW, True)]
+        await asyncio.gather(*waiters)
+
+        send.assert_awaited_once()
+
+    async def test_keys_sent_in_order(self) -> None:
+        sent = []
+
+        def sender(name):
+            async def send():
+                sent.append(name)
+
+            return send
+
+        waiters = [self.obj.submit("b", sender("b1"), WINDOW)]
+        waiters += [self.obj.submit("a", sender("a"), WINDOW)]
+        waiters += [self.obj.submit("b", sender("b2"), WINDOW)]
+        await asyncio.gather(*waiters)
+
+        assert sent == ["b2", "a"]
+
+    async def test_exception_to_all_waiters(self) -> None:
+        send = AsyncMock(side_effect=RuntimeError)
+        waiters = [self.obj.submit("temp1", send, WINDOW) for _ in range(2)]
+        results = await asyncio.gather(*waiters, return_exceptions=True)
+
+        assert all(isinstance(x, RuntimeError) for x in results)
+
+    async def test_batches_serialized(self) -> None:
+        release = asyncio.Event()
+        sent = []
+
+        async def slow():
+            sent.append("slow")
+            await release.wait()
+
+        async def fast():
+            sent.append("fast")
+
+        first = self.obj.submit("temp1", slow, WINDOW)
+        await asyncio.sleep(WINDOW * 2)
+        assert sent == ["slow"]
+
+        second = self.obj.submit("temp1", fast, WINDOW)
+        await asyncio.sleep(WINDOW * 2)
+        assert sent == ["slow"]
+
+        release.set()
+        await asyncio.gather(first, second)
+        assert sent == ["slow", "fast"]
+
+    async def test_flush_cancelled(self) -> None:
+        waiter = self.obj.submit("temp1", AsyncMock(), WINDOW)
+        self.obj._flush_task.cancel()
+
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+
+    async def test_flush_cancelled_while_waiting(self) -> None:
+        waiter = self.obj.submit("temp1", AsyncMock(), WINDOW)
+        await asyncio.sleep(0)
+        self.obj._flush_task.cancel()
+
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert self.obj._pending == {}
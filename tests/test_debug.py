@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import logging
+import unittest
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from iaqualink.client import AqualinkClient
+from iaqualink.debug import AqualinkPayloadLog
+from iaqualink.exception import AqualinkInvalidParameterException
+from iaqualink.systems.iaqua.system import IaquaSystem
+
+from .common import json_response
+
+
+class Payload:
+    def __init__(self) -> None:
+        self.formatted = 0
+
+    def __str__(self) -> str:
+        self.formatted += 1
+        return "payload"
+
+
+class TestAqualinkPayloadLog(unittest.TestCase):
+    def test_invalid(self) -> None:
+        with pytest.raises(AqualinkInvalidParameterException):
+            AqualinkPayloadLog(sample_rate=0)
+        with pytest.raises(AqualinkInvalidParameterException):
+            AqualinkPayloadLog(max_size=0)
+
+    def test_not_formatted_when_disabled(self) -> None:
+        log = AqualinkPayloadLog()
+        payload = Payload()
+        logger = logging.getLogger("iaqualink")
+        self.addCleanup(logger.setLevel, logger.level)
+        logger.setLevel(logging.INFO)
+
+        log.log("ABCDEFG", "Home response", payload)
+        assert payload.formatted == 0
+
+    def test_logged(self) -> None:
+        log = AqualinkPayloadLog()
+        with self.assertLogs("iaqualink", logging.DEBUG) as cm:
+            log.log("ABCDEFG", "Home response", b'{"a": 1}')
+        assert cm.records[0].getMessage() == 'Home response: {"a": 1}'
+
+    def test_sampled_per_key(self) -> None:
+        log = AqualinkPayloadLog(sample_rate=3)
+        with self.assertLogs("iaqualink", logging.DEBUG) as cm:
+            for i in range(5):
+                log.log("A", "a", i)
+                log.log("B", "b", i)
+        assert [x.getMessage() for x in cm.records] == [
+            "a: 0",
+            "b: 0",
+            "a: 3",
+            "b: 3",
+        ]
+
+    def test_max_size(self) -> None:
+        log = AqualinkPayloadLog(max_size=4)
+        with self.assertLogs("iaqualink", logging.DEBUG) as cm:
+            log.log("A", "bytes", b"0123456789")
+            log.log("A", "str", {"a": 1})
+            log.log("A", "short", b"0123")
+        assert [x.getMessage() for x in cm.records] == [
+            "bytes: 0123... (10 total)",
+            "str: {'a'... (8 total)",
+            "short: 0123",
+        ]
+
+
+class TestPayloadLogUsage(unittest.IsolatedAsyncioTestCase):
+    @patch("httpx.AsyncClient.request")
+    async def test_client_request(self, mock_request) -> None:
+        mock_request.return_value = MagicMock(status_code=200)
+        payload_log = MagicMock()
+        aqualink = AqualinkClient("user", "pass", payload_log=payload_log)
+
+        with self.assertLogs("iaqualink", logging.DEBUG):
+            await aqualink.send_request("https://r-api.iaqualink.net/x", b=1)
+        payload_log.log.assert_called_once_with(
+            "r-api.iaqualink.net",
+            "-> GET https://r-api.iaqualink.net/x",
+            {"b": 1},
+        )
+        await aqualink.close()
+
+    def test_parse_response(self) -> None:
+        aqualink = MagicMock()
+        data = {"id": 1, "serial_number": "ABCDEFG", "device_type": "iaqua"}
+        system = IaquaSystem.from_data(aqualink, data)
+        message = {"devices_screen": [{"status": "Online"}]}
+        response = json_response(message)
+
+        system._parse_devices_response(response)
+        aqualink.payload_log.log.assert_called_once_with(
+            "ABCDEFG", "Devices response", response.content
+        )
@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import asyncio
+import unittest
+from unittest.mock import MagicMock
+
+from iaqualink.events import AqualinkChange, AqualinkChangeEmitter
+
+CHANGE = AqualinkChange("SN123456", "pool_pump", "state", "0", "1")
+
+
+class TestAqualinkChangeEmitter(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.obj = AqualinkChangeEmitter()
+
+    def test_no_subscribers(self) -> None:
+        assert self.obj.has_change_subscribers is False
+        self.obj._emit_changes([CHANGE])
+
+    def test_subscribe(self) -> None:
+        callback = MagicMock()
+        self.obj.subscribe(callback)
+        self.obj._emit_changes([CHANGE])
+        callback.assert_called_once_with([CHANGE])
+
+    def test_empty_batch_not_delivered(self) -> None:
+        callback = MagicMock()
+        self.obj.subscribe(callback)
+        self.obj._emit_changes([])
+        callback.assert_not_called()
+
+    def test_unsubscribe(self) -> None:
+        callback = MagicMock()
+        unsubscribe = self.obj.subscribe(callback)
+        unsubscribe()
+        unsubscribe()
+        self.obj._emit_changes([CHANGE])
+        callback.assert_not_called()
+        assert self.obj.has_change_subscribers is False
+
+    def test_failing_subscriber(self) -> None:
+        callback = MagicMock()
+        self.obj.subscribe(MagicMock(side_effect=RuntimeError))
+        self.obj.subscribe(callback)
+        self.obj._emit_changes([CHANGE])
+        callback.assert_called_once_with([CHANGE])
+
+    async def test_changes_iterator(self) -> None:
+        other = CHANGE._replace(new="0", old="1")
+        iterator = self.obj.changes()
+        task = asyncio.ensure_future(iterator.__anext__())
+        await asyncio.sleep(0)
+
+        self.obj._emit_changes([CHANGE, other])
+
+        assert await task == CHANGE
+        assert await iterator.__anext__() == other
+        await iterator.aclose()
+        assert self.obj.has_change_subscribers is False
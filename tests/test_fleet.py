@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import unittest
+from unittest.mock import MagicMock
+
+from iaqualink.fleet import (
+    CommandResult,
+    CommandStatus,
+    FleetCommand,
+    FleetCommandResult,
+    FleetUpdateResult,
+    SystemUpdateResult,
+    UpdateStatus,
+    select_commands,
+)
+
+
+class TestFleetUpdateResult(unittest.TestCase):
+    def setUp(self) -> None:
+        results = [
+            SystemUpdateResult("SN1", UpdateStatus.SUCCESS, 1.0),
+            SystemUpdateResult("SN2", UpdateStatus.OFFLINE, 3.0),
+            SystemUpdateResult("SN3", UpdateStatus.SKIPPED),
+        ]
+        self.obj = FleetUpdateResult({x.serial: x for x in results}, 3.5)
+
+    def test_counts(self) -> None:
+        counts = self.obj.counts
+        assert counts[UpdateStatus.SUCCESS] == 1
+        assert counts[UpdateStatus.OFFLINE] == 1
+        assert counts[UpdateStatus.ERROR] == 0
+        assert counts[UpdateStatus.SKIPPED] == 1
+
+    def test_by_status(self) -> None:
+        offline = self.obj.by_status(UpdateStatus.OFFLINE)
+        assert [x.serial for x in offline] == ["SN2"]
+
+    def test_durations_ignore_skipped(self) -> None:
+        assert self.obj.max_duration == 3.0
+        assert self.obj.mean_duration == 2.0
+
+    def test_empty(self) -> None:
+        obj = FleetUpdateResult()
+        assert obj.max_duration == 0.0
+        assert obj.mean_duration == 0.0
+
+
+class TestFleetCommandResult(unittest.TestCase):
+    def setUp(self) -> None:
+        command = FleetCommand("SN1", "pool_pump", "turn_off")
+        self.obj = FleetCommandResult(
+            [
+                CommandResult(command, CommandStatus.SUCCESS, 1.0),
+                CommandResult(command, CommandStatus.OFFLINE, 3.0),
+                CommandResult(command, CommandStatus.SKIPPED),
+            ],
+            3.5,
+        )
+
+    def test_counts(self) -> None:
+        counts = self.obj.counts
+        assert counts[CommandStatus.SUCCESS] == 1
+        assert counts[CommandStatus.OFFLINE] == 1
+        assert counts[CommandStatus.ERROR] == 0
+        assert counts[CommandStatus.SKIPPED] == 1
+        assert len(self.obj.by_status(CommandStatus.OFFLINE)) == 1
+
+    def test_durations_ignore_skipped(self) -> None:
+        assert self.obj.max_duration == 3.0
+        assert self.obj.mean_duration == 2.0
+
+
+class TestSelectCommands(unittest.TestCase):
+    def test_select_commands(self) -> None:
+        systems = {}
+        for serial in ("SN1", "SN2"):
+            systems[serial] = system = MagicMock(serial=serial)
+            system.devices = {"pool_pump": MagicMock(), "spa_pump": MagicMock()}
+
+        commands = select_commands(
+            systems, lambda s, d: d is s.devices["spa_pump"], "turn_off"
+        )
+        assert commands == [
+            FleetCommand("SN1", "spa_pump", "turn_off"),
+            FleetCommand("SN2", "spa_pump", "turn_off"),
+        ]
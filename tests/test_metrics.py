@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import unittest
+from unittest.mock import MagicMock
+
+import httpx
+import pytest
+
+from iaqualink.client import AqualinkClient
+from iaqualink.exception import AqualinkServiceException
+from iaqualink.metrics import (
+    NULL_METRICS,
+    AqualinkHistogramMetrics,
+    Histogram,
+    RequestSample,
+)
+from iaqualink.systems.iaqua.system import IaquaSystem
+
+from .common import async_returns, json_response
+
+SESSION_URL = "https://p-api.iaqualink.net/v1/mobile/session.json"
+
+
+class TestHistogram(unittest.TestCase):
+    def test_snapshot(self) -> None:
+        histogram = Histogram([1.0, 2.0])
+        for value in (0.5, 1.0, 1.5, 5.0):
+            histogram.record(value)
+
+        snapshot = histogram.snapshot()
+        assert snapshot.count == 4
+        assert snapshot.mean == 2.0
+        assert snapshot.max == 5.0
+        assert snapshot.buckets == ((1.0, 2), (2.0, 3), (float("inf"), 4))
+        assert snapshot.quantile(0.5) == 1.0
+        assert snapshot.quantile(0.75) == 2.0
+        assert snapshot.quantile(1.0) == 5.0
+
+    def test_empty(self) -> None:
+        snapshot = Histogram().snapshot()
+        assert snapshot.count == 0
+        assert snapshot.mean == 0.0
+
+
+class TestAqualinkHistogramMetrics(unittest.TestCase):
+    def test_request(self) -> None:
+        metrics = AqualinkHistogramMetrics()
+        metrics.request(RequestSample("h", "get_home", 200, 100, 0.1, 0.2))
+        metrics.request(RequestSample("h", "get_home", None, 0, None, 1.0))
+
+        assert metrics.statuses == {
+            ("h", "get_home", 200): 1,
+            ("h", "get_home", None): 1,
+        }
+        snapshot = metrics.snapshot()
+        assert snapshot[("request.duration", "h", "get_home")].count == 2
+        assert snapshot[("request.ttfb", "h", "get_home")].count == 1
+        assert snapshot[("request.received", "h", "get_home")].total == 100
+
+        metrics.reset()
+        assert metrics.snapshot() == {}
+        assert not metrics.statuses
+
+
+class TestClientMetrics(unittest.IsolatedAsyncioTestCase):
+    def client(self, handler, metrics) -> AqualinkClient:
+        transport = httpx.MockTransport(handler)
+        httpx_client = httpx.AsyncClient(transport=transport)
+        self.addAsyncCleanup(httpx_client.aclose)
+        return AqualinkClient(
+            "user", "pass", httpx_client=httpx_client, metrics=metrics
+        )
+
+    def test_default(self) -> None:
+        aqualink = AqualinkClient("user", "pass")
+        assert aqualink.metrics is NULL_METRICS
+        assert aqualink.metrics.enabled is False
+
+    async def test_request_recorded(self) -> None:
+        metrics = MagicMock(enabled=True)
+        aqualink = self.client(
+            lambda _: httpx.Response(200, text="{}"), metrics
+        )
+
+        r = await aqualink.send_request(f"{SESSION_URL}?command=get_home")
+        assert r.text == "{}"
+        sample = metrics.request.call_args.args[0]
+        assert sample.host == "p-api.iaqualink.net"
+        assert sample.command == "get_home"
+        assert sample.status == 200
+        assert sample.received == 2
+        assert 0 <= sample.ttfb <= sample.duration
+
+    async def test_error_recorded(self) -> None:
+        metrics = MagicMock(enabled=True)
+        aqualink = self.client(lambda _: httpx.Response(500), metrics)
+
+        with pytest.raises(AqualinkServiceException):
+            await aqualink.send_request(
+                "https://r-api.iaqualink.net/devices.json"
+            )
+        sample = metrics.request.call_args.args[0]
+        assert (sample.command, sample.status) == ("devices.json", 500)
+
+    async def test_transport_error_recorded(self) -> None:
+        def handler(request):
+            raise httpx.ConnectError("boom", request=request)
+
+        metrics = MagicMock(enabled=True)
+        aqualink = self.client(handler, metrics)
+
+        with pytest.raises(httpx.ConnectError):
+            await aqualink.send_request(
+                "https://prod.zodiac-io.com/users/v1/login"
+            )
+        sample = metrics.request.call_args.args[0]
+        assert (sample.command, sample.status, sample.ttfb) == (
+            "login",
+            None,
+            None,
+        )
+
+
+class TestSystemMetrics(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.metrics = AqualinkHistogramMetrics()
+        aqualink = MagicMock(metrics=self.metrics)
+        data = {"id": 1, "serial_number": "ABCDEFG", "device_type": "iaqua"}
+        self.system = IaquaSystem.from_data(aqualink, data)
+
+    async def test_parse_and_update_recorded(self) -> None:
+        message = {
+            "home_screen": [
+                {"status": "Online"},
+                {"response": ""},
+                {"system_type": "0"},
+                {"temp_scale": "F"},
+            ]
+        }
+        response = async_returns(json_response(message))
+        self.system._send_home_screen_request = response
+        self.system._send_devices_screen_request = response
+        self.system._parse_devices_response = MagicMock()
+
+        await self.system.update()
+        snapshot = self.metrics.snapshot()
+        assert snapshot[("parse.duration", "ABCDEFG", "home_screen")].count == 1
+        assert snapshot[("update.duration", "ABCDEFG")].count == 1
@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+import unittest
+from unittest.mock import MagicMock
+
+import pytest
+
+from iaqualink.client import AqualinkClient
+from iaqualink.exception import AqualinkInvalidParameterException
+from iaqualink.metrics import AqualinkHistogramMetrics, LoopStall
+from iaqualink.monitor import AqualinkLoopMonitor
+from iaqualink.systems.iaqua.system import IaquaSystem
+
+from .common import json_response
+
+
+class TestAqualinkLoopMonitor(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.metrics = MagicMock()
+        self.monitor = AqualinkLoopMonitor(self.metrics, 0.01, 0.1)
+
+    def test_invalid(self) -> None:
+        with pytest.raises(AqualinkInvalidParameterException):
+            AqualinkLoopMonitor(self.metrics, 0)
+        with pytest.raises(AqualinkInvalidParameterException):
+            AqualinkLoopMonitor(self.metrics, 1, 0)
+
+    def test_section(self) -> None:
+        self.monitor.section("_parse_home_response", "A", 0.05)
+        self.metrics.stall.assert_not_called()
+
+        self.monitor.section("_parse_devices_response", "B", 0.2)
+        self.metrics.stall.assert_called_once_with(
+            LoopStall("_parse_devices_response", "B", 0.2)
+        )
+
+    def test_tick(self) -> None:
+        self.monitor.section("_parse_home_response", "A", 0.05)
+        self.monitor.section("_parse_devices_response", "B", 0.2)
+
+        with self.assertLogs("iaqualink", logging.DEBUG) as cm:
+            self.monitor._tick(0.3)
+        self.metrics.loop_lag.assert_called_once_with(0.3)
+        assert "_parse_devices_response for B (0.200s)" in cm.output[0]
+        assert (self.monitor.lag, self.monitor.max_lag) == (0.3, 0.3)
+
+        # Sections are only attributed to the next lag.
+        with self.assertLogs("iaqualink", logging.DEBUG) as cm:
+            self.monitor._tick(0.2)
+        assert "longest: unknown" in cm.output[0]
+        assert (self.monitor.lag, self.monitor.max_lag) == (0.2, 0.3)
+
+    async def test_measures_lag(self) -> None:
+        metrics = AqualinkHistogramMetrics()
+        monitor = AqualinkLoopMonitor(metrics, 0.01)
+        monitor.start()
+        assert monitor.running
+        await asyncio.sleep(0.02)
+
+        time.sleep(0.05)
+        await asyncio.sleep(0.02)
+        monitor.stop()
+        assert not monitor.running
+        assert monitor.max_lag >= 0.03
+        assert metrics.snapshot()[("loop.lag",)].count >= 2
+
+    def test_parse_attributed(self) -> None:
+        aqualink = MagicMock(loop_monitor=self.monitor)
+        aqualink.metrics.enabled = False
+        aqualink.tracer.enabled = False
+        data = {"id": 1, "serial_number": "ABCDEFG", "device_type": "iaqua"}
+        system = IaquaSystem.from_data(aqualink, data)
+        message = {"devices_screen": [{"status": "Online"}]}
+
+        system._parse_devices_response(json_response(message))
+        longest = self.monitor._longest
+        assert longest is not None
+        assert longest.section == "_parse_devices_response"
+        assert longest.serial == "ABCDEFG"
+
+
+class TestClientLoopMonitor(unittest.IsolatedAsyncioTestCase):
+    async def test_start_and_close(self) -> None:
+        metrics = AqualinkHistogramMetrics()
+        aqualink = AqualinkClient("user", "pass", metrics=metrics)
+        assert aqualink.loop_monitor is None
+
+        monitor = aqualink.start_loop_monitor(0.01, 0.5)
+        assert aqualink.start_loop_monitor() is monitor
+        assert monitor.metrics is metrics
+        assert monitor.running
+
+        await aqualink.close()
+        assert not monitor.running
@@ -0,0 +1,205 @@
+from __future__ import annotations
+
+import asyncio
+import unittest
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from iaqualink.client import AqualinkClient
+from iaqualink.exception import AqualinkInvalidParameterException
+from iaqualink.ratelimit import (
+    AqualinkRateLimiter,
+    AqualinkRequestGate,
+    QueueLatency,
+    RequestPriority,
+    TokenBucket,
+)
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+        self._sleep = asyncio.sleep
+
+    def monotonic(self) -> float:
+        return self.now
+
+    async def sleep(self, delay: float) -> None:
+        self.now += delay
+        await self._sleep(0)
+
+
+class TestTokenBucket(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.clock = FakeClock()
+        patchers = [
+            patch("iaqualink.ratelimit.time.monotonic", self.clock.monotonic),
+            patch("iaqualink.ratelimit.asyncio.sleep", self.clock.sleep),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_invalid(self) -> None:
+        with pytest.raises(AqualinkInvalidParameterException):
+            TokenBucket(0, 1)
+        with pytest.raises(AqualinkInvalidParameterException):
+            TokenBucket(1, 2, 2)
+
+    async def test_burst(self) -> None:
+        bucket = TokenBucket(1.0, 3)
+        for _ in range(3):
+            await bucket.acquire()
+        assert self.clock.now == 1000.0
+
+    async def test_refill_rate(self) -> None:
+        bucket = TokenBucket(2.0, 1)
+        await bucket.acquire()
+        await bucket.acquire()
+        await bucket.acquire()
+        assert self.clock.now == pytest.approx(1001.0)
+
+    async def test_reserve_kept_for_commands(self) -> None:
+        bucket = TokenBucket(1.0, 3, reserve=2)
+        await bucket.acquire(RequestPriority.POLL)
+        await bucket.acquire(RequestPriority.COMMAND)
+        await bucket.acquire(RequestPriority.COMMAND)
+        assert self.clock.now == 1000.0
+
+        # Polls have to wait for the reserve to be refilled on top.
+        await bucket.acquire(RequestPriority.POLL)
+        assert self.clock.now == pytest.approx(1003.0)
+
+    async def test_waiting_commands_go_first(self) -> None:
+        bucket = TokenBucket(1.0, 1)
+        await bucket.acquire()
+        order = []
+
+        async def acquire(priority):
+            await bucket.acquire(priority)
+            order.append(priority)
+
+        poll = asyncio.ensure_future(acquire(RequestPriority.POLL))
+        command = asyncio.ensure_future(acquire(RequestPriority.COMMAND))
+        await asyncio.gather(poll, command)
+        assert order == [RequestPriority.COMMAND, RequestPriority.POLL]
+
+    async def test_queue_depth(self) -> None:
+        bucket = TokenBucket(1.0, 1)
+        await bucket.acquire()
+        task = asyncio.ensure_future(bucket.acquire())
+        await asyncio.sleep(0)
+        assert bucket.queue_depth == 1
+        await task
+        assert bucket.queue_depth == 0
+
+
+class TestAqualinkRateLimiter(unittest.IsolatedAsyncioTestCase):
+    def test_per_host_buckets(self) -> None:
+        limiter = AqualinkRateLimiter({"a": (1.0, 2, 0)}, default=(5.0, 5, 0))
+        assert limiter.bucket("a").capacity == 2
+        assert limiter.bucket("b").capacity == 5
+        assert limiter.bucket("a") is limiter.bucket("a")
+        assert limiter.queue_depth == {"a": 0, "b": 0}
+
+    @patch("httpx.AsyncClient.request")
+    async def test_client_uses_limiter(self, mock_request) -> None:
+        mock_request.return_value = MagicMock(status_code=200)
+        limiter = AqualinkRateLimiter()
+        aqualink = AqualinkClient("user", "pass", rate_limiter=limiter)
+
+        with patch.object(limiter, "acquire") as mock_acquire:
+            await aqualink.send_request(
+                "https://p-api.iaqualink.net/v1/mobile/session.json",
+                priority=RequestPriority.COMMAND,
+            )
+            mock_acquire.assert_awaited_once_with(
+                "p-api.iaqualink.net", RequestPriority.COMMAND
+            )
+
+        await aqualink.close()
+
+
+class TestAqualinkRequestGate(unittest.IsolatedAsyncioTestCase):
+    def test_invalid(self) -> None:
+        with pytest.raises(AqualinkInvalidParameterException):
+            AqualinkRequestGate(0)
+        with pytest.raises(AqualinkInvalidParameterException):
+            AqualinkRequestGate(4, 0)
+
+    async def test_poll_share(self) -> None:
+        gate = AqualinkRequestGate(4, 0.5)
+        await gate.acquire(RequestPriority.POLL)
+        await gate.acquire(RequestPriority.POLL)
+        task = asyncio.ensure_future(gate.acquire(RequestPriority.POLL))
+        await asyncio.sleep(0)
+        assert not task.done()
+
+        # Commands still get the remaining slots right away.
+        await gate.acquire(RequestPriority.COMMAND)
+        await gate.acquire(RequestPriority.COMMAND)
+        assert gate.in_flight == {"command": 2, "poll": 2}
+        assert gate.queue_depth == {"command": 0, "poll": 1}
+
+        gate.release(RequestPriority.COMMAND)
+        await asyncio.sleep(0)
+        assert not task.done()
+        gate.release(RequestPriority.POLL)
+        await task
+        assert gate.in_flight == {"command": 1, "poll": 2}
+
+    async def test_commands_go_first(self) -> None:
+        gate = AqualinkRequestGate(1)
+        await gate.acquire(RequestPriority.POLL)
+        order = []
+
+        async def run(priority):
+            await gate.acquire(priority)
+            order.append(priority)
+            gate.release(priority)
+
+        tasks = [
+            asyncio.ensure_future(run(RequestPriority.POLL)),
+            asyncio.ensure_future(run(RequestPriority.COMMAND)),
+        ]
+        await asyncio.sleep(0)
+        gate.release(RequestPriority.POLL)
+        await asyncio.gather(*tasks)
+        assert order == [RequestPriority.COMMAND, RequestPriority.POLL]
+        assert gate.in_flight == {"command": 0, "poll": 0}
+
+    async def test_cancelled_waiter(self) -> None:
+        gate = AqualinkRequestGate(1)
+        await gate.acquire(RequestPriority.COMMAND)
+        task = asyncio.ensure_future(gate.acquire(RequestPriority.POLL))
+        await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert gate.queue_depth == {"command": 0, "poll": 0}
+
+        gate.release(RequestPriority.COMMAND)
+        await gate.acquire(RequestPriority.POLL)
+        assert gate.in_flight == {"command": 0, "poll": 1}
+
+    @patch("httpx.AsyncClient.request")
+    async def test_client_records_queue_latency(self, mock_request) -> None:
+        mock_request.return_value = MagicMock(status_code=200)
+        gate = AqualinkRequestGate()
+        aqualink = AqualinkClient("user", "pass", request_gate=gate)
+
+        await aqualink.send_request("https://p-api.iaqualink.net/")
+        latency = aqualink.queue_latency
+        assert latency[RequestPriority.POLL].count == 1
+        assert latency[RequestPriority.COMMAND].count == 0
+        assert gate.in_flight == {"command": 0, "poll": 0}
+
+        await aqualink.close()
+
+    def test_queue_latency(self) -> None:
+        latency = QueueLatency()
+        assert latency.mean == 0.0
+        latency.record(1.0)
+        latency.record(3.0)
+        assert (latency.count, latency.mean, latency.max) == (2, 2.0, 3.0)
@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import asyncio
+import time
+import unittest
+from unittest.mock import MagicMock, PropertyMock, patch
+
+from iaqualink.exception import (
+    AqualinkServiceException,
+    AqualinkSystemOfflineException,
+)
+from iaqualink.scheduler import AqualinkPollScheduler
+from iaqualink.system import AqualinkSystem
+
+from .common import async_noop, async_raises
+
+
+class TestAqualinkPollScheduler(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        data = {"serial_number": "SN123456", "device_type": "fake"}
+        self.system = AqualinkSystem(MagicMock(), data)
+        self.obj = AqualinkPollScheduler(
+            [self.system],
+            idle_interval=60,
+            active_interval=20,
+            command_interval=5,
+            command_window=30,
+            max_backoff=300,
+            jitter=0,
+        )
+
+    async def asyncTearDown(self) -> None:
+        await self.obj.stop()
+
+    def test_idle_interval(self) -> None:
+        assert self.obj.next_interval(self.system) == 60
+
+    def test_active_interval(self) -> None:
+        with patch.object(
+            AqualinkSystem, "is_active", new_callable=PropertyMock
+        ) as mock_active:
+            mock_active.return_value = True
+            assert self.obj.next_interval(self.system) == 20
+
+    def test_command_interval(self) -> None:
+        self.system.last_command = time.monotonic()
+        assert self.obj.next_interval(self.system) == 5
+
+    def test_command_window_expired(self) -> None:
+        self.system.last_command = time.monotonic() - 31
+        assert self.obj.next_interval(self.system) == 60
+
+    async def test_service_errors_back_off(self) -> None:
+        self.system.update = async_raises(AqualinkServiceException)
+        with patch.object(self.obj, "next_interval", return_value=0.001):
+            self.obj.start()
+            await asyncio.sleep(0.01)
+            failures = [
+                x.args[1] for x in self.obj.next_interval.call_args_list
+            ]
+        assert failures[:3] == [1, 2, 3]
+
+    def test_offline_backoff(self) -> None:
+        assert self.obj.next_interval(self.system, 1) == 60
+        assert self.obj.next_interval(self.system, 2) == 120
+        assert self.obj.next_interval(self.system, 3) == 240
+        assert self.obj.next_interval(self.system, 4) == 300
+
+    def test_jitter(self) -> None:
+        self.obj.jitter = 0.5
+        intervals = {self.obj.next_interval(self.system) for _ in range(20)}
+        assert len(intervals) > 1
+        assert all(30 <= x <= 90 for x in intervals)
+
+    def test_interval_floor(self) -> None:
+        self.obj.command_interval = 1
+        self.system.last_command = time.monotonic()
+        assert self.obj.next_interval(self.system) == 5
+
+    async def test_start_polls(self) -> None:
+        self.system.update = async_noop
+        self.system.update.reset_mock()
+
+        self.obj.start()
+        await asyncio.sleep(0.01)
+
+        assert self.obj.running is True
+        self.system.update.assert_awaited_once()
+
+    async def test_poll_errors_keep_polling(self) -> None:
+        self.system.update = async_raises(AqualinkSystemOfflineException)
+        with patch.object(self.obj, "next_interval", return_value=0.001):
+            self.obj.start()
+            await asyncio.sleep(0.01)
+        assert self.system.update.await_count > 1
+
+    async def test_command_pulls_next_poll_in(self) -> None:
+        clock = [1000.0]
+        sleep = asyncio.sleep
+
+        async def fake_sleep(delay):
+            clock[0] += delay
+            await sleep(0)
+
+        polls = []
+
+        async def update():
+            polls.append(clock[0])
+
+        self.system.update = update
+
+        with patch("iaqualink.scheduler.time.monotonic", lambda: clock[0]):
+            with patch("iaqualink.scheduler.asyncio.sleep", fake_sleep):
+                self.obj.start()
+                for _ in range(5):
+                    await sleep(0)
+                assert polls == [1000.0]
+
+                # Idle interval is 60s, a command brings the poll within 5s.
+                self.system.last_command = clock[0]
+                while len(polls) < 2:
+                    await sleep(0)
+                assert polls[1] - self.system.last_command <= 5
+
+    async def test_remove(self) -> None:
+        self.obj.start()
+        self.obj.remove(self.system)
+        assert self.obj.systems == {}
+        assert self.obj._tasks == {}
+
+    async def test_stop(self) -> None:
+        self.obj.start()
+        await self.obj.stop()
+        assert self.obj.running is False
+        assert self.obj._tasks == {}
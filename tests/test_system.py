@@ -1,12 +1,16 @@
 from __future__ import annotations
 
+import asyncio
 import unittest
 from unittest.mock import MagicMock, patch
 
 import pytest
 
 from iaqualink.client import AqualinkClient
-from iaqualink.exception import AqualinkSystemUnsupportedException
+from iaqualink.exception import (
+    AqualinkServiceException,
+    AqualinkSystemUnsupportedException,
+)
 from iaqualink.system import AqualinkSystem
 
 
@@ -67,3 +71,97 @@ class TestAqualinkSystem(unittest.IsolatedAsyncioTestCase):
 
         with pytest.raises(NotImplementedError):
             await system.update()
+
+    async def test_update_throttled(self):
+        data = {"id": 1, "serial_number": "ABCDEFG", "device_type": "fake"}
+        aqualink = AqualinkClient("user", "pass")
+        system = AqualinkSystem(aqualink, data)
+        system._mark_refreshed()
+
+        with patch.object(system, "_update") as mock_update:
+            await system.update()
+            mock_update.assert_not_called()
+
+    async def test_update_coalesced(self):
+        data = {"id": 1, "serial_number": "ABCDEFG", "device_type": "fake"}
+        aqualink = AqualinkClient("user", "pass")
+        system = AqualinkSystem(aqualink, data)
+        release = asyncio.Event()
+        calls = 0
+
+        async def update():
+            nonlocal calls
+            calls += 1
+            await release.wait()
+            system.devices = {"foo": "bar"}
+
+        with patch.object(system, "_update", update):
+            tasks = [asyncio.ensure_future(system.update()) for _ in range(3)]
+            tasks += [asyncio.ensure_future(system.get_devices())]
+            await asyncio.sleep(0)
+            release.set()
+            results = await asyncio.gather(*tasks)
+
+        assert calls == 1
+        assert results[-1] == {"foo": "bar"}
+        assert system._refresh_task is None
+
+    async def test_update_coalesced_exception(self):
+        data = {"id": 1, "serial_number": "ABCDEFG", "device_type": "fake"}
+        aqualink = AqualinkClient("user", "pass")
+        system = AqualinkSystem(aqualink, data)
+        release = asyncio.Event()
+
+        async def update():
+            await release.wait()
+            raise AqualinkServiceException
+
+        with patch.object(system, "_update", update):
+            tasks = [asyncio.ensure_future(system.update()) for _ in range(2)]
+            await asyncio.sleep(0)
+            release.set()
+            results = await asyncio.gather(*tasks, return_exceptions=True)
+
+        assert all(isinstance(x, AqualinkServiceException) for x in results)
+
+    async def test_update_caller_cancelled(self):
+        data = {"id": 1, "serial_number": "ABCDEFG", "device_type": "fake"}
+        aqualink = AqualinkClient("user", "pass")
+        system = AqualinkSystem(aqualink, data)
+        release = asyncio.Event()
+        done = False
+
+        async def update():
+            nonlocal done
+            await release.wait()
+            done = True
+
+        with patch.object(system, "_update", update):
+            first = asyncio.ensure_future(system.update())
+            second = asyncio.ensure_future(system.update())
+            await asyncio.sleep(0)
+            first.cancel()
+            release.set()
+            await second
+
+        assert done is True
+
+    async def test_update_after_refresh_ends(self):
+        data = {"id": 1, "serial_number": "ABCDEFG", "device_type": "fake"}
+        aqualink = AqualinkClient("user", "pass")
+        system = AqualinkSystem(aqualink, data)
+        seen = []
+
+        async def update():
+            # Runs right after this refresh ends, before its done callbacks.
+            # A caller showing up then must not join the finished refresh.
+            asyncio.get_event_loop().call_soon(
+                lambda: seen.append(system._refresh_task)
+            )
+            raise RuntimeError
+
+        with patch.object(system, "_update", update):
+            with pytest.raises(RuntimeError):
+                await system.update()
+
+        assert seen == [None]
@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import unittest
+from contextlib import contextmanager
+from unittest.mock import MagicMock, patch
+
+from iaqualink.client import AqualinkClient
+from iaqualink.systems.iaqua.system import IaquaSystem
+from iaqualink.tracing import NULL_TRACER, AqualinkTracer, OpenTelemetryTracer
+
+from .common import async_returns, json_response
+
+SESSION_URL = "https://p-api.iaqualink.net/v1/mobile/session.json"
+
+
+class RecordingTracer(AqualinkTracer):
+    __slots__ = ("spans", "active")
+
+    enabled = True
+
+    def __init__(self) -> None:
+        self.spans = []
+        self.active = []
+
+    @contextmanager
+    def span(self, name, attributes):
+        parent = self.active[-1] if self.active else None
+        self.spans.append((name, attributes, parent))
+        self.active.append(name)
+        try:
+            yield
+        finally:
+            self.active.pop()
+
+
+class TestTracing(unittest.IsolatedAsyncioTestCase):
+    def test_default(self) -> None:
+        aqualink = AqualinkClient("user", "pass")
+        assert aqualink.tracer is NULL_TRACER
+        assert aqualink.tracer.enabled is False
+
+    @patch("httpx.AsyncClient.request")
+    async def test_request_span(self, mock_request) -> None:
+        mock_request.return_value = MagicMock(status_code=200)
+        tracer = RecordingTracer()
+        aqualink = AqualinkClient("user", "pass", tracer=tracer)
+
+        url = f"{SESSION_URL}?command=get_home&serial=ABCDEFG"
+        await aqualink.send_request(url, "post")
+        assert tracer.spans == [
+            (
+                "iaqualink.request",
+                {
+                    "http.request.method": "POST",
+                    "server.address": "p-api.iaqualink.net",
+                    "iaqualink.command": "get_home",
+                    "iaqualink.serial": "ABCDEFG",
+                },
+                None,
+            )
+        ]
+        await aqualink.close()
+
+    async def test_system_spans(self) -> None:
+        tracer = RecordingTracer()
+        aqualink = MagicMock(tracer=tracer)
+        aqualink.metrics.enabled = False
+        data = {"id": 1, "serial_number": "ABCDEFG", "device_type": "iaqua"}
+        system = IaquaSystem.from_data(aqualink, data)
+        message = {"devices_screen": [{"status": "Online"}]}
+        system._send_command_request = async_returns(json_response(message))
+
+        await system.set_aux("aux_1")
+        serial = {"iaqualink.serial": "ABCDEFG"}
+        assert tracer.spans == [
+            (
+                "iaqualink.command",
+                {**serial, "iaqualink.command": "set_aux"},
+                None,
+            ),
+            (
+                "iaqualink.parse",
+                {**serial, "iaqualink.screen": "devices_screen"},
+                "iaqualink.command",
+            ),
+        ]
+
+        tracer.spans.clear()
+        system._update = async_returns(None)
+        await system.update()
+        assert tracer.spans == [("iaqualink.update", serial, None)]
+
+
+class TestOpenTelemetryTracer(unittest.TestCase):
+    def test_span(self) -> None:
+        otel = MagicMock()
+        tracer = OpenTelemetryTracer(otel)
+        assert tracer.enabled is True
+
+        span = tracer.span("iaqualink.login", {"a": "b"})
+        otel.start_as_current_span.assert_called_once_with(
+            "iaqualink.login", attributes={"a": "b"}
+        )
+        assert span is otel.start_as_current_span.return_value